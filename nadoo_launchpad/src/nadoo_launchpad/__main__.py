@@ -1,4 +1,12 @@
-from nadoo_launchpad.app import main
+import sys
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # A subcommand runs headless; Toga is never imported.
+        from nadoo_launchpad.cli import main as cli_main
+
+        sys.exit(cli_main())
+
+    from nadoo_launchpad.app import main
+
     main().main_loop()
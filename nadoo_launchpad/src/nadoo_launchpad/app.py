@@ -1,9 +1,13 @@
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN
-from nadoo_launchpad.services import check_installation_state
+from nadoo_launchpad import db, telemetry, warmer
+from nadoo_launchpad.services import TEMPLATE, check_installation_state
+from nadoo_launchpad.template_cache import TemplateCacheRefresher
 from nadoo_launchpad.components.InstallationComponent import InstallationComponent
 from nadoo_launchpad.components.ProjectInfoComponent import ProjectInfoComponent
+from nadoo_launchpad.components.ProjectListComponent import ProjectListComponent
+from nadoo_launchpad.components.TimingsComponent import TimingsComponent
 
 
 
@@ -12,21 +16,60 @@ class NADOOLaunchpad(toga.App):
    
 
     def startup(self):
-        main_box = toga.Box(style=Pack(direction=COLUMN))
+        # The app bundle may be read-only; the database lives with the data.
+        db.configure(self.paths.data)
+        # Step timings of every job go to the launcher log.
+        telemetry.configure(self.paths.logs)
+        self.main_box = toga.Box(style=Pack(direction=COLUMN))
        
-        # Check if installation has already occurred
-        if check_installation_state(self.app):
-            # Add ProjectInfoComponent to UI blocks if already installed
-            project_info_component = ProjectInfoComponent(self, project_data=None)
-            main_box.add(project_info_component)
+        # Check if installation has already occurred; reads the settings file.
+        installed = check_installation_state(self.app)
+        if installed:
+            self.add_project_components()
         else:
             # Add InstallationComponent to UI blocks if not installed
             installation_component = InstallationComponent(self)
-            main_box.add(installation_component)
+            self.main_box.add(installation_component)
         # Set the initial content of the main window
         self.main_window = toga.MainWindow(title=self.formal_name)
-        self.main_window.content=main_box
+        self.main_window.content=self.main_box
         self.main_window.show()
 
+        # Warm the caches for the first project, once the window is painted.
+        self.warmer = None
+        self.template_refresher = None
+        if installed:
+            self.loop.call_later(warmer.WARM_DELAY, self.start_warmer)
+
+    def add_project_components(self):
+        # Add ProjectInfoComponent to UI blocks if already installed
+        project_info_component = ProjectInfoComponent(self, project_data=None)
+        self.main_box.add(project_info_component)
+        # The projects that already exist in the project folder
+        self.main_box.add(ProjectListComponent(self))
+        # How long the steps of past runs took
+        self.main_box.add(TimingsComponent(self))
+
+    def on_installed(self):
+        # Called by the InstallationComponent once the installation is done
+        self.main_box.clear()
+        self.add_project_components()
+        self.start_warmer()
+
+    def start_warmer(self):
+        self.warmer = warmer.start_warmer(self)
+        # Keeps the template fetched, so project creation never waits for
+        # the remote.
+        self.template_refresher = TemplateCacheRefresher(TEMPLATE)
+        self.template_refresher.start()
+
+    def on_exit(self):
+        # Don't wait for a golden venv nobody needs anymore.
+        if self.warmer is not None:
+            self.warmer.shutdown()
+        if self.template_refresher is not None:
+            self.template_refresher.stop()
+        return True
+
 def main():
     return NADOOLaunchpad()
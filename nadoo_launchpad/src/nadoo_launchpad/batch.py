@@ -0,0 +1,337 @@
+"""Scaffold many projects at once from a manifest.
+
+A manifest is a TOML or JSON file listing project contexts. In TOML::
+
+    [defaults]
+    bundle = "de.nadooit"
+    author = "Christoph Backhaus"
+    author_email = "christoph.backhaus@nadooit.de"
+
+    [[project]]
+    formal_name = "Invoice Scanner"
+    description = "Scans invoices"
+
+    [[project]]
+    formal_name = "Time Tracker"
+
+In JSON, the same structure is ``{"defaults": {...}, "project": [...]}``,
+or simply a list of projects.
+
+Run a batch with ``python -m nadoo_launchpad batch manifest.toml``.
+
+Every project runs the same steps as "Add Project" in the GUI, in a bounded
+process pool. The project folder is scanned once, before the workers start,
+and every project is checked against it for collisions. A failing project
+doesn't abort the batch; the result is a machine readable summary with
+per-step timings.
+"""
+import argparse
+import json
+import sys
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+# The fields of a project context, and their defaults.
+PROJECT_FIELDS = {
+    "formal_name": None,
+    "bundle": None,
+    "author": None,
+    "author_email": None,
+    "url": "",
+    "description": "",
+    "license": "Proprietary",
+    "gui_framework": "Toga",
+}
+
+# Lines of output to keep for a failed project
+OUTPUT_TAIL = 20
+
+
+class ManifestError(Exception):
+    """The manifest can't be read."""
+
+
+def load_manifest(manifest_path):
+    """Read the project definitions from a TOML or JSON manifest.
+
+    :param manifest_path: The manifest file.
+    :returns: A list of project field dicts, with the defaults applied.
+    :raises ManifestError: If the manifest is malformed.
+    """
+    manifest_path = Path(manifest_path)
+    try:
+        if manifest_path.suffix == ".json":
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+        else:
+            with open(manifest_path, "rb") as manifest_file:
+                manifest = tomllib.load(manifest_file)
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"Unable to read {manifest_path}: {e}") from e
+
+    if isinstance(manifest, list):
+        manifest = {"project": manifest}
+    defaults = manifest.get("defaults", {})
+    projects = []
+    for index, project in enumerate(manifest.get("project", [])):
+        fields = {**PROJECT_FIELDS, **defaults, **project}
+        unknown = sorted(set(fields) - set(PROJECT_FIELDS))
+        if unknown:
+            raise ManifestError(f"Project {index + 1}: unknown fields {', '.join(unknown)}")
+        missing = sorted(name for name, value in fields.items() if value is None)
+        if missing:
+            raise ManifestError(f"Project {index + 1}: missing {', '.join(missing)}")
+        projects.append(fields)
+    if not projects:
+        raise ManifestError(f"{manifest_path} doesn't define any projects")
+    return projects
+
+
+def scaffold_project(context, cache_dir):
+    """Create a single project; runs in a worker process.
+
+    :param context: The template context (see ``build_project_context``).
+    :param cache_dir: The launcher cache directory.
+    :returns: The result for the summary.
+    """
+    from nadoo_launchpad.jobs import Job
+    from nadoo_launchpad.services import project_creation_steps
+
+    output = []
+    job = Job(
+        f"Add project {context['app_name']}",
+        project_creation_steps(),
+        # run_batch checked the project folder for collisions.
+        state={"context": context, "cache_dir": cache_dir, "collisions_checked": True},
+        on_output=output.append,
+        span_name="Add project",
+        attributes={"app_name": context["app_name"]},
+    )
+    result = {"app_name": context["app_name"], "status": "ok", "error": None}
+    start = time.perf_counter()
+    try:
+        job.run()
+    except Exception as e:
+        result.update(status="failed", error=str(e) or type(e).__name__)
+        result["output"] = output[-OUTPUT_TAIL:]
+    result["duration"] = time.perf_counter() - start
+    result["steps"] = [
+        {"name": label, "duration": duration} for label, duration in job.timings
+    ]
+    return result
+
+
+def prepare_batch(cache_dir):
+    """Do the shared setup once, so the workers don't race for it.
+
+    :returns: The projects already in the project folder (see
+        ``scanner.scan_projects``).
+    """
+    import briefcase
+    from nadoo_launchpad import golden_venv, scanner
+    from nadoo_launchpad.utils import get_project_folder_path, get_python_path
+
+    # pip's output is echoed on stderr; stdout is the JSON summary.
+    golden_venv.build_golden_venv(get_python_path(), cache_dir, briefcase.__version__)
+    return scanner.scan_projects(get_project_folder_path(), cache_dir)
+
+
+def init_worker(log_dir, data_dir=None):
+    """Set up a worker process; workers started by spawn share nothing."""
+    from nadoo_launchpad import db, telemetry
+
+    telemetry.configure(log_dir)
+    if data_dir is not None:
+        db.configure(data_dir)
+
+
+def run_batch(
+    projects,
+    cache_dir,
+    max_workers=None,
+    on_result=None,
+    scaffold=scaffold_project,
+    log_dir=None,
+    data_dir=None,
+    existing_projects=(),
+):
+    """Scaffold projects in a process pool.
+
+    :param projects: Project field dicts, as returned by ``load_manifest``.
+    :param cache_dir: The launcher cache directory.
+    :param max_workers: The size of the process pool.
+    :param on_result: Called with every project result as it completes.
+    :param scaffold: Creates one project; called with ``(context, cache_dir)``
+        in a worker process.
+    :param log_dir: The launcher log directory the workers record their
+        step timings in; ``None`` records nothing.
+    :param data_dir: The launcher data directory, for the database the
+        workers register the projects in.
+    :param existing_projects: The projects in the project folder, as
+        returned by ``prepare_batch``; new projects must not collide with
+        them.
+    :returns: The batch summary.
+    """
+    from briefcase.exceptions import BriefcaseCommandError
+    from nadoo_launchpad.scanner import find_collisions
+    from nadoo_launchpad.services import build_project_context
+
+    started = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    results = [None] * len(projects)
+
+    def finish(index, result):
+        result = {"formal_name": projects[index]["formal_name"], **result}
+        results[index] = result
+        if on_result is not None:
+            on_result(result)
+
+    # Validate every project before starting any work.
+    contexts = {}
+    for index, fields in enumerate(projects):
+        try:
+            context = build_project_context(**fields)
+        except BriefcaseCommandError as e:
+            finish(index, {"app_name": None, "status": "failed", "error": str(e)})
+            continue
+        app_name = context["app_name"]
+        collisions = find_collisions(existing_projects, app_name, context["bundle"])
+        if find_collisions(contexts.values(), app_name, context["bundle"]):
+            error = f"Duplicate app name '{app_name}' in manifest"
+        elif collisions:
+            other = collisions[0]
+            error = (
+                f"'{app_name}' collides with the app '{other['app_name']}' "
+                f"({other['bundle']}.{other['app_name']}) in {other['path']}."
+            )
+        else:
+            contexts[index] = context
+            continue
+        finish(index, {"app_name": app_name, "status": "failed", "error": error})
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=init_worker, initargs=(log_dir, data_dir)
+    ) as executor:
+        futures = {
+            executor.submit(scaffold, context, cache_dir): index
+            for index, context in contexts.items()
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died.
+                result = {
+                    "app_name": contexts[index]["app_name"],
+                    "status": "failed",
+                    "error": str(e) or type(e).__name__,
+                }
+            finish(index, result)
+
+    return {
+        "started": started.isoformat(),
+        "duration": time.perf_counter() - start,
+        "succeeded": sum(result["status"] == "ok" for result in results),
+        "failed": sum(result["status"] != "ok" for result in results),
+        "projects": results,
+    }
+
+
+def print_result(result):
+    if result["status"] == "ok":
+        print(f"[ok]     {result['app_name']} ({result['duration']:.1f}s)", file=sys.stderr)
+    else:
+        print(f"[failed] {result['formal_name']}: {result['error']}", file=sys.stderr)
+
+
+def add_batch_arguments(parser):
+    parser.add_argument("manifest", type=Path, help="The project manifest.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="The number of projects to create in parallel. Default: CPU count.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="Write the JSON summary to this file instead of stdout.",
+    )
+
+
+def batch_command(options):
+    """Scaffold the projects of a manifest; the ``batch`` command.
+
+    :param options: The parsed ``add_batch_arguments``, plus ``cache_dir``,
+        ``log_dir``, ``quiet`` and the ``parser``.
+    :returns: The exit code.
+    """
+    from nadoo_launchpad import db, telemetry
+    from nadoo_launchpad.config import launcher_paths
+
+    try:
+        projects = load_manifest(options.manifest)
+    except ManifestError as e:
+        options.parser.error(str(e))
+
+    data_dir = launcher_paths().data
+    db.configure(data_dir)
+    telemetry.configure(options.log_dir)
+    existing_projects = prepare_batch(options.cache_dir)
+    summary = run_batch(
+        projects,
+        options.cache_dir,
+        max_workers=options.jobs,
+        on_result=None if options.quiet else print_result,
+        log_dir=options.log_dir,
+        data_dir=data_dir,
+        existing_projects=existing_projects,
+    )
+
+    if options.output:
+        with open(options.output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
+    from nadoo_launchpad.config import launcher_paths
+
+    parser = argparse.ArgumentParser(
+        prog="python -m nadoo_launchpad.batch",
+        description="Scaffold all projects in a TOML or JSON manifest.",
+    )
+    add_batch_arguments(parser)
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Don't report the result of every project.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=launcher_paths().cache,
+        help="The launcher cache directory.",
+    )
+    parser.add_argument(
+        "--log-dir",
+        type=Path,
+        default=launcher_paths().logs,
+        help="The launcher log directory, where step timings are recorded.",
+    )
+    parser.set_defaults(parser=parser)
+    return batch_command(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+"""Content-addressed cache of Briefcase build outputs, shared by projects.
+
+``briefcase create`` installs the app requirements into the bundle with
+pip and unpacks the Python support package, for every project, although
+most projects need exactly the same packages. The build cache keeps those
+outputs by a hash of what they depend on::
+
+    <cache>/build-cache/
+        entries/<key>/        a cached tree, e.g. an app_packages folder
+        entries/<key>.json    its size and description; its mtime is the
+                              time of the last use
+        stats.json            hit, miss, store and eviction counters
+        lock
+
+The key of the app packages is a hash of the requirements, the target
+platform and output format, the Python version and the Briefcase version;
+the key of a support package is a hash of the support file and the
+platform. Restoring an entry clones its files into the bundle where the
+filesystem supports reflinks, and copies them otherwise, so a cache hit
+costs a copy instead of a pip install. Files are never hardlinked: ``briefcase
+build`` signs the binaries of a macOS bundle, which may rewrite them in
+place. The hash of every file is recorded when an entry is stored, and
+checked before it is restored; an entry that has changed is evicted. Once
+the cache grows past its size limit the least recently used entries are
+evicted.
+
+Only requirements pinned with ``==`` are cached; anything else (``toga``,
+``toga>=0.4``, local paths, URLs) may install something different on the
+next build, so it bypasses the cache. ``NADOO_BUILD_CACHE=0`` bypasses it
+entirely.
+
+Projects the launcher scaffolds use the cache through the ``briefcase``
+script in their venv (see ``wire_venv``), which runs Briefcase with
+``run_briefcase``. This module, ``fileops`` and ``locks`` are copied into
+the venvs, so they only use the standard library.
+
+The cache replaces private methods of Briefcase's create command, so it is
+only used with the Briefcase versions in ``HOOKED_BRIEFCASE_VERSIONS``; any
+other version builds without it.
+"""
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import stat
+import sys
+import sysconfig
+import tempfile
+import time
+from pathlib import Path
+
+from nadoo_launchpad.fileops import Linker, atomic_write
+from nadoo_launchpad.locks import FileLock
+
+BUILD_CACHE_DIR = "build-cache"
+STATS_FILE = "stats.json"
+PTH_FILE = "nadoo_build_cache.pth"
+# The directory of a venv the hook modules are copied to
+HOOK_DIR = "nadoo-build-cache"
+HOOK_MODULES = ("build_cache.py", "fileops.py", "locks.py")
+
+# The Briefcase versions whose create command the hook was written for
+HOOKED_BRIEFCASE_VERSIONS = {"0.3.16"}
+# What the hook calls or replaces on the create command
+HOOKED_METHODS = (
+    "install_app_requirements",
+    "_unpack_support_package",
+    "app_requirements_path",
+    "app_packages_path",
+)
+
+# The size past which the least recently used entries are evicted
+MAX_CACHE_BYTES = int(os.environ.get("NADOO_BUILD_CACHE_MAX_BYTES", 5 * 1024**3))
+
+COUNTERS = ("hits", "misses", "stores", "evictions", "corrupted")
+
+# A requirement pinned to a single version, optionally with extras and
+# environment markers, e.g. ``toga-core[dev]==0.4.9; python_version>'3.8'``
+PINNED_RE = re.compile(
+    r"\s*[A-Za-z0-9][A-Za-z0-9._-]*\s*(\[[^\]]*\])?\s*===?\s*[^\s,;*]+\s*(;.*)?"
+)
+
+BRIEFCASE_SCRIPT = '''\
+{shebang}
+# Runs Briefcase with the NADOO Launchpad build cache.
+import sys
+
+try:
+    from nadoo_launchpad.build_cache import run_briefcase
+except ImportError:
+    # The hook modules are gone; build without the cache.
+    from briefcase.__main__ import main
+
+    sys.exit(main())
+else:
+    sys.exit(run_briefcase({root!r}, {max_bytes!r}))
+'''
+
+
+def cache_key(*parts):
+    """A hash of everything a cached output depends on."""
+    key = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def tree_size(path):
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            size += os.lstat(os.path.join(dirpath, name)).st_size
+    return size
+
+
+def is_pinned(requirement):
+    """Whether a requirement always installs the same version."""
+    return PINNED_RE.fullmatch(requirement) is not None
+
+
+def copy_tree(source, target, linker, merge=False):
+    """Recreate a tree, materializing its files with a ``Linker``.
+
+    :param merge: Add to an existing target, replacing files of the same
+        name, rather than requiring a new one.
+    """
+    target.mkdir(parents=True, exist_ok=merge)
+    for dirpath, dirnames, filenames in os.walk(source):
+        relative = Path(dirpath).relative_to(source)
+        for name in dirnames + filenames:
+            src = Path(dirpath) / name
+            dst = target / relative / name
+            if name in dirnames and not src.is_symlink():
+                dst.mkdir(exist_ok=merge)
+                continue
+            if merge and (dst.is_symlink() or dst.is_file()):
+                dst.unlink()
+            if src.is_symlink():
+                os.symlink(os.readlink(src), dst)
+            else:
+                linker(src, dst)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_hashes(path):
+    """The hash of every file below a directory, by relative POSIX path."""
+    path = Path(path)
+    hashes = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            file_path = Path(dirpath) / name
+            if not file_path.is_symlink():
+                hashes[file_path.relative_to(path).as_posix()] = file_hash(file_path)
+    return hashes
+
+
+class BuildCache:
+    def __init__(self, root, max_bytes=MAX_CACHE_BYTES):
+        """A size-bounded, content-addressed store of directory trees.
+
+        :param root: The cache directory; it can be shared by launchers.
+        :param max_bytes: The size past which entries are evicted.
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.entries_path = self.root / "entries"
+
+    def entry_path(self, key) -> Path:
+        return self.entries_path / key
+
+    def _metadata_path(self, key) -> Path:
+        return self.entries_path / f"{key}.json"
+
+    def _lock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        return FileLock(self.root / "lock")
+
+    def _count(self, **counters):
+        """Add to the counters in the stats file; the caller holds the lock."""
+        path = self.root / STATS_FILE
+        stats = self.read_counters()
+        for name, amount in counters.items():
+            stats[name] += amount
+        with atomic_write(path) as stats_file:
+            json.dump(stats, stats_file)
+
+    def read_counters(self):
+        try:
+            with open(self.root / STATS_FILE, "r") as stats_file:
+                stats = json.load(stats_file)
+        except (FileNotFoundError, ValueError):
+            stats = {}
+        return {name: stats.get(name, 0) for name in COUNTERS}
+
+    def entries(self):
+        """The cached entries, least recently used first.
+
+        :returns: A list of dicts with ``key``, ``size``, ``description``,
+            ``files`` (the hash of every file) and ``used`` (epoch seconds).
+        """
+        entries = []
+        for metadata_path in self.entries_path.glob("*.json"):
+            try:
+                with open(metadata_path, "r") as metadata_file:
+                    metadata = json.load(metadata_file)
+                used = metadata_path.stat().st_mtime
+            except (OSError, ValueError):
+                # Being evicted
+                continue
+            entries.append({**metadata, "key": metadata_path.stem, "used": used})
+        return sorted(entries, key=lambda entry: entry["used"])
+
+    def restore(self, key, target, merge=False):
+        """Materialize a cached tree, replacing whatever is at the target.
+
+        :param key: The key of the entry.
+        :param target: Where to put the tree.
+        :param merge: Add the tree to the target's files instead.
+        :returns: True on a hit; False on a miss, or if the entry has
+            changed since it was stored. The target is left alone then.
+        """
+        target = Path(target)
+        with self._lock():
+            metadata_path = self._metadata_path(key)
+            try:
+                with open(metadata_path, "r") as metadata_file:
+                    files = json.load(metadata_file).get("files")
+            except (FileNotFoundError, ValueError):
+                files = None
+            if files is None:
+                self._count(misses=1)
+                return False
+            if tree_hashes(self.entry_path(key)) != files:
+                # Something wrote into the entry; never hand it out again.
+                self._remove(key)
+                self._count(misses=1, corrupted=1)
+                return False
+            if target.exists() and not merge:
+                shutil.rmtree(target)
+            copy_tree(self.entry_path(key), target, Linker(hardlinks=False), merge=merge)
+            # Marks the entry as recently used.
+            os.utime(metadata_path)
+            self._count(hits=1)
+        return True
+
+    def store(self, key, source, description=""):
+        """Add a tree to the cache, evicting old entries to make room.
+
+        :param key: The key of the entry.
+        :param source: The tree to cache. Its files are cloned or copied.
+        :param description: What the entry is, for ``entries``.
+        :returns: True if the tree was stored.
+        """
+        source = Path(source)
+        size = tree_size(source)
+        if size > self.max_bytes:
+            return False
+        self.entries_path.mkdir(parents=True, exist_ok=True)
+        build_path = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.entries_path))
+        try:
+            copy_tree(source, build_path / "tree", Linker(hardlinks=False))
+            files = tree_hashes(build_path / "tree")
+            with self._lock():
+                if self._metadata_path(key).exists():
+                    # Another build stored the same output.
+                    return False
+                shutil.rmtree(self.entry_path(key), ignore_errors=True)
+                (build_path / "tree").rename(self.entry_path(key))
+                # The metadata marks the entry as complete.
+                with atomic_write(self._metadata_path(key)) as metadata_file:
+                    json.dump(
+                        {
+                            "size": size,
+                            "description": description,
+                            "stored": time.time(),
+                            "files": files,
+                        },
+                        metadata_file,
+                    )
+                self._count(stores=1)
+                self._evict(keep=key)
+        finally:
+            shutil.rmtree(build_path, ignore_errors=True)
+        return True
+
+    def _evict(self, keep=None):
+        """Evict the least recently used entries; the caller holds the lock."""
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        evicted = []
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry["key"] == keep:
+                continue
+            self._remove(entry["key"])
+            total -= entry["size"]
+            evicted.append(entry["key"])
+        if evicted:
+            self._count(evictions=len(evicted))
+        return evicted
+
+    def _remove(self, key):
+        # The metadata goes first, so the entry is never found half removed.
+        self._metadata_path(key).unlink(missing_ok=True)
+        shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def evict(self):
+        """Evict entries until the cache fits its size limit.
+
+        :returns: The keys of the evicted entries.
+        """
+        with self._lock():
+            return self._evict()
+
+    def clear(self):
+        """Remove every entry, keeping the counters."""
+        with self._lock():
+            for entry in self.entries():
+                self._remove(entry["key"])
+
+    def stats(self):
+        """The counters, plus the number and size of the entries."""
+        entries = self.entries()
+        counters = self.read_counters()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else None,
+            "entries": len(entries),
+            "size": sum(entry["size"] for entry in entries),
+            "max_size": self.max_bytes,
+        }
+
+
+def build_cache_path(cache_dir) -> Path:
+    """The build cache of a launcher cache directory.
+
+    ``NADOO_BUILD_CACHE_DIR`` points it elsewhere, e.g. at a directory
+    shared by several users on a build machine.
+    """
+    shared = os.environ.get("NADOO_BUILD_CACHE_DIR")
+    return Path(shared) if shared else Path(cache_dir) / BUILD_CACHE_DIR
+
+
+def install_hook(cache):
+    """Make Briefcase's create command use a build cache.
+
+    Must be called in the process that runs Briefcase, before the command.
+
+    :returns: False, leaving Briefcase alone, if its version isn't one the
+        hook was written for.
+    """
+    import briefcase
+    from briefcase.commands import create
+
+    if briefcase.__version__ not in HOOKED_BRIEFCASE_VERSIONS or not all(
+        hasattr(create.CreateCommand, name) for name in HOOKED_METHODS
+    ):
+        return False
+    install_app_requirements = create.CreateCommand.install_app_requirements
+    unpack_support_package = create.CreateCommand._unpack_support_package
+    target = (sysconfig.get_platform(), sys.version_info[:2], briefcase.__version__)
+
+    def cached_install_app_requirements(self, app, test_mode):
+        requires = list(app.requires or [])
+        if test_mode and app.test_requires:
+            requires.extend(app.test_requires)
+        try:
+            # Templates with a requirements file install at build time.
+            self.app_requirements_path(app)
+            app_packages_path = None
+        except KeyError:
+            try:
+                app_packages_path = self.app_packages_path(app)
+            except KeyError:
+                app_packages_path = None
+        if (
+            app_packages_path is None
+            or not requires
+            or not all(is_pinned(requirement) for requirement in requires)
+        ):
+            return install_app_requirements(self, app, test_mode)
+
+        key = cache_key(
+            "app-packages", requires, self.platform, self.output_format, *target
+        )
+        if cache.restore(key, app_packages_path):
+            self.logger.info(f"Restored app requirements from the build cache ({key[:12]})")
+            return
+        install_app_requirements(self, app, test_mode)
+        cache.store(
+            key, app_packages_path, description=f"{app.app_name}: {', '.join(requires)}"
+        )
+
+    def cached_unpack_support_package(self, support_file_path, support_path):
+        key = cache_key(
+            "support",
+            file_hash(support_file_path),
+            self.platform,
+            self.output_format,
+            *target,
+        )
+        # The template may have put files into the support folder already.
+        if cache.restore(key, support_path, merge=True):
+            self.logger.info(f"Restored support package from the build cache ({key[:12]})")
+            return
+        support_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(
+            prefix=".nadoo-support-", dir=support_path.parent
+        ) as unpack_path:
+            unpacked = Path(unpack_path) / "support"
+            unpack_support_package(self, support_file_path, unpacked)
+            cache.store(
+                key, unpacked, description=f"support: {Path(support_file_path).name}"
+            )
+            copy_tree(unpacked, support_path, Linker(hardlinks=False), merge=True)
+
+    create.CreateCommand.install_app_requirements = cached_install_app_requirements
+    create.CreateCommand._unpack_support_package = cached_unpack_support_package
+    return True
+
+
+def run_briefcase(root, max_bytes=MAX_CACHE_BYTES):
+    """Run the Briefcase command line with a build cache.
+
+    :returns: Briefcase's exit code.
+    """
+    from briefcase.__main__ import main
+
+    if os.environ.get("NADOO_BUILD_CACHE") != "0":
+        if not install_hook(BuildCache(root, max_bytes)):
+            print(
+                "This version of Briefcase can't use the build cache",
+                file=sys.stderr,
+            )
+    return main()
+
+
+def _site_packages(venv_path):
+    if platform.system() == "Windows":
+        return Path(venv_path) / "Lib" / "site-packages"
+    return next(Path(venv_path).glob("lib/python*/site-packages"))
+
+
+def wire_venv(venv_path, root, max_bytes=MAX_CACHE_BYTES):
+    """Make a project venv's ``briefcase`` use a build cache.
+
+    The build cache modules are copied into a directory of the venv that
+    is added to its path; nothing else of the launcher is, so it can't
+    shadow the project's packages. The venv's ``briefcase`` script is
+    replaced by one that runs Briefcase with the cache. Without the hook
+    modules, the script runs plain Briefcase.
+
+    :param venv_path: The project venv.
+    :param root: The build cache directory.
+    :param max_bytes: The size limit of the cache.
+    :returns: False if the venv has no script that can be replaced (on
+        Windows, where the scripts are executables).
+    """
+    script_path = Path(venv_path) / "bin" / "briefcase"
+    if not script_path.is_file():
+        return False
+
+    hook_path = Path(venv_path) / HOOK_DIR
+    package_path = hook_path / "nadoo_launchpad"
+    package_path.mkdir(parents=True, exist_ok=True)
+    # Files are replaced rather than rewritten, because they may be linked
+    # to the golden venv.
+    with atomic_write(package_path / "__init__.py"):
+        pass
+    for name in HOOK_MODULES:
+        with open(Path(__file__).parent / name, "r") as module_file:
+            source = module_file.read()
+        with atomic_write(package_path / name) as module_file:
+            module_file.write(source)
+    with atomic_write(_site_packages(venv_path) / PTH_FILE) as pth_file:
+        pth_file.write(f"{hook_path}\n")
+
+    with open(script_path, "r") as script_file:
+        shebang = script_file.readline().rstrip("\n")
+    permissions = stat.S_IMODE(os.stat(script_path).st_mode)
+    with atomic_write(script_path, permissions=permissions) as script_file:
+        script_file.write(
+            BRIEFCASE_SCRIPT.format(shebang=shebang, root=str(root), max_bytes=max_bytes)
+        )
+    return True
@@ -0,0 +1,491 @@
+"""Command line interface of the launcher.
+
+``python -m nadoo_launchpad`` without arguments starts the GUI; with a
+subcommand it runs headless, without importing Toga::
+
+    python -m nadoo_launchpad install
+    python -m nadoo_launchpad new-project --formal-name "Invoice Scanner" \\
+        --bundle de.nadooit --author "Jane Developer" \\
+        --author-email jane.developer@nadooit.de
+    python -m nadoo_launchpad batch projects.toml
+    python -m nadoo_launchpad upgrade --all
+    python -m nadoo_launchpad build-cache
+    python -m nadoo_launchpad timings
+
+``new-project`` can also read the project fields from a TOML or JSON file
+with ``--context``; flags override the values in the file. Progress goes to
+stderr, so ``--json`` output on stdout can be piped.
+
+``batch`` creates every project of a manifest in parallel (see ``batch``),
+and prints a JSON summary on stdout.
+
+``upgrade`` brings registered projects up to the current template in place,
+merging the template changes with the changes made in each project.
+
+``build-cache`` reports the hit rate and size of the Briefcase build cache
+the scaffolded projects share.
+
+Every run records the duration of its steps in the launcher log directory;
+``timings`` prints percentiles of the step durations across runs.
+
+Only the standard library is imported up front, so the CLI is cheap to call
+in a loop; the project creation packages are loaded when a step needs them.
+"""
+import argparse
+import json
+import sys
+import tomllib
+from pathlib import Path
+
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.batch import PROJECT_FIELDS, add_batch_arguments
+from nadoo_launchpad.config import launcher_paths
+
+
+class ContextError(Exception):
+    """The project context file can't be used."""
+
+
+def load_context(context_path):
+    """Read the project fields from a TOML or JSON file.
+
+    :param context_path: The context file.
+    :returns: A dict of project fields.
+    :raises ContextError: If the file is malformed or has unknown fields.
+    """
+    context_path = Path(context_path)
+    try:
+        if context_path.suffix == ".json":
+            with open(context_path, "r") as context_file:
+                fields = json.load(context_file)
+        else:
+            with open(context_path, "rb") as context_file:
+                fields = tomllib.load(context_file)
+    except (OSError, ValueError) as e:
+        raise ContextError(f"Unable to read {context_path}: {e}") from e
+
+    if not isinstance(fields, dict):
+        raise ContextError(f"{context_path} must define a single project")
+    unknown = sorted(set(fields) - set(PROJECT_FIELDS))
+    if unknown:
+        raise ContextError(f"{context_path}: unknown fields {', '.join(unknown)}")
+    return fields
+
+
+def project_fields(options):
+    """Merge the context file, the flags and the defaults.
+
+    :raises ContextError: If a required field has no value.
+    """
+    fields = dict(PROJECT_FIELDS)
+    if options.context is not None:
+        fields.update(load_context(options.context))
+    for name in PROJECT_FIELDS:
+        value = getattr(options, name)
+        if value is not None:
+            fields[name] = value
+    missing = sorted(name for name, value in fields.items() if value is None)
+    if missing:
+        flags = ", ".join(f"--{name.replace('_', '-')}" for name in missing)
+        raise ContextError(f"missing {flags}")
+    return fields
+
+
+def print_progress(index, total, label):
+    if index < total:
+        print(f"[{index + 1}/{total}] {label}", file=sys.stderr)
+
+
+def print_output(line):
+    print(f"    {line}", file=sys.stderr)
+
+
+def run_job(job):
+    """Run a job on this thread, reporting failures on stderr.
+
+    :returns: The exit code.
+    """
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        job.cancel()
+        print("Cancelled", file=sys.stderr)
+        return 130
+    except Exception as e:
+        if job.on_output is None and job.output:
+            # Quiet runs still explain failures.
+            for line in job.output:
+                print_output(line)
+        print(f"Error: {e or type(e).__name__}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def make_job(name, steps, state, options, **kwargs):
+    from nadoo_launchpad.jobs import Job
+    from nadoo_launchpad.services import STEP_TIMEOUTS
+
+    return Job(
+        name,
+        steps,
+        state=state,
+        on_progress=None if options.quiet else print_progress,
+        on_output=None if options.quiet else print_output,
+        timeouts=STEP_TIMEOUTS,
+        **kwargs,
+    )
+
+
+def install(options):
+    from nadoo_launchpad.services import installation_steps, record_timings
+
+    job = make_job(
+        "Install",
+        installation_steps(),
+        {
+            "config_dir": options.config_dir,
+            "cache_dir": options.cache_dir,
+            "python_versions": options.python_versions,
+            "python_build_cache": options.python_build_cache,
+        },
+        options,
+    )
+    returncode = run_job(job)
+    if returncode == 0:
+        record_timings(options.config_dir, "install", job)
+    return returncode
+
+
+def new_project(options):
+    from nadoo_launchpad.services import (
+        build_project_context,
+        new_project_steps,
+        record_timings,
+    )
+
+    try:
+        context = build_project_context(**project_fields(options))
+    except ContextError as e:
+        options.parser.error(str(e))
+    except Exception as e:
+        # An invalid app name (a BriefcaseCommandError)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    job = make_job(
+        f"Add project {context['app_name']}",
+        new_project_steps(),
+        {
+            "context": context,
+            "cache_dir": options.cache_dir,
+            "force_refresh": options.refresh_template,
+        },
+        options,
+        span_name="Add project",
+        attributes={"app_name": context["app_name"]},
+    )
+    returncode = run_job(job)
+    if returncode == 0:
+        record_timings(options.config_dir, "add_project", job)
+    if options.json:
+        json.dump(
+            {
+                "app_name": context["app_name"],
+                "status": "ok" if returncode == 0 else "failed",
+                "path": str(job.state["app_path"]) if "app_path" in job.state else None,
+                "steps": [
+                    {"name": label, "duration": duration}
+                    for label, duration in job.timings
+                ],
+            },
+            sys.stdout,
+            indent=2,
+        )
+        print()
+    return returncode
+
+
+def batch(options):
+    from nadoo_launchpad.batch import batch_command
+
+    return batch_command(options)
+
+
+def upgrade(options):
+    from nadoo_launchpad import registry
+    from nadoo_launchpad.services import project_upgrade_steps
+
+    if options.all:
+        app_names = [project.app_name for project in registry.search_projects(limit=None)]
+    elif options.app_names:
+        app_names = options.app_names
+    else:
+        options.parser.error("name the projects to upgrade, or pass --all")
+
+    job = make_job(
+        "Upgrade projects",
+        project_upgrade_steps(app_names),
+        {
+            "cache_dir": options.cache_dir,
+            "force_refresh": options.refresh_template,
+            "dry_run": options.dry_run,
+        },
+        options,
+    )
+    returncode = run_job(job)
+    upgrades = job.state.get("upgrades", {})
+    if returncode == 0 and any(
+        result["status"] == "failed" for result in upgrades.values()
+    ):
+        returncode = 1
+    if options.json:
+        json.dump(
+            {"template_sha": job.state.get("template_sha"), "projects": upgrades},
+            sys.stdout,
+            indent=2,
+        )
+        print()
+    else:
+        counts = {}
+        for result in upgrades.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        print(f"Upgraded {len(upgrades)} projects: {summary or 'nothing to do'}")
+    return returncode
+
+
+def format_bytes(size):
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def show_build_cache(options):
+    from nadoo_launchpad import build_cache
+
+    cache = build_cache.BuildCache(build_cache.build_cache_path(options.cache_dir))
+    if options.clear:
+        cache.clear()
+    elif options.evict:
+        cache.evict()
+    stats = cache.stats()
+    if options.json:
+        json.dump({**stats, "entries": cache.entries()}, sys.stdout, indent=2)
+        print()
+        return 0
+
+    hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+    print(f"Build cache {cache.root}")
+    print(
+        f"{stats['entries']} entries, {format_bytes(stats['size'])} "
+        f"of {format_bytes(stats['max_size'])}"
+    )
+    print(
+        f"{stats['hits']} hits, {stats['misses']} misses ({hit_rate}), "
+        f"{stats['stores']} stored, {stats['evictions']} evicted"
+    )
+    return 0
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    return f"{int(seconds // 60)}m{seconds % 60:02.0f}s"
+
+
+def timings(options):
+    summary = telemetry.read_summary(options.log_dir, kinds=options.kinds)
+    if options.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return 0
+    if not summary:
+        print(f"No timings recorded in {options.log_dir}", file=sys.stderr)
+        return 0
+
+    width = max(len(name) for name in summary)
+    columns = ["runs", "failed"] + [f"p{percent}" for percent in telemetry.PERCENTILES]
+    columns.append("max")
+    print(f"{'step':<{width}}  " + "  ".join(f"{column:>7}" for column in columns))
+    for name, stats in summary.items():
+        values = [str(stats["count"]), str(stats["failed"])]
+        values += [
+            format_seconds(stats[f"p{percent}"]) for percent in telemetry.PERCENTILES
+        ]
+        values.append(format_seconds(stats["max"]))
+        print(f"{name:<{width}}  " + "  ".join(f"{value:>7}" for value in values))
+    return 0
+
+
+def build_parser():
+    paths = launcher_paths()
+    parser = argparse.ArgumentParser(
+        prog="python -m nadoo_launchpad",
+        description=(
+            "Set up the NADOO development environment and create projects. "
+            "Without a command, the launcher window is opened."
+        ),
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Don't report progress and command output.",
+    )
+    parser.add_argument(
+        "--config-dir",
+        type=Path,
+        default=paths.config,
+        help="The launcher config directory.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=paths.cache,
+        help="The launcher cache directory.",
+    )
+    parser.add_argument(
+        "--log-dir",
+        type=Path,
+        default=paths.logs,
+        help="The launcher log directory, where step timings are recorded.",
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    install_parser = subcommands.add_parser(
+        "install", help="Install pyenv and Python, and set up the project folder."
+    )
+    install_parser.set_defaults(handler=install)
+    install_parser.add_argument(
+        "--python",
+        dest="python_versions",
+        action="append",
+        metavar="VERSION",
+        help=(
+            "A Python version to install; repeat for several. The first is the "
+            "default interpreter. Default: the python.versions setting."
+        ),
+    )
+    install_parser.add_argument(
+        "--python-build-cache",
+        type=Path,
+        help=(
+            "A directory, possibly shared between machines, of compiled "
+            "interpreters. Default: the python.build_cache setting."
+        ),
+    )
+
+    new_project_parser = subcommands.add_parser(
+        "new-project", help="Create a new project from the NADOO template."
+    )
+    new_project_parser.set_defaults(handler=new_project, parser=new_project_parser)
+    new_project_parser.add_argument(
+        "--context",
+        type=Path,
+        help="A TOML or JSON file with the project fields.",
+    )
+    for name in PROJECT_FIELDS:
+        default = PROJECT_FIELDS[name]
+        new_project_parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            dest=name,
+            help=(
+                "Required, unless set in the context file."
+                if default is None
+                else f"Default: {default!r}"
+            ),
+        )
+    new_project_parser.add_argument(
+        "--refresh-template",
+        action="store_true",
+        help="Fetch the template even if the cached copy is current.",
+    )
+    new_project_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print a JSON summary of the project on stdout.",
+    )
+
+    batch_parser = subcommands.add_parser(
+        "batch", help="Create every project of a TOML or JSON manifest."
+    )
+    batch_parser.set_defaults(handler=batch, parser=batch_parser)
+    add_batch_arguments(batch_parser)
+
+    upgrade_parser = subcommands.add_parser(
+        "upgrade", help="Upgrade registered projects to the current template."
+    )
+    upgrade_parser.set_defaults(handler=upgrade, parser=upgrade_parser)
+    upgrade_parser.add_argument(
+        "app_names", nargs="*", metavar="APP_NAME", help="The projects to upgrade."
+    )
+    upgrade_parser.add_argument(
+        "--all", action="store_true", help="Upgrade every registered project."
+    )
+    upgrade_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report the changes without writing them.",
+    )
+    upgrade_parser.add_argument(
+        "--refresh-template",
+        action="store_true",
+        help="Fetch the template even if the cached copy is current.",
+    )
+    upgrade_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the changes of every project as JSON on stdout.",
+    )
+
+    build_cache_parser = subcommands.add_parser(
+        "build-cache", help="Show the Briefcase build cache shared by the projects."
+    )
+    build_cache_parser.set_defaults(handler=show_build_cache)
+    build_cache_actions = build_cache_parser.add_mutually_exclusive_group()
+    build_cache_actions.add_argument(
+        "--evict",
+        action="store_true",
+        help="Evict the least recently used entries past the size limit first.",
+    )
+    build_cache_actions.add_argument(
+        "--clear", action="store_true", help="Remove every entry first."
+    )
+    build_cache_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the statistics and the entries as JSON.",
+    )
+
+    timings_parser = subcommands.add_parser(
+        "timings", help="Summarize the step durations of past runs."
+    )
+    timings_parser.set_defaults(handler=timings)
+    timings_parser.add_argument(
+        "--commands",
+        dest="kinds",
+        action="store_const",
+        const=["command"],
+        default=["job", "step"],
+        help="Summarize the commands the steps ran instead of the steps.",
+    )
+    timings_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the summary as JSON, with every statistic.",
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    options = parser.parse_args(argv)
+    telemetry.configure(options.log_dir)
+    return options.handler(options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
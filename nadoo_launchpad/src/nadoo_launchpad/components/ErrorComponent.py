@@ -4,20 +4,31 @@ from toga.style.pack import COLUMN
 
 
 class ErrorComponent(toga.Box):
-    def __init__(self, app, error_message):
+    def __init__(self, app, error_message, output=None):
         super().__init__(style=Pack(direction=COLUMN, padding=5))
         self.app = app
         self.error_message = error_message
+        # The last lines the failed commands printed
+        self.output = list(output or [])
 
         # Error message text area
         self.error_text_area = toga.TextInput(readonly=True, value=self.error_message)
         self.add(self.error_text_area)
 
+        # Command output leading up to the error
+        if self.output:
+            self.output_text_area = toga.MultilineTextInput(
+                readonly=True,
+                value="\n".join(self.output),
+                style=Pack(height=150, padding=(5, 0)),
+            )
+            self.add(self.output_text_area)
+            self.output_text_area.scroll_to_bottom()
+
         # Copy button
         copy_btn = toga.Button("Copy Error", on_press=self.copy_error)
         self.add(copy_btn)
 
     def copy_error(self, widget):
-        # Copy error message to clipboard
-        self.app.clipboard.set(self.error_message)
-    
\ No newline at end of file
+        # Copy error message, and the output that explains it, to clipboard
+        self.app.clipboard.set("\n".join([self.error_message, *self.output]))
@@ -1,14 +1,62 @@
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN
-from nadoo_launchpad.services import install
+from nadoo_launchpad.components.ErrorComponent import ErrorComponent
+from nadoo_launchpad.jobs import JobCancelled, JobRunner
+from nadoo_launchpad.services import install, record_timings
 
 # TODO add setting the secret key on first startup. This can be a random string. Simply use UUID4 to create it
 class InstallationComponent(toga.Box):
-    def __init__(self, app, ui_blocks:list):
+    def __init__(self, app:toga.App):
         super().__init__(style=Pack(direction=COLUMN, padding=5))
         self.app = app
-        self.install_btn = toga.Button("Install", on_press=install(self=self, ui_blocks=ui_blocks))
+        self.job_runner = JobRunner(loop=app.loop)
+        self.error_component = None
+
+        # Progress of the installation
+        self.progress_bar = toga.ProgressBar(max=1.0, style=Pack(padding=(5, 0)))
+        self.status_label = toga.Label("", style=Pack(padding=(5, 0)))
+        self.output_view = toga.MultilineTextInput(
+            readonly=True, style=Pack(height=150, padding=(5, 0))
+        )
+        self.install_btn = toga.Button("Install", on_press=self.on_install)
         self.add(self.install_btn)
+        self.add(self.progress_bar)
+        self.add(self.status_label)
+        self.add(self.output_view)
+
+    def on_install(self, widget):
+        install(self, widget)
+
+    def show_error(self, error_message, output=None):
+        if self.error_component is not None:
+            self.remove(self.error_component)
+        self.error_component = ErrorComponent(self.app, error_message, output)
+        self.add(self.error_component)
+
+    # Job callbacks; the JobRunner calls these on the UI thread.
+    def on_job_started(self, job):
+        self.install_btn.enabled = False
+        self.output_view.value = ""
+        self.progress_bar.value = 0
+        self.status_label.text = job.name
+
+    def on_job_progress(self, index, total, label):
+        self.progress_bar.value = index / total if total else 1.0
+        self.status_label.text = f"Step {min(index + 1, total)}/{total}: {label}"
+
+    def on_job_output(self, line):
+        self.output_view.value += line + "\n"
+        self.output_view.scroll_to_bottom()
 
-    
\ No newline at end of file
+    def on_job_done(self, job, error):
+        self.install_btn.enabled = True
+        if error is None:
+            record_timings(self.app.paths.config, "install", job)
+            # Replaces this component with the project view.
+            self.app.on_installed()
+        elif isinstance(error, JobCancelled):
+            self.status_label.text = f"{job.name}: cancelled"
+        else:
+            self.status_label.text = f"{job.name}: failed"
+            self.show_error(str(error), job.output)
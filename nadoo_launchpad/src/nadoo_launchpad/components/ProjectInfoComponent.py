@@ -1,13 +1,22 @@
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
-from toga.sources import ListSource
-from nadoo_launchpad.services import add_new_project, cancel_action
+from nadoo_launchpad import developers
+from nadoo_launchpad.components.ErrorComponent import ErrorComponent
+from nadoo_launchpad.jobs import Job, JobCancelled, JobRunner
+from nadoo_launchpad.services import add_new_project, cancel_action, record_timings
+from nadoo_launchpad.utils import on_new_developer_name_entered
+
+# Entries of the developer dropdown that aren't developers
+MORE_DEVELOPERS = {"name": "More...", "email": ""}
+ADD_NEW_DEVELOPER = {"name": "Add New...", "email": "NoName.NoName@nadooit.de"}
 
 class ProjectInfoComponent(toga.Box):
     def __init__(self, app:toga.App, project_data=None):
         super().__init__(style=Pack(direction=COLUMN, padding=5))
         self.app = app
+        self.job_runner = JobRunner(loop=app.loop)
+        self.error_component = None
         
         # Set default values if project_data is None
         if project_data is None:
@@ -21,30 +30,20 @@ class ProjectInfoComponent(toga.Box):
                 # Set other default values...
             }
 
-        # Mapping of developer names to their emails
-        developers = ListSource(
-            accessors=["name", "email"],
-            data=[
-                {
-                    "name": "Christoph Backhaus",
-                    "email": "christoph.backhaus@nadooit.de",
-                },
-                {
-                    "name": "Laurin Kochwasser",
-                    "email": "laurin.kochwasser@nadooit.de"
-                },
-            ],
+        # Developers are read from the directory a page at a time, in the
+        # background, so a large directory doesn't slow down the startup.
+        self.developer_loader = JobRunner(loop=app.loop)
+        self.developer_search = 0
+        self.developer_page_end = None
+        self.developer_search_input = toga.TextInput(
+            placeholder="Search developers",
+            on_change=self.on_developer_search,
+            style=Pack(padding=(5, 0)),
         )
 
         # Dropdown for selecting the developer
-        developer_options = developers
-
-        developer_options.append(
-            {"name": "Add New...", "email": "NoName.NoName@nadooit.de"}
-        )
-
         self.developer_dropdown_list = toga.Selection(
-            items=developer_options, accessor="name", style=Pack(padding=(5, 0))
+            items=[ADD_NEW_DEVELOPER], accessor="name", style=Pack(padding=(5, 0))
         )
 
         # Text input fields
@@ -58,14 +57,8 @@ class ProjectInfoComponent(toga.Box):
             value="de.nadooit",
         )
 
-        self.author_input = toga.TextInput(
-            placeholder="Author",
-            value=self.developer_dropdown_list.value.__dict__.get("name"),
-        )
-        self.author_email_input = toga.TextInput(
-            placeholder="Author's Email",
-            value=self.developer_dropdown_list.value.__dict__.get("email"),
-        )
+        self.author_input = toga.TextInput(placeholder="Author")
+        self.author_email_input = toga.TextInput(placeholder="Author's Email")
         self.url_input = toga.TextInput(placeholder="URL", value="https://nadooit.de/")
         self.description_input = toga.TextInput(
             placeholder="Description", value="A description of the project"
@@ -78,6 +71,7 @@ class ProjectInfoComponent(toga.Box):
 
 
         # Adding widgets to the component
+        self.add(self.developer_search_input)
         self.add(self.developer_dropdown_list)
         self.add(self.project_name_input)
         self.add(self.bundle_input)
@@ -124,13 +118,64 @@ class ProjectInfoComponent(toga.Box):
         # Adding GUI framework dropdown to the component
         self.add(self.gui_framework_dropdown)
 
+        # Progress of the running job
+        self.progress_bar = toga.ProgressBar(max=1.0, style=Pack(padding=(5, 0)))
+        self.status_label = toga.Label("", style=Pack(padding=(5, 0)))
+        self.output_view = toga.MultilineTextInput(
+            readonly=True, style=Pack(height=150, padding=(5, 0))
+        )
+        self.add(self.progress_bar)
+        self.add(self.status_label)
+        self.add(self.output_view)
+
         # Buttons
-        cancel_btn = toga.Button("Cancel", on_press=cancel_action)
-        add_project_btn = toga.Button("Add Project", on_press=add_new_project)
+        cancel_btn = toga.Button("Cancel", on_press=self.on_cancel)
+        self.add_project_btn = toga.Button("Add Project", on_press=self.on_add_project)
         button_box = toga.Box(
-            children=[cancel_btn, add_project_btn], style=Pack(direction=ROW, padding=5)
+            children=[cancel_btn, self.add_project_btn], style=Pack(direction=ROW, padding=5)
         )
         self.add(button_box)
+
+        self.load_developers()
+
+    def on_add_project(self, widget):
+        add_new_project(self, widget)
+
+    def on_cancel(self, widget):
+        cancel_action(self)
+
+    def show_error(self, error_message, output=None):
+        if self.error_component is not None:
+            self.remove(self.error_component)
+        self.error_component = ErrorComponent(self.app, error_message, output)
+        self.add(self.error_component)
+
+    # Job callbacks; the JobRunner calls these on the UI thread.
+    def on_job_started(self, job):
+        self.add_project_btn.enabled = False
+        self.output_view.value = ""
+        self.progress_bar.value = 0
+        self.status_label.text = job.name
+
+    def on_job_progress(self, index, total, label):
+        self.progress_bar.value = index / total if total else 1.0
+        self.status_label.text = f"Step {min(index + 1, total)}/{total}: {label}"
+
+    def on_job_output(self, line):
+        self.output_view.value += line + "\n"
+        self.output_view.scroll_to_bottom()
+
+    def on_job_done(self, job, error):
+        self.add_project_btn.enabled = True
+        if error is None:
+            self.status_label.text = f"{job.name}: done"
+            record_timings(self.app.paths.config, "add_project", job)
+        elif isinstance(error, JobCancelled):
+            self.status_label.text = f"{job.name}: cancelled"
+        else:
+            self.status_label.text = f"{job.name}: failed"
+            self.show_error(str(error), job.output)
+
     def update_project_url(self, widget):
         # Split the bundle input by '.', reverse it, and join back with '.'
         bundle_reversed = ".".join(self.bundle_input.value.split(".")[::-1])
@@ -139,16 +184,68 @@ class ProjectInfoComponent(toga.Box):
         # Combine the reversed bundle and the underscored project name
         self.url_input.value = f"http://{bundle_reversed}/{project_name_underscored}"
     
+    def load_developers(self, more=False):
+        # Searches can overlap; only the latest one updates the dropdown.
+        self.developer_search += 1
+        search = self.developer_search
+        prefix = self.developer_search_input.value.strip()
+        after = self.developer_page_end if more else None
+
+        def load(job):
+            developers.ensure_default_developers()
+            job.state["developers"] = developers.search_developers(prefix, after=after)
+
+        def on_done(job, error):
+            if error is None and search == self.developer_search:
+                self.show_developers(job.state["developers"], more)
+
+        self.developer_loader.submit(
+            Job("Load developers", [("Loading", load)], record=False), on_done
+        )
+
+    def show_developers(self, page, more):
+        items = [
+            {"name": developer.name, "email": developer.email} for developer in page
+        ]
+        loaded = []
+        if more:
+            # Keep the developers loaded so far, without the trailing entries.
+            loaded = [
+                {"name": row.name, "email": row.email}
+                for row in list(self.developer_dropdown_list.items)[:-2]
+            ]
+        if page:
+            self.developer_page_end = page[-1]
+        items = loaded + items
+        if len(page) == developers.PAGE_SIZE:
+            items.append(MORE_DEVELOPERS)
+        items.append(ADD_NEW_DEVELOPER)
+        self.developer_dropdown_list.items = items
+        if more:
+            # Select the first developer of the new page.
+            self.developer_dropdown_list.value = self.developer_dropdown_list.items[
+                len(loaded)
+            ]
+
+    def on_developer_search(self, widget):
+        self.load_developers()
+
+    def on_new_developer_name_entered(self, widget):
+        on_new_developer_name_entered(self, widget)
+
     def on_developer_selected(self, widget):
         selected_developer = self.developer_dropdown_list.value
-        if selected_developer:
-            selected_developer_name = selected_developer.name
-            selected_developer_email = selected_developer.email
-
-        if selected_developer_name == "Add New...":
-        # Add a new text input field for the developer's name
+        if selected_developer is None:
+            return
+
+        if selected_developer.name == MORE_DEVELOPERS["name"]:
+            # Load the next page of developers
+            self.load_developers(more=True)
+        elif selected_developer.name == ADD_NEW_DEVELOPER["name"]:
+            # Add a new text input field for the developer's name
             self.author_input.on_change = self.on_new_developer_name_entered
         else:
-        # Predefined developer selected
-            self.author_input.value = selected_developer_name
-            self.author_email_input.value = selected_developer_email
\ No newline at end of file
+            # Predefined developer selected
+            self.author_input.on_change = None
+            self.author_input.value = selected_developer.name
+            self.author_email_input.value = selected_developer.email
@@ -0,0 +1,79 @@
+import toga
+from toga.style import Pack
+from toga.style.pack import COLUMN, ROW
+from nadoo_launchpad.jobs import Job, JobRunner
+from nadoo_launchpad.scanner import scan_projects
+from nadoo_launchpad.utils import get_project_folder_path
+
+class ProjectListComponent(toga.Box):
+    def __init__(self, app:toga.App):
+        super().__init__(style=Pack(direction=COLUMN, padding=5))
+        self.app = app
+        self.job_runner = JobRunner(loop=app.loop)
+        self.projects = []
+
+        # Filter and refresh
+        self.search_input = toga.TextInput(
+            placeholder="Search projects", on_change=self.on_search, style=Pack(flex=1)
+        )
+        self.refresh_btn = toga.Button("Refresh", on_press=self.on_refresh)
+        self.add(
+            toga.Box(
+                children=[self.search_input, self.refresh_btn],
+                style=Pack(direction=ROW, padding=(5, 0)),
+            )
+        )
+
+        # The projects in the project folder
+        self.project_table = toga.Table(
+            headings=["Name", "App Name", "Bundle", "Path"],
+            accessors=["formal_name", "app_name", "bundle", "path"],
+            style=Pack(height=200, padding=(5, 0)),
+        )
+        self.status_label = toga.Label("", style=Pack(padding=(5, 0)))
+        self.add(self.project_table)
+        self.add(self.status_label)
+
+        self.refresh()
+
+    def refresh(self):
+        # Rescans are incremental, so they are cheap enough to run on demand.
+        if self.job_runner.busy:
+            return
+
+        def scan(job):
+            job.state["projects"] = scan_projects(
+                get_project_folder_path(), self.app.paths.cache
+            )
+
+        self.status_label.text = "Scanning project folder..."
+        self.job_runner.submit(
+            Job("Scan projects", [("Scanning", scan)], record=False),
+            on_done=self.on_scan_done,
+        )
+
+    def on_refresh(self, widget):
+        self.refresh()
+
+    def on_scan_done(self, job, error):
+        if error is not None:
+            self.status_label.text = f"Unable to scan the project folder: {error}"
+            return
+        self.projects = job.state["projects"]
+        self.show_projects()
+
+    def on_search(self, widget):
+        self.show_projects()
+
+    def show_projects(self):
+        search = self.search_input.value.strip().lower()
+        projects = [
+            project
+            for project in self.projects
+            if not search
+            or search in project["formal_name"].lower()
+            or search in project["app_name"]
+            or search in project["bundle"].lower()
+        ]
+        self.project_table.data = projects
+        self.status_label.text = f"{len(projects)} of {len(self.projects)} projects"
@@ -0,0 +1,64 @@
+import toga
+from toga.style import Pack
+from toga.style.pack import COLUMN, ROW
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.jobs import Job, JobRunner
+
+class TimingsComponent(toga.Box):
+    def __init__(self, app:toga.App):
+        super().__init__(style=Pack(direction=COLUMN, padding=5))
+        self.app = app
+        self.job_runner = JobRunner(loop=app.loop)
+
+        self.title_label = toga.Label("Step timings", style=Pack(flex=1))
+        self.refresh_btn = toga.Button("Refresh", on_press=self.on_refresh)
+        self.add(
+            toga.Box(
+                children=[self.title_label, self.refresh_btn],
+                style=Pack(direction=ROW, padding=(5, 0)),
+            )
+        )
+
+        # Percentiles of the step durations across all recorded runs
+        self.timings_table = toga.Table(
+            headings=["Step", "Runs", "Failed", "Median", "p90", "Max"],
+            accessors=["name", "count", "failed", "p50", "p90", "max"],
+            style=Pack(height=150, padding=(5, 0)),
+        )
+        self.add(self.timings_table)
+
+        self.refresh()
+
+    def refresh(self):
+        # The log can hold thousands of spans; read it off the UI thread.
+        if self.job_runner.busy:
+            return
+
+        def summarize(job):
+            job.state["summary"] = telemetry.read_summary(
+                self.app.paths.logs, kinds=["job", "step"]
+            )
+
+        self.job_runner.submit(
+            Job("Summarize timings", [("Summarizing", summarize)], record=False),
+            on_done=self.on_summary_done,
+        )
+
+    def on_refresh(self, widget):
+        self.refresh()
+
+    def on_summary_done(self, job, error):
+        if error is not None:
+            self.title_label.text = f"Step timings unavailable: {error}"
+            return
+        self.timings_table.data = [
+            {
+                "name": name,
+                "count": stats["count"],
+                "failed": stats["failed"],
+                "p50": f"{stats['p50']:.1f}s",
+                "p90": f"{stats['p90']:.1f}s",
+                "max": f"{stats['max']:.1f}s",
+            }
+            for name, stats in job.state["summary"].items()
+        ]
@@ -0,0 +1,53 @@
+"""Constants and data directories of the launcher.
+
+This module is imported while the launcher window is being built, so it only
+uses the standard library.
+"""
+import os
+import platform
+from pathlib import Path
+from types import SimpleNamespace
+
+# The settings file of older launchers; see settings_store.
+INSTALL_STATE_FILE = "install_state.toml"
+
+# Must match the app definition in pyproject.toml
+APP_NAME = "nadoo_launchpad"
+APP_ID = "de.nadooit.nadoo_launchpad"
+FORMAL_NAME = "NADOO Launchpad"
+AUTHOR = "Christoph Backhaus"
+
+
+def launcher_paths():
+    """The launcher's data directories when running without a Toga app.
+
+    These mirror the paths Toga assigns to ``app.paths`` on each platform, so
+    headless tools share caches and state with the GUI.
+
+    :returns: An object with ``config``, ``data``, ``cache`` and ``logs`` paths.
+    """
+    home = Path.home()
+    system = platform.system()
+    if system == "Darwin":
+        library = home / "Library"
+        return SimpleNamespace(
+            config=library / "Preferences" / APP_ID,
+            data=library / "Application Support" / APP_ID,
+            cache=library / "Caches" / APP_ID,
+            logs=library / "Logs" / APP_ID,
+        )
+    elif system == "Windows":
+        root = Path(os.environ.get("LOCALAPPDATA", home)) / AUTHOR / FORMAL_NAME
+        return SimpleNamespace(
+            config=root / "Config",
+            data=root / "Data",
+            cache=root / "Cache",
+            logs=root / "Logs",
+        )
+    else:
+        return SimpleNamespace(
+            config=home / ".config" / APP_NAME,
+            data=home / ".local" / "share" / APP_NAME,
+            cache=home / ".cache" / APP_NAME,
+            logs=home / ".cache" / APP_NAME / "log",
+        )
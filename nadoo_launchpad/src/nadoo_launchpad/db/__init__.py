@@ -0,0 +1,195 @@
+"""The launcher database.
+
+Django is configured on first use rather than at import, so only the code
+paths that need the database pay for it.
+
+The database is a SQLite file in the launcher's data directory (the app
+bundle can be read-only). Every connection is tuned for a single user
+desktop app: WAL, so readers never wait for the writer; synchronous=NORMAL,
+which is durable across app crashes and only fsyncs on checkpoints; and a
+memory mapped file for reads. Connections are kept open for the life of
+their thread, so GUI callbacks and job steps don't reconnect.
+
+A new database is a copy of ``schema.sqlite3``, an empty database with
+every migration applied that ships with the launcher; its schema version
+(the number of the latest migration) is kept in ``PRAGMA user_version``.
+Migrations only run when the database is behind the code. Rebuild the
+snapshot after adding a migration::
+
+    python -m nadoo_launchpad.db.snapshot
+"""
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from nadoo_launchpad.fileops import atomic_write
+from nadoo_launchpad.locks import FileLock
+
+SETTINGS_MODULE = "nadoo_launchpad.db.settings"
+DATABASE_FILE = "launchpad.sqlite3"
+SNAPSHOT_PATH = Path(__file__).with_name("schema.sqlite3")
+MIGRATIONS_PATH = Path(__file__).parent.parent / "migrations"
+
+# Applied to every new connection; NADOO_SQLITE_TUNING=0 turns them off
+# for comparison.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    # Negative sizes are in KiB
+    "cache_size": -16 * 1024,
+}
+
+# Rows per INSERT in bulk writes
+BULK_BATCH_SIZE = 500
+
+# Sorts after every character a name can contain.
+PREFIX_END = "\U0010ffff"
+
+_lock = threading.Lock()
+_ready = False
+_database_path = None
+
+
+def configure(data_dir):
+    """Put the database in a data directory (``app.paths.data``).
+
+    Must be called before the first database access.
+    """
+    global _database_path
+    _database_path = Path(data_dir) / DATABASE_FILE
+
+
+def database_path() -> Path:
+    """The database file.
+
+    ``NADOO_DATABASE`` overrides it, for tests and tools. Without a call to
+    ``configure``, the GUI's data directory is used.
+    """
+    if os.environ.get("NADOO_DATABASE"):
+        return Path(os.environ["NADOO_DATABASE"])
+    if _database_path is not None:
+        return _database_path
+    from nadoo_launchpad.config import launcher_paths
+
+    return launcher_paths().data / DATABASE_FILE
+
+
+def tune_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or os.environ.get("NADOO_SQLITE_TUNING") == "0":
+        return
+    with connection.cursor() as cursor:
+        for name, value in PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def schema_version():
+    """The schema version of the code: the number of its latest migration."""
+    return max(
+        int(name[:4]) for name in os.listdir(MIGRATIONS_PATH) if name[:4].isdigit()
+    )
+
+
+def read_schema_version(path):
+    """The schema version of a database file."""
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def install_snapshot(path):
+    """Create a database from the schema snapshot, unless it exists.
+
+    The caller must hold the database lock.
+    """
+    if path.exists():
+        return False
+    with open(SNAPSHOT_PATH, "rb") as snapshot, atomic_write(path, "wb") as database:
+        shutil.copyfileobj(snapshot, database)
+    return True
+
+
+def setup():
+    """Configure Django and make sure the schema is current.
+
+    Safe to call repeatedly, and from several threads and processes.
+    """
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if _ready:
+            return
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", SETTINGS_MODULE)
+
+        import django
+        from django.db.backends.signals import connection_created
+
+        path = database_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection_created.connect(tune_connection)
+        django.setup()
+
+        with FileLock(path.with_name(f"{path.name}.lock")):
+            install_snapshot(path)
+            if read_schema_version(path) < schema_version():
+                migrate()
+        _ready = True
+
+
+def migrate():
+    """Apply the pending migrations, and record the new schema version."""
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command("migrate", verbosity=0, interactive=False)
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA user_version = {schema_version()}")
+
+
+def prefix_filter(field, prefix):
+    """A filter for values of ``field`` starting with ``prefix``.
+
+    ``__startswith`` becomes a ``LIKE`` that SQLite can't answer from a
+    case sensitive index; a range over the same values can.
+    """
+    from django.db.models import Q
+
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END})
+
+
+def bulk_write(model, objects, unique_fields=None, update_fields=None, batch_size=BULK_BATCH_SIZE):
+    """Insert many rows in one transaction.
+
+    Autocommitting every row costs a commit (and, without WAL, an fsync)
+    per row; batches are written as multi-row INSERTs in one transaction.
+
+    :param model: The model class.
+    :param objects: Unsaved model instances. ``save()`` isn't called, so
+        derived fields must already be set.
+    :param unique_fields: With ``update_fields``, rows conflicting on these
+        fields are updated instead of inserted.
+    :param update_fields: The fields to update on a conflict.
+    :param batch_size: Rows per INSERT.
+    :returns: The number of rows written.
+    """
+    setup()
+    from django.db import transaction
+
+    objects = list(objects)
+    options = {}
+    if update_fields:
+        options = {
+            "update_conflicts": True,
+            "unique_fields": unique_fields,
+            "update_fields": update_fields,
+        }
+    with transaction.atomic():
+        model.objects.bulk_create(objects, batch_size=batch_size, **options)
+    return len(objects)
@@ -10,7 +10,7 @@ def main():
 
     sys.dont_write_bytecode = True
 
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "nadoo_launchpad.db.settings")
 
     import django
 
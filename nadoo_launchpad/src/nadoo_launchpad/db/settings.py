@@ -3,6 +3,8 @@ from pathlib import Path
 import django
 from dotenv import load_dotenv
 
+from nadoo_launchpad.db import database_path
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = Path(__file__).resolve().parent
 ENV_FILE = Path(__file__).resolve() / ".env"
@@ -20,7 +22,14 @@ DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db", "db.sqlite3"),
+        # In the launcher's data directory; see nadoo_launchpad.db
+        "NAME": str(database_path()),
+        # Keep connections open; the pragmas are set once per connection.
+        "CONN_MAX_AGE": None,
+        "OPTIONS": {
+            # Seconds to wait for another process to finish writing
+            "timeout": 20,
+        },
     }
 }
 
@@ -42,4 +51,4 @@ DATABASES = {
 }
 """
 
-INSTALLED_APPS = ("db",)
+INSTALLED_APPS = ("nadoo_launchpad",)
@@ -0,0 +1,44 @@
+"""Rebuild the schema snapshot new databases are copied from.
+
+Run after adding a migration::
+
+    python -m nadoo_launchpad.db.snapshot
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from nadoo_launchpad import db
+
+
+def build_snapshot(target=db.SNAPSHOT_PATH):
+    """Migrate an empty database, and save it as the snapshot.
+
+    Runs Django against a temporary database, so it must run in a process
+    that hasn't used the launcher database yet.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / db.DATABASE_FILE
+        os.environ["NADOO_DATABASE"] = str(path)
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", db.SETTINGS_MODULE)
+
+        import django
+        from django.db import connections
+
+        django.setup()
+        db.migrate()
+        connections.close_all()
+
+        # A single, compact file
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode = DELETE")
+        connection.execute("VACUUM")
+        connection.close()
+        shutil.copyfile(path, target)
+    return target
+
+
+if __name__ == "__main__":
+    print(f"Wrote {build_snapshot()} (schema version {db.schema_version()})")
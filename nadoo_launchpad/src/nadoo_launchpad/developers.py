@@ -0,0 +1,217 @@
+"""Directory of the developers that can author projects.
+
+Developers live in the launcher database. The directory can be filled from
+a CSV file with ``name`` and ``email`` columns, or from an LDIF export of
+the company directory (``cn`` or ``displayName``, and ``mail``)::
+
+    python -m nadoo_launchpad.developers import team.csv
+    python -m nadoo_launchpad.developers import people.ldif
+
+Names are searched by case insensitive prefix, and read a page at a time,
+so the UI never loads the whole directory.
+"""
+import argparse
+import base64
+import csv
+from pathlib import Path
+
+from nadoo_launchpad import db
+from nadoo_launchpad.db import prefix_filter
+
+# Developers loaded into the UI at a time
+PAGE_SIZE = 50
+
+# The developers of a new installation
+DEFAULT_DEVELOPERS = [
+    ("Christoph Backhaus", "christoph.backhaus@nadooit.de"),
+    ("Laurin Kochwasser", "laurin.kochwasser@nadooit.de"),
+]
+
+# LDIF attributes holding a developer's name, in order of preference
+LDIF_NAME_ATTRIBUTES = ("displayname", "cn")
+
+
+class DeveloperFileError(Exception):
+    """A developer file can't be imported."""
+
+
+def read_csv(path):
+    """Read developers from a CSV file with ``name`` and ``email`` columns.
+
+    :returns: A list of ``(name, email)`` pairs.
+    :raises DeveloperFileError: If the file doesn't have the columns.
+    """
+    with open(path, "r", newline="", encoding="utf-8-sig") as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if "name" not in columns or "email" not in columns:
+            raise DeveloperFileError(f"{path} needs 'name' and 'email' columns")
+        return [
+            (row[columns["name"]].strip(), row[columns["email"]].strip())
+            for row in reader
+        ]
+
+
+def _ldif_records(lines):
+    """Split LDIF lines into records of unfolded ``(attribute, value)`` pairs."""
+    record = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith(" ") and record:
+            # A folded line continues the previous value.
+            attribute, value = record[-1]
+            record[-1] = (attribute, value + line[1:])
+        elif not line:
+            if record:
+                yield record
+            record = []
+        elif not line.startswith("#"):
+            record.append(tuple(line.split(":", 1)) if ":" in line else (line, ""))
+    if record:
+        yield record
+
+
+def read_ldif(path):
+    """Read developers from an LDIF file.
+
+    Entries without a ``mail`` attribute are skipped.
+
+    :returns: A list of ``(name, email)`` pairs.
+    """
+    developers = []
+    with open(path, "r", encoding="utf-8") as ldif_file:
+        for record in _ldif_records(ldif_file):
+            attributes = {}
+            for attribute, value in record:
+                if value.startswith(":"):
+                    # attribute:: base64 encoded value
+                    value = base64.b64decode(value[1:].strip()).decode("utf-8")
+                attributes.setdefault(attribute.strip().lower(), value.strip())
+            name = next(
+                (attributes[key] for key in LDIF_NAME_ATTRIBUTES if key in attributes),
+                None,
+            )
+            if name and attributes.get("mail"):
+                developers.append((name, attributes["mail"]))
+    return developers
+
+
+def read_developers(path):
+    """Read developers from a CSV or LDIF file, by extension."""
+    path = Path(path)
+    if path.suffix.lower() == ".ldif":
+        return read_ldif(path)
+    return read_csv(path)
+
+
+def import_developers(developers, batch_size=db.BULK_BATCH_SIZE):
+    """Add developers to the directory, updating the names of known emails.
+
+    :param developers: ``(name, email)`` pairs. Emails are matched case
+        insensitively; the last name for an email wins.
+    :returns: The number of developers written.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Developer
+
+    by_email = {}
+    for name, email in developers:
+        if name and email:
+            by_email[email.lower()] = name
+    # bulk_write bypasses save(), so the search key is set here.
+    return db.bulk_write(
+        Developer,
+        (
+            Developer(name=name, email=email, search_name=Developer.search_key(name))
+            for email, name in by_email.items()
+        ),
+        unique_fields=["email"],
+        update_fields=["name", "search_name"],
+        batch_size=batch_size,
+    )
+
+
+def add_developer(name, email):
+    """Add a developer to the directory, or rename a known one.
+
+    :returns: The ``Developer``.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Developer
+
+    developer, _ = Developer.objects.update_or_create(
+        email=email.lower(), defaults={"name": name}
+    )
+    return developer
+
+
+def ensure_default_developers():
+    """Fill an empty directory with the default developers."""
+    db.setup()
+    from nadoo_launchpad.models import Developer
+
+    if not Developer.objects.exists():
+        import_developers(DEFAULT_DEVELOPERS)
+
+
+def search_developers(prefix="", after=None, limit=PAGE_SIZE):
+    """A page of developers whose name starts with a prefix.
+
+    Pages are read from the (search_name, email) index, continuing after
+    the last developer of the previous page, so every page costs the same
+    however deep into the directory it is.
+
+    :param prefix: The start of the name, in any case.
+    :param after: The last developer of the previous page.
+    :param limit: The page size.
+    :returns: A list of ``Developer``, ordered by name.
+    """
+    db.setup()
+    from django.db.models import Q
+    from nadoo_launchpad.models import Developer
+
+    developers = Developer.objects.all()
+    if prefix:
+        developers = developers.filter(
+            prefix_filter("search_name", Developer.search_key(prefix))
+        )
+    if after is not None:
+        developers = developers.filter(
+            Q(search_name__gt=after.search_name)
+            | Q(search_name=after.search_name, email__gt=after.email)
+        )
+    return list(developers[:limit])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m nadoo_launchpad.developers",
+        description="Manage the launcher's developer directory.",
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser(
+        "import", help="Import developers from a CSV or LDIF file."
+    )
+    import_parser.add_argument("file", type=Path, help="The CSV or LDIF file.")
+    search_parser = subcommands.add_parser(
+        "search", help="List the developers whose name starts with a prefix."
+    )
+    search_parser.add_argument("prefix", nargs="?", default="")
+    options = parser.parse_args(argv)
+
+    if options.command == "import":
+        try:
+            developers = read_developers(options.file)
+        except (OSError, DeveloperFileError, ValueError) as e:
+            parser.error(str(e))
+        print(f"Imported {import_developers(developers)} developers")
+    else:
+        after = None
+        while page := search_developers(options.prefix, after=after):
+            for developer in page:
+                print(f"{developer.name} <{developer.email}>")
+            after = page[-1]
+
+
+if __name__ == "__main__":
+    main()
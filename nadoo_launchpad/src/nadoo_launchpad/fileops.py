@@ -0,0 +1,122 @@
+"""Cheap ways to materialize copies of cached files, and to replace files
+atomically."""
+import os
+import platform
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# Linux ioctl to share the extents of a file (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def reflink(src, dst):
+    """Create ``dst`` as a copy-on-write clone of ``src``.
+
+    :returns: True if the filesystem supports reflinks.
+    """
+    system = platform.system()
+    if system == "Linux":
+        import fcntl
+
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                reflinked = False
+            else:
+                reflinked = True
+        if not reflinked:
+            os.unlink(dst)
+        return reflinked
+    elif system == "Darwin":
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    return False
+
+
+def copy_file_range(src, dst):
+    """Copy a file in the kernel, without passing the data through Python."""
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        remaining = os.fstat(src_file.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src_file.fileno(), dst_file.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+class Linker:
+    def __init__(self, hardlinks=True):
+        """Materialize files with the cheapest mechanism the filesystem offers.
+
+        Reflinks are tried first, then hardlinks, then an in-kernel copy.
+        Once a mechanism fails it isn't tried again for later files.
+
+        :param hardlinks: Allow hardlinks. Hardlinked files share their
+            content, so only use them for files nobody edits in place.
+        """
+        self.reflinks = True
+        self.hardlinks = hardlinks
+        self.copy_file_range = hasattr(os, "copy_file_range")
+
+    def __call__(self, src, dst):
+        if self.reflinks:
+            if reflink(src, dst):
+                return
+            self.reflinks = False
+        if self.hardlinks:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                # e.g. the target is on another device
+                self.hardlinks = False
+        if self.copy_file_range:
+            try:
+                copy_file_range(src, dst)
+                shutil.copystat(src, dst)
+                return
+            except OSError:
+                self.copy_file_range = False
+        shutil.copy2(src, dst)
+
+
+@contextmanager
+def atomic_write(path, mode="w", permissions=None, fsync=False, **kwargs):
+    """Replace a file with what is written in the block, atomically.
+
+    The content is written to a temporary file next to ``path``, which
+    replaces ``path`` once the block finishes. Readers, even in other
+    processes, see the old or the new content, never a partial file. If the
+    block raises, ``path`` is left alone.
+
+    :param path: The file to write.
+    :param mode: ``"w"`` or ``"wb"``.
+    :param permissions: The mode bits of the new file, e.g. those of the
+        file it replaces. Default: as ``open`` creates files.
+    :param fsync: Flush the content to disk before the file is replaced.
+    :param kwargs: Passed on to ``open``.
+    :returns: The open temporary file.
+    """
+    path = Path(path)
+    # Unique per thread, so concurrent writers never share a temporary file.
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, mode, **kwargs) as temp_file:
+            yield temp_file
+            if fsync:
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        if permissions is not None:
+            os.chmod(temp_path, permissions)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
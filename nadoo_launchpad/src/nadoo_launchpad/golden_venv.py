@@ -0,0 +1,160 @@
+"""Prebuilt "golden" virtual environments for new projects.
+
+A golden venv is built once per (interpreter, Briefcase version) under
+``<cache>/golden-venvs``. Project venvs are cloned from it: files are
+reflinked where the filesystem supports it and hardlinked otherwise, and
+only the few files that contain the venv's own path (``pyvenv.cfg``, the
+activate scripts and the shebangs of console scripts) are rewritten.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from nadoo_launchpad import interpreters, telemetry, wheelhouse
+from nadoo_launchpad.fileops import Linker
+from nadoo_launchpad.locks import FileLock
+from nadoo_launchpad.supervisor import run_command
+
+GOLDEN_VENV_DIR = "golden-venvs"
+METADATA_FILE = ".golden.json"
+
+
+def interpreter_version(python_path):
+    """The version of a Python interpreter, e.g. ``3.11.7``."""
+    return interpreters.interpreter_version(python_path)
+
+
+def golden_venv_path(cache_dir, python_path, python_version, briefcase_version) -> Path:
+    """The golden venv for an interpreter and Briefcase version.
+
+    Two interpreters with the same version (e.g. a pyenv and a system 3.11.7)
+    get separate golden venvs, because the venv is tied to its interpreter.
+    """
+    interpreter = hashlib.sha256(
+        os.path.realpath(python_path).encode()
+    ).hexdigest()[:8]
+    return (
+        Path(cache_dir)
+        / GOLDEN_VENV_DIR
+        / f"py{python_version}-{interpreter}-briefcase-{briefcase_version}"
+    )
+
+
+def read_metadata(golden_path):
+    try:
+        with open(Path(golden_path) / METADATA_FILE, "r") as metadata_file:
+            return json.load(metadata_file)
+    except FileNotFoundError:
+        return None
+
+
+def build_golden_venv(python_path, cache_dir, briefcase_version, run=run_command):
+    """Build the golden venv for an interpreter, unless it already exists.
+
+    The venv is built in a temporary directory and renamed into place; the
+    path it was built at is recorded so clones know which paths to rewrite.
+    Builds hold a lock per golden venv, so concurrent callers (the warmer,
+    project creation, batch runs) wait for a single build.
+
+    :param python_path: The interpreter for the venv.
+    :param cache_dir: The launcher cache directory (``app.paths.cache``).
+    :param briefcase_version: The Briefcase version to install.
+    :param run: Runs a command; a job's ``run_command`` streams its output
+        to the UI.
+    :returns: The path to the golden venv.
+    """
+    python_version = interpreter_version(python_path)
+    target = golden_venv_path(cache_dir, python_path, python_version, briefcase_version)
+    if read_metadata(target) is not None:
+        return target
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(target.parent / f".{target.name}.lock"):
+        # Another launcher may have built it while we waited.
+        if read_metadata(target) is None:
+            _build(python_path, python_version, target, cache_dir, briefcase_version, run)
+    return target
+
+
+def _build(python_path, python_version, target, cache_dir, briefcase_version, run):
+    """Build a golden venv; the caller holds its lock."""
+    build_path = Path(tempfile.mkdtemp(prefix=f".{target.name}-", dir=target.parent))
+    try:
+        run([str(python_path), "-m", "venv", str(build_path)])
+        wheelhouse.install_briefcase(
+            str(build_path / "bin" / "pip"),
+            cache_dir,
+            briefcase_version,
+            run=run,
+        )
+        with open(build_path / METADATA_FILE, "w") as metadata_file:
+            json.dump(
+                {
+                    "built_at": str(build_path),
+                    "python": str(python_path),
+                    "python_version": python_version,
+                    "briefcase_version": briefcase_version,
+                },
+                metadata_file,
+            )
+        # A venv left behind by an interrupted build has no metadata.
+        shutil.rmtree(target, ignore_errors=True)
+        build_path.rename(target)
+    finally:
+        shutil.rmtree(build_path, ignore_errors=True)
+
+
+def _rewrite(src, dst, replacements):
+    with open(src, "rb") as src_file:
+        content = src_file.read()
+    for old, new in replacements:
+        content = content.replace(old, new)
+    with open(dst, "wb") as dst_file:
+        telemetry.add("bytes_written", dst_file.write(content))
+    shutil.copymode(src, dst)
+
+
+def clone_venv(golden_path, target):
+    """Materialize a project venv from a golden venv.
+
+    :param golden_path: The golden venv.
+    :param target: Where to create the project venv. Must not exist.
+    :returns: The path to the new venv.
+    """
+    golden_path = Path(golden_path)
+    target = Path(target).absolute()
+    built_at = read_metadata(golden_path)["built_at"]
+    replacements = [
+        (os.fsencode(built_at), os.fsencode(str(target))),
+        # The prompt in the activate scripts is the venv's directory name.
+        (
+            f"({Path(built_at).name}) ".encode(),
+            f"({target.name}) ".encode(),
+        ),
+    ]
+    linker = Linker()
+
+    target.mkdir(parents=True)
+    for dirpath, dirnames, filenames in os.walk(golden_path):
+        relative = Path(dirpath).relative_to(golden_path)
+        is_bin = relative.parts[:1] in (("bin",), ("Scripts",))
+        for name in dirnames + filenames:
+            src = Path(dirpath) / name
+            dst = target / relative / name
+            if src.is_symlink():
+                link = os.readlink(src)
+                if link.startswith(built_at):
+                    link = str(target) + link[len(built_at):]
+                os.symlink(link, dst)
+            elif name in dirnames:
+                dst.mkdir()
+            elif relative == Path(".") and name == METADATA_FILE:
+                continue
+            elif (relative == Path(".") and name == "pyvenv.cfg") or is_bin:
+                _rewrite(src, dst, replacements)
+            else:
+                linker(src, dst)
+    return target
@@ -0,0 +1,399 @@
+"""Discovery of the Python interpreters on this machine.
+
+``pyenv which`` and ``pyenv versions`` start a chain of shell shims that
+costs hundreds of milliseconds per call. Everything they report can be read
+from the filesystem directly:
+
+* the pyenv interpreters are ``$PYENV_ROOT/versions/<version>/bin/python``;
+* the selected pyenv version is ``$PYENV_VERSION``, the nearest
+  ``.python-version`` file, or ``$PYENV_ROOT/version``;
+* ``system`` is the first ``python3`` on ``PATH`` behind pyenv's shims;
+* other interpreters are the ``python3.X`` executables on ``PATH``.
+
+An interpreter's version is read from the ``patchlevel.h`` header it was
+built with; interpreters without headers are asked once. The discovered
+interpreters are cached in ``<cache>/interpreters.json``, together with the
+mtimes of the directories they were found in, so discovery only lists
+directories again after an interpreter was installed or removed.
+
+pyenv itself is only called if nothing was found.
+"""
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+from nadoo_launchpad.config import launcher_paths
+from nadoo_launchpad.fileops import atomic_write
+from nadoo_launchpad.supervisor import Supervisor
+
+CACHE_FILE = "interpreters.json"
+CACHE_VERSION = 1
+
+# The interpreter the launcher installs with pyenv
+DEFAULT_VERSION = "3.11.7"
+
+# Seconds an interpreter or pyenv may take to answer a query
+QUERY_TIMEOUT = 30
+
+VERSION_FILE = ".python-version"
+VERSION_RE = re.compile(r"(\d+)(?:\.(\d+))?(?:\.(\d+))?")
+EXECUTABLE_RE = re.compile(r"python(3(\.\d+)?)?(\.exe)?", re.IGNORECASE)
+PATCHLEVEL_RE = re.compile(rb'#define\s+PY_VERSION\s+"([^"]+)"')
+
+
+class InterpreterNotFound(Exception):
+    """No interpreter matches the requested version."""
+
+
+def pyenv_root() -> Path:
+    root = os.environ.get("PYENV_ROOT")
+    return Path(root) if root else Path.home() / ".pyenv"
+
+
+def parse_version(text):
+    """Parse a final release version, e.g. ``3.11.7`` or ``3.11``.
+
+    :returns: A tuple of ints, or ``None`` for anything else (``system``,
+        ``3.13.0rc1``, ``pypy3.10``).
+    """
+    match = VERSION_RE.fullmatch(text.strip())
+    if match is None:
+        return None
+    return tuple(int(part) for part in match.groups() if part is not None)
+
+
+def version_matches(version, spec):
+    """Whether a version satisfies a spec.
+
+    :param version: A version string, e.g. ``3.11.7``.
+    :param spec: A version prefix (``3``, ``3.11``, ``3.11.7``), optionally
+        prefixed by ``>=``; ``None`` matches every version.
+    """
+    if spec is None:
+        return True
+    parsed = parse_version(version)
+    if parsed is None:
+        return False
+    if spec.startswith(">="):
+        return parsed >= parse_version(spec[2:])
+    wanted = parse_version(spec)
+    return wanted is not None and parsed[: len(wanted)] == wanted
+
+
+def _executables(directory):
+    """The Python executables directly inside a directory."""
+    if platform.system() == "Windows":
+        names = ["python.exe"]
+    else:
+        names = ["python3", "python"]
+    for name in names:
+        path = Path(directory) / name
+        if os.access(path, os.X_OK) and path.is_file():
+            return path
+    return None
+
+
+def _patchlevel_version(python_path):
+    """The version from the interpreter's headers, or ``None``."""
+    real_path = Path(os.path.realpath(python_path))
+    # <prefix>/bin/python3.11, or <prefix>/python.exe on Windows
+    prefix = real_path.parent.parent if real_path.parent.name == "bin" else real_path.parent
+    include = prefix / "include"
+    match = re.fullmatch(r"python(\d+\.\d+)", real_path.name)
+    try:
+        candidates = [
+            entry.path
+            for entry in os.scandir(include)
+            if entry.name.startswith("python")
+            and (match is None or entry.name.startswith(f"python{match.group(1)}"))
+        ]
+    except OSError:
+        candidates = []
+    if include.is_dir() and (include / "patchlevel.h").exists():
+        # Windows keeps the headers directly in include.
+        candidates.append(include)
+    if len(candidates) != 1:
+        # No headers, or several interpreters share the prefix.
+        return None
+    try:
+        with open(Path(candidates[0]) / "patchlevel.h", "rb") as header:
+            found = PATCHLEVEL_RE.search(header.read())
+    except OSError:
+        return None
+    return found.group(1).decode() if found else None
+
+
+def interpreter_version(python_path, cache=None):
+    """The version of an interpreter, e.g. ``3.11.7``.
+
+    :param python_path: The interpreter.
+    :param cache: A dict of earlier results; the interpreter is only asked
+        if the cached entry doesn't match its mtime and size.
+    """
+    real_path = os.path.realpath(python_path)
+    stat = os.stat(real_path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    if cache is not None:
+        cached = cache.get(real_path)
+        if cached is not None and cached["stamp"] == stamp:
+            return cached["version"]
+
+    version = _patchlevel_version(python_path)
+    if version is None:
+        supervisor = Supervisor()
+        supervisor.run(
+            [python_path, "-c", "import platform; print(platform.python_version())"],
+            timeout=QUERY_TIMEOUT,
+        )
+        version = supervisor.output[-1].strip()
+    if cache is not None:
+        cache[real_path] = {"stamp": stamp, "version": version}
+    return version
+
+
+def _dir_mtime(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _search_dirs():
+    """The directories to search, with pyenv's versions first.
+
+    pyenv's shims are skipped; they are the slow path discovery avoids.
+    """
+    root = pyenv_root()
+    shims = os.path.realpath(root / "shims")
+    dirs = [str(root / "versions")]
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if directory and os.path.realpath(directory) != shims and directory not in dirs:
+            dirs.append(directory)
+    return dirs
+
+
+def _scan(dirs, versions):
+    interpreters = []
+    seen = set()
+
+    def found(path, source, name=None):
+        real_path = os.path.realpath(path)
+        if real_path in seen:
+            return
+        seen.add(real_path)
+        try:
+            version = interpreter_version(path, versions)
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            # Broken, or hangs
+            return
+        interpreters.append(
+            {"version": version, "path": str(path), "source": source, "name": name}
+        )
+
+    # $PYENV_ROOT/versions/<name>/bin/python
+    try:
+        entries = sorted(os.scandir(dirs[0]), key=lambda entry: entry.name)
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.is_dir():
+            python = _executables(Path(entry.path) / "bin") or _executables(entry.path)
+            if python is not None:
+                found(python, "pyenv", entry.name)
+
+    for directory in dirs[1:]:
+        try:
+            names = sorted(
+                entry.name
+                for entry in os.scandir(directory)
+                if EXECUTABLE_RE.fullmatch(entry.name)
+            )
+        except OSError:
+            continue
+        # python3.11 before python3 before python; they are often the same.
+        for name in sorted(names, key=len, reverse=True):
+            path = Path(directory) / name
+            if os.access(path, os.X_OK) and path.is_file():
+                found(path, "path")
+    return interpreters
+
+
+_cache_lock = threading.Lock()
+_memory_cache = {}
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, "r") as cache_file:
+            cache = json.load(cache_file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if cache.get("version") != CACHE_VERSION:
+        return None
+    return cache
+
+
+def _save_cache(cache_path, cache):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(cache_path) as cache_file:
+        json.dump(cache, cache_file)
+
+
+def find_interpreters(cache_dir=None):
+    """Every interpreter on this machine.
+
+    :param cache_dir: The launcher cache directory; defaults to the
+        launcher's own.
+    :returns: A list of dicts with ``version``, ``path``, ``source``
+        (``pyenv`` or ``path``) and ``name`` (the pyenv version name); pyenv
+        interpreters first.
+    """
+    cache_path = Path(cache_dir or launcher_paths().cache) / CACHE_FILE
+    dirs = _search_dirs()
+    mtimes = {directory: _dir_mtime(directory) for directory in dirs}
+
+    with _cache_lock:
+        cache = _memory_cache.get(cache_path) or _load_cache(cache_path)
+        if cache is not None and cache["dirs"] == mtimes:
+            _memory_cache[cache_path] = cache
+            return list(cache["interpreters"])
+
+        versions = cache["versions"] if cache is not None else {}
+        cache = {
+            "version": CACHE_VERSION,
+            "dirs": mtimes,
+            "interpreters": _scan(dirs, versions),
+            "versions": versions,
+        }
+        _memory_cache[cache_path] = cache
+        try:
+            _save_cache(cache_path, cache)
+        except OSError:
+            # A read-only cache only costs a rescan.
+            pass
+        return list(cache["interpreters"])
+
+
+def selected_pyenv_version(cwd=None):
+    """The pyenv version selected for a directory, as pyenv resolves it.
+
+    :returns: The first version name, or ``None`` if nothing is selected.
+    """
+    selected = os.environ.get("PYENV_VERSION")
+    if selected:
+        return selected.split(":")[0]
+
+    directory = Path(cwd or os.getcwd()).absolute()
+    version_files = [parent / VERSION_FILE for parent in [directory, *directory.parents]]
+    version_files.append(pyenv_root() / "version")
+    for version_file in version_files:
+        try:
+            with open(version_file, "r") as file:
+                for line in file:
+                    name = line.split("#")[0].strip()
+                    if name:
+                        return name
+        except OSError:
+            continue
+    return None
+
+
+def pyenv_version_installed(version):
+    """Whether pyenv has installed a version; ``pyenv versions`` without pyenv."""
+    versions = pyenv_root() / "versions" / version
+    return (_executables(versions / "bin") or _executables(versions)) is not None
+
+
+def set_global_pyenv_version(version):
+    """Select a version for every directory; ``pyenv global`` without pyenv."""
+    root = pyenv_root()
+    root.mkdir(parents=True, exist_ok=True)
+    with atomic_write(root / "version") as version_file:
+        version_file.write(f"{version}\n")
+
+
+def _pyenv_which():
+    pyenv = shutil.which("pyenv")
+    if pyenv is None:
+        return None
+    supervisor = Supervisor()
+    try:
+        supervisor.run([pyenv, "which", "python"], timeout=QUERY_TIMEOUT)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    return supervisor.output[-1].strip()
+
+
+def system_python():
+    """The interpreter of pyenv's ``system`` version, or ``None``."""
+    # PATH without pyenv's shims
+    path = os.pathsep.join(_search_dirs()[1:])
+    names = ["python"] if platform.system() == "Windows" else ["python3", "python"]
+    for name in names:
+        python = shutil.which(name, path=path)
+        if python is not None:
+            return python
+    return None
+
+
+def find_python(spec=None, cwd=None, cache_dir=None, default=None):
+    """The best interpreter for a version spec.
+
+    Without a spec, the interpreter pyenv would run in ``cwd`` is used:
+    the selected pyenv version, or the ``PATH`` interpreter for ``system``
+    and when nothing is selected. If the selection isn't installed,
+    ``default`` or else ``DEFAULT_VERSION`` is used; never just any
+    interpreter.
+
+    With a spec, the newest matching interpreter wins; pyenv interpreters
+    win ties with ``PATH`` interpreters of the same version.
+
+    :param spec: A version spec (see ``version_matches``).
+    :param cwd: The directory whose ``.python-version`` applies.
+    :param cache_dir: The launcher cache directory.
+    :param default: The interpreter to fall back to without a spec, e.g.
+        ``settings["interpreters"]["default"]``.
+    :returns: The path to the interpreter.
+    :raises InterpreterNotFound: If no interpreter matches.
+    """
+    interpreters = find_interpreters(cache_dir)
+    selection = spec is None
+    if selection:
+        selected = selected_pyenv_version(cwd)
+        if selected is None or selected == "system":
+            python = system_python()
+            if python is not None:
+                return python
+        for interpreter in interpreters:
+            if interpreter["source"] == "pyenv" and interpreter["name"] == selected:
+                return interpreter["path"]
+        if default and os.access(default, os.X_OK):
+            return default
+        spec = DEFAULT_VERSION
+
+    matching = [
+        interpreter
+        for interpreter in interpreters
+        if parse_version(interpreter["version"]) is not None
+        and version_matches(interpreter["version"], spec)
+    ]
+    if matching:
+        best = max(
+            matching,
+            key=lambda interpreter: (
+                parse_version(interpreter["version"]),
+                interpreter["source"] == "pyenv",
+            ),
+        )
+        return best["path"]
+
+    # Last resort: an install discovery doesn't understand
+    python = _pyenv_which() if selection else None
+    if python:
+        return python
+    raise InterpreterNotFound(f"No Python {spec} found")
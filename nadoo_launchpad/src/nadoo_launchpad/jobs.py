@@ -0,0 +1,230 @@
+"""Background jobs for long running launcher tasks.
+
+A job is an ordered list of named steps. Jobs run on a worker thread so the
+Toga event loop never blocks on a subprocess; progress updates and subprocess
+output are handed back to the UI thread through the app's event loop.
+"""
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.supervisor import Supervisor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled."""
+
+
+def _call_directly(callback, *args):
+    callback(*args)
+
+
+class Job:
+    def __init__(
+        self,
+        name,
+        steps,
+        state=None,
+        on_progress=None,
+        on_output=None,
+        timeouts=None,
+        span_name=None,
+        attributes=None,
+        record=True,
+    ):
+        """A cancellable sequence of steps.
+
+        :param name: A human readable name for the job.
+        :param steps: A list of ``(label, step)`` pairs. Each step is called
+            with the job as its only argument.
+        :param state: Initial shared state for the steps. Steps read their
+            inputs from, and store their results in, ``job.state``.
+        :param on_progress: Called with ``(step_index, step_count, label)``
+            before every step, and once more when the job has finished.
+        :param on_output: Called with every line of output a step produces.
+        :param timeouts: Seconds each step may take, by label. The commands a
+            step runs are killed once its time is up.
+        :param span_name: The name the runs of the job are aggregated under
+            in the timings. Default: ``name``; jobs whose name differs per
+            run (e.g. by app name) need a stable one.
+        :param attributes: Extra values to record with the job's span.
+        :param record: Record the timings of the job; False for the UI's own
+            housekeeping jobs.
+        """
+        self.name = name
+        self.span_name = span_name or name
+        self.attributes = dict(attributes or {})
+        self.record = record
+        self.steps = list(steps)
+        self.state = dict(state or {})
+        self.timeouts = dict(timeouts or {})
+        # (label, seconds) for every step that has finished
+        self.timings = []
+        self.on_progress = on_progress
+        self.on_output = on_output
+        # Replaced by the JobRunner so callbacks run on the UI thread.
+        self.dispatch = _call_directly
+        self._cancelled = threading.Event()
+        self._deadline = None
+        self.supervisor = Supervisor(on_output=self.report, cancelled=self._cancelled)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def output(self):
+        """The last lines of output of the job's commands."""
+        return list(self.supervisor.output)
+
+    def cancel(self):
+        """Cancel the job, killing the commands of the running step."""
+        self.supervisor.cancel()
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.name)
+
+    def report(self, line):
+        """Send a line of output to the UI."""
+        if self.on_output is not None:
+            self.dispatch(self.on_output, line)
+
+    def _progress(self, index, total, label):
+        if self.on_progress is not None:
+            self.dispatch(self.on_progress, index, total, label)
+
+    def _span(self, name, **attributes):
+        if not self.record:
+            # A span of its own, never written to the log
+            return nullcontext(telemetry.Span(name, attributes=attributes))
+        return telemetry.span(name, **attributes)
+
+    def run(self):
+        """Run all steps on the calling thread.
+
+        :returns: The job state after the last step.
+        """
+        total = len(self.steps)
+        with self._span(self.span_name, kind="job", **self.attributes) as job_span:
+            try:
+                for index, (label, step) in enumerate(self.steps):
+                    self.check_cancelled()
+                    self._progress(index, total, label)
+                    start = time.perf_counter()
+                    timeout = self.timeouts.get(label)
+                    self._deadline = None if timeout is None else time.monotonic() + timeout
+                    with self._span(label, kind="step", job=self.span_name) as step_span:
+                        try:
+                            step(self)
+                        except JobCancelled:
+                            step_span.status = "cancelled"
+                            raise
+                        finally:
+                            self._deadline = None
+                    self.timings.append((label, time.perf_counter() - start))
+            except JobCancelled:
+                job_span.status = "cancelled"
+                raise
+        self._progress(total, total, "Done")
+        return self.state
+
+    def run_command(self, args, cwd=None, env=None, timeout=None, retries=0):
+        """Run a subprocess, streaming its output line by line.
+
+        The subprocess and everything it started are killed if the job is
+        cancelled, or the step runs out of time. Steps may call this from
+        several threads at once.
+
+        :param args: The command to run.
+        :param cwd: The working directory for the command.
+        :param env: The environment for the command.
+        :param timeout: Seconds the command may take; never longer than
+            what is left of the step's timeout.
+        :param retries: How often to retry a failing command, with backoff;
+            for commands that use the network.
+        :raises subprocess.CalledProcessError: If the command fails.
+        :raises subprocess.TimeoutExpired: If the command runs out of time.
+        """
+        self.check_cancelled()
+        deadline = self._deadline
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            return self.supervisor.run(
+                args, cwd=cwd, env=env, timeout=timeout, retries=retries
+            )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            # Killed because the job was cancelled
+            self.check_cancelled()
+            raise
+
+
+class JobRunner:
+    def __init__(self, loop=None, max_workers=1):
+        """Run jobs on a thread pool.
+
+        :param loop: The asyncio loop of the UI thread (``app.loop``). Job
+            callbacks are scheduled on it. If ``None``, callbacks are called
+            directly on the worker thread.
+        :param max_workers: The number of jobs that can run at the same time.
+        """
+        self.loop = loop
+        self.current = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="nadoo-job"
+        )
+
+    def call_soon(self, callback, *args):
+        if self.loop is None:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    @property
+    def busy(self):
+        return self.current is not None and not self.current[1].done()
+
+    def submit(self, job, on_done=None):
+        """Start a job in the background.
+
+        :param job: The job to run.
+        :param on_done: Called with ``(job, error)`` once the job has finished.
+            ``error`` is ``None`` on success, and a ``JobCancelled`` if the
+            job was cancelled.
+        :returns: A future for the job state.
+        """
+        job.dispatch = self.call_soon
+
+        def run():
+            try:
+                state = job.run()
+            except BaseException as e:
+                if on_done is not None:
+                    self.call_soon(on_done, job, e)
+                raise
+            if on_done is not None:
+                self.call_soon(on_done, job, None)
+            return state
+
+        future = self._executor.submit(run)
+        self.current = (job, future)
+        return future
+
+    def cancel(self):
+        """Cancel the running job, if there is one.
+
+        :returns: True if a job was cancelled.
+        """
+        if not self.busy:
+            return False
+        self.current[0].cancel()
+        return True
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,77 @@
+"""Inter-process file locks.
+
+Used to guard caches that several launcher processes (the GUI, the CLI and
+batch workers) can update at the same time.
+"""
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class LockTimeout(Exception):
+    """The lock couldn't be acquired in time."""
+
+
+class FileLock:
+    def __init__(self, path, timeout=None, poll_interval=0.05):
+        """An exclusive lock on a file.
+
+        The lock is held by the open file, so it is released by the OS if the
+        process dies. It can be used as a context manager.
+
+        :param path: The lock file. It is created if it doesn't exist.
+        :param timeout: Seconds to wait for the lock; ``None`` waits forever.
+        :param poll_interval: Seconds between attempts while waiting.
+        """
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if os.name == "nt":
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self):
+        """Acquire the lock.
+
+        :raises LockTimeout: If the lock isn't acquired within the timeout.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a+")
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() > deadline:
+                self._file.close()
+                self._file = None
+                raise LockTimeout(f"Timed out waiting for {self.path}")
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._file is None:
+            return
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
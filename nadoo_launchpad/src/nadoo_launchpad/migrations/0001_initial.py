@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Developer',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_name', models.CharField(max_length=100, unique=True)),
+                ('formal_name', models.CharField(max_length=200)),
+                ('bundle', models.CharField(max_length=200)),
+                ('path', models.CharField(max_length=1024)),
+                ('venv_path', models.CharField(blank=True, max_length=1024)),
+                ('template_sha', models.CharField(blank=True, max_length=40)),
+                ('briefcase_version', models.CharField(max_length=50)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['app_name'],
+                'indexes': [models.Index(fields=['bundle', 'app_name'], name='project_bundle_idx'), models.Index(fields=['created'], name='project_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+def fill_search_names(apps, schema_editor):
+    Developer = apps.get_model("nadoo_launchpad", "Developer")
+    for developer in Developer.objects.all():
+        developer.search_name = developer.name.casefold()
+        developer.save(update_fields=["search_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nadoo_launchpad', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='developer',
+            options={'ordering': ['search_name', 'email']},
+        ),
+        migrations.AddField(
+            model_name='developer',
+            name='search_name',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='developer',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='developer',
+            index=models.Index(fields=['search_name', 'email'], name='developer_search_idx'),
+        ),
+    ]
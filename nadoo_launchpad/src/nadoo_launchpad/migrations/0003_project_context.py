@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nadoo_launchpad', '0002_developer_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='context',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,8 +1,57 @@
 from django.db import models
+from django.utils import timezone
 
 class Developer(models.Model):
     name = models.CharField(max_length=100)
-    email = models.EmailField()
+    email = models.EmailField(unique=True)
+    # The case folded name, for case insensitive prefix searches. Set it
+    # with search_key() when bypassing save(), e.g. in bulk_create.
+    search_name = models.CharField(max_length=100, default="")
+
+    class Meta:
+        ordering = ["search_name", "email"]
+        indexes = [
+            models.Index(fields=["search_name", "email"], name="developer_search_idx"),
+        ]
+
+    @staticmethod
+    def search_key(name):
+        return name.casefold()
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.search_key(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
+
+class Project(models.Model):
+    """A project created by the launcher."""
+
+    # The unique index on app_name also serves prefix searches; see
+    # db.prefix_filter.
+    app_name = models.CharField(max_length=100, unique=True)
+    formal_name = models.CharField(max_length=200)
+    bundle = models.CharField(max_length=200)
+    path = models.CharField(max_length=1024)
+    venv_path = models.CharField(max_length=1024, blank=True)
+    template_sha = models.CharField(max_length=40, blank=True)
+    # The template context the project was rendered with; upgrades render
+    # the old and the new template with it.
+    context = models.JSONField(default=dict, blank=True)
+    briefcase_version = models.CharField(max_length=50)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["app_name"]
+        indexes = [
+            models.Index(fields=["bundle", "app_name"], name="project_bundle_idx"),
+            models.Index(fields=["created"], name="project_created_idx"),
+        ]
+
+    @property
+    def bundle_identifier(self):
+        return f"{self.bundle}.{self.app_name}"
+
+    def __str__(self):
+        return self.formal_name
@@ -0,0 +1,98 @@
+"""A small engine for the ``{{NAME}}`` placeholders in resource templates.
+
+Templates are parsed once into a list of tokens, and re-parsed only when
+the file changes. Rendering is a single pass over the tokens, and can be
+streamed straight into the output file.
+"""
+import os
+import re
+import threading
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+
+
+class PlaceholderError(Exception):
+    def __init__(self, missing=(), unknown=()):
+        """The values don't match the placeholders of a template.
+
+        :param missing: Placeholders without a value.
+        :param unknown: Values without a placeholder.
+        """
+        self.missing = sorted(missing)
+        self.unknown = sorted(unknown)
+        problems = []
+        if self.missing:
+            problems.append(f"missing values for {', '.join(self.missing)}")
+        if self.unknown:
+            problems.append(f"unknown placeholders {', '.join(self.unknown)}")
+        super().__init__("; ".join(problems))
+
+
+class CompiledTemplate:
+    def __init__(self, text):
+        """A parsed template.
+
+        :param text: The template source.
+        """
+        # Literal text and placeholder names alternate; even indices are
+        # literals, odd indices are placeholder names.
+        self.tokens = PLACEHOLDER_RE.split(text)
+        self.placeholders = frozenset(self.tokens[1::2])
+
+    def _values(self, values):
+        """Map placeholder names to values, checking they match."""
+        values = {key.upper(): value for key, value in values.items()}
+        missing = self.placeholders - values.keys()
+        unknown = values.keys() - self.placeholders
+        if missing or unknown:
+            raise PlaceholderError(missing=missing, unknown=unknown)
+        return values
+
+    def _chunks(self, values):
+        values = self._values(values)
+        tokens = self.tokens
+        for index, token in enumerate(tokens):
+            yield str(values[token]) if index % 2 else token
+
+    def render(self, values):
+        """Render the template.
+
+        :param values: The placeholder values. Keys are matched case
+            insensitively, so ``app_name`` fills ``{{APP_NAME}}``.
+        :raises PlaceholderError: If a placeholder has no value, or a value
+            has no placeholder.
+        """
+        return "".join(self._chunks(values))
+
+    def render_to(self, output_file, values):
+        """Render the template into an open file, without building the
+        rendered text in memory.
+        """
+        output_file.writelines(self._chunks(values))
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_template(path):
+    """Get the compiled template for a file.
+
+    Compiled templates are cached, and recompiled when the file changes.
+
+    :param path: The template file.
+    :returns: A ``CompiledTemplate``.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(path, "r", encoding="utf-8") as template_file:
+        template = CompiledTemplate(template_file.read())
+    with _cache_lock:
+        _cache[path] = (key, template)
+    return template
@@ -0,0 +1,281 @@
+"""Shared cache of compiled pyenv interpreters.
+
+``pyenv install`` compiles CPython from source, which takes minutes. The
+first machine to need a version builds it with every core, and packs the
+result into a tarball in the build cache::
+
+    <build cache>/cpython-3.11.7-linux-x86_64-glibc2.36.tar.gz
+
+Every later machine with the same platform unpacks the tarball into
+``$PYENV_ROOT/versions`` instead of compiling. The build cache is
+``<cache>/python-builds`` unless the ``python.build_cache`` setting (or
+``NADOO_PYTHON_BUILD_CACHE``) points at a shared, e.g. network mounted,
+directory. A lock file per version makes machines that need the same
+version at the same time wait for one build rather than all compiling it.
+
+A build or unpack that was killed (on timeout or cancellation) leaves a
+partial ``$PYENV_ROOT/versions/<version>`` behind, which pyenv would take for
+an installed version. An install therefore only trusts a prefix whose
+interpreter runs, removes anything else first, and runs a new build before
+publishing it to the build cache. An unpacked interpreter that doesn't run
+is replaced by a build from source.
+
+pyenv interpreters aren't built to be moved: scripts, ``_sysconfigdata``
+and pkg-config files contain the prefix they were built for. When a
+tarball is unpacked under a different ``$PYENV_ROOT``, the old prefix is
+replaced in those text files. Binaries locate their prefix at runtime.
+
+The versions to install are the ``python.versions`` setting, defaulting to
+``DEFAULT_VERSION``; several versions are installed concurrently.
+"""
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from nadoo_launchpad.fileops import atomic_write
+from nadoo_launchpad.interpreters import DEFAULT_VERSION, pyenv_root
+from nadoo_launchpad.locks import FileLock
+from nadoo_launchpad.supervisor import run_command
+
+BUILD_CACHE_DIR = "python-builds"
+METADATA_FILE = ".nadoo-build.json"
+
+# Files larger than this are never rewritten; they are binaries or data.
+MAX_REWRITE_BYTES = 4 * 1024 * 1024
+
+
+def configured_versions(settings):
+    """The Python versions to install.
+
+    :param settings: The launcher settings (a ``SettingsStore``).
+    :returns: A list of versions; the first is the default interpreter.
+    """
+    versions = (settings.get("python") or {}).get("versions")
+    return list(versions) if versions else [DEFAULT_VERSION]
+
+
+def build_cache_path(settings, cache_dir) -> Path:
+    """The directory of the interpreter tarballs.
+
+    :param settings: The launcher settings (a ``SettingsStore``).
+    :param cache_dir: The launcher cache directory, for the default.
+    """
+    shared = os.environ.get("NADOO_PYTHON_BUILD_CACHE") or (
+        settings.get("python") or {}
+    ).get("build_cache")
+    return Path(shared) if shared else Path(cache_dir) / BUILD_CACHE_DIR
+
+
+def platform_tag():
+    """What a compiled interpreter depends on: OS, CPU and C library."""
+    system = platform.system().lower()
+    tag = f"{system}-{platform.machine().lower()}"
+    if system == "linux":
+        libc, libc_version = platform.libc_ver()
+        if libc:
+            tag += f"-{libc}{libc_version}"
+    elif system == "darwin":
+        tag += f"-macos{platform.mac_ver()[0].split('.')[0]}"
+    return tag
+
+
+def tarball_path(build_cache, version) -> Path:
+    return Path(build_cache) / f"cpython-{version}-{platform_tag()}.tar.gz"
+
+
+def pack(prefix, tarball):
+    """Pack an installed interpreter into a tarball, atomically.
+
+    :param prefix: The interpreter's install prefix
+        (``$PYENV_ROOT/versions/<version>``).
+    :param tarball: The tarball to write.
+    """
+    prefix = Path(prefix)
+    tarball = Path(tarball)
+    tarball.parent.mkdir(parents=True, exist_ok=True)
+    metadata = json.dumps({"prefix": str(prefix), "platform": platform_tag()}).encode()
+
+    with atomic_write(tarball, "wb") as tarball_file:
+        with tarfile.open(fileobj=tarball_file, mode="w:gz", compresslevel=6) as tar:
+            tar.add(prefix, arcname=prefix.name)
+            info = tarfile.TarInfo(f"{prefix.name}/{METADATA_FILE}")
+            info.size = len(metadata)
+            tar.addfile(info, io.BytesIO(metadata))
+
+
+def relocate(path, old_prefix, new_prefix):
+    """Replace an interpreter's build prefix in its text files.
+
+    :param path: Where the interpreter is now.
+    :param old_prefix: The prefix it was built for.
+    :param new_prefix: The prefix it will be installed at.
+    :returns: The number of files rewritten.
+    """
+    old = os.fsencode(old_prefix)
+    new = os.fsencode(new_prefix)
+    rewritten = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path) or os.path.getsize(path) > MAX_REWRITE_BYTES:
+                continue
+            with open(path, "rb") as file:
+                content = file.read()
+            if old not in content or b"\0" in content:
+                continue
+            mode = os.stat(path).st_mode
+            with open(path, "wb") as file:
+                file.write(content.replace(old, new))
+            os.chmod(path, mode)
+            rewritten += 1
+    return rewritten
+
+
+def unpack(tarball, prefix):
+    """Install an interpreter from a tarball.
+
+    The tarball is extracted next to the prefix and renamed into place, so
+    an interrupted unpack never leaves a half installed version.
+
+    :param tarball: A tarball written by ``pack``.
+    :param prefix: Where to install the interpreter.
+    """
+    prefix = Path(prefix)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    extract_path = Path(tempfile.mkdtemp(prefix=f".{prefix.name}.", dir=prefix.parent))
+    try:
+        with tarfile.open(tarball, "r:gz") as tar:
+            members = tar.getmembers()
+            names = {member.name.split("/")[0] for member in members}
+            if len(names) != 1:
+                raise tarfile.TarError(f"{tarball} isn't an interpreter build")
+            if hasattr(tarfile, "tar_filter"):
+                # Refuse absolute paths and links out of the tree.
+                tar.extractall(extract_path, filter="tar")
+            else:
+                tar.extractall(extract_path)
+        unpacked = extract_path / names.pop()
+        metadata_path = unpacked / METADATA_FILE
+        with open(metadata_path, "r") as metadata_file:
+            old_prefix = json.load(metadata_file)["prefix"]
+        metadata_path.unlink()
+        if old_prefix != str(prefix):
+            relocate(unpacked, old_prefix, prefix)
+        os.rename(unpacked, prefix)
+    finally:
+        shutil.rmtree(extract_path, ignore_errors=True)
+
+
+def pyenv_command():
+    # Right after installing pyenv it isn't on PATH yet.
+    return shutil.which("pyenv") or str(pyenv_root() / "bin" / "pyenv")
+
+
+def python_works(prefix, run=run_command):
+    """Whether the interpreter in a prefix starts."""
+    python = prefix / "bin" / "python3"
+    if not os.access(python, os.X_OK):
+        return False
+    try:
+        run([str(python), "-c", "pass"])
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+    return True
+
+
+def build(version, prefix, tarball, make_jobs=None, run=run_command):
+    """Compile a Python version with pyenv and publish it to the build cache.
+
+    The caller holds the tarball's lock.
+    """
+    env = dict(
+        os.environ,
+        PYENV_ROOT=str(pyenv_root()),
+        MAKE_OPTS=f"-j{make_jobs or os.cpu_count() or 1}",
+    )
+    run([pyenv_command(), "install", version], env=env)
+    # Never publish an interpreter that doesn't start.
+    run([str(prefix / "bin" / "python3"), "-c", "pass"])
+    pack(prefix, tarball)
+
+
+def install_python(version, build_cache, make_jobs=None, run=run_command):
+    """Install a Python version with pyenv, through the build cache.
+
+    An unpacked interpreter that doesn't start (a corrupt tarball, or one
+    from a machine the platform tag doesn't tell apart) is removed, and the
+    version is built from source, replacing the tarball.
+
+    :param version: The Python version.
+    :param build_cache: The directory of the interpreter tarballs.
+    :param make_jobs: How many compiler processes a build may run; defaults
+        to one per core.
+    :param run: Runs a command with an ``env`` keyword argument; a job's
+        ``run_command`` streams its output to the UI.
+    :returns: How the version was installed: ``"installed"`` if it already
+        was, ``"unpacked"`` from the build cache, or ``"built"``.
+    """
+    prefix = pyenv_root() / "versions" / version
+    tarball = tarball_path(build_cache, version)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    # Guards the prefix against other launchers on this machine.
+    with FileLock(pyenv_root() / f".nadoo-install-{version}.lock"):
+        if python_works(prefix, run):
+            return "installed"
+        # Left behind by a killed build or unpack
+        shutil.rmtree(prefix, ignore_errors=True)
+        if not tarball.exists():
+            # Another machine may be building it; wait for it rather than
+            # compiling it twice.
+            with FileLock(f"{tarball}.lock"):
+                if not tarball.exists():
+                    build(version, prefix, tarball, make_jobs, run)
+                    return "built"
+        unpack(tarball, prefix)
+        if python_works(prefix, run):
+            return "unpacked"
+        shutil.rmtree(prefix, ignore_errors=True)
+        with FileLock(f"{tarball}.lock"):
+            build(version, prefix, tarball, make_jobs, run)
+        return "built"
+
+
+def install_python_versions(versions, build_cache, run=run_command):
+    """Install several Python versions concurrently.
+
+    The cores are shared between the builds that run at the same time.
+
+    :returns: A dict of version to how it was installed (see
+        ``install_python``).
+    """
+    root = pyenv_root()
+    # A prefix whose interpreter doesn't start is reinstalled.
+    pending = [
+        version
+        for version in versions
+        if not python_works(root / "versions" / version, run)
+    ]
+    make_jobs = max(1, (os.cpu_count() or 1) // max(1, len(pending)))
+    results = {version: "installed" for version in versions}
+    if not pending:
+        return results
+    lock = threading.Lock()
+
+    def install(version):
+        how = install_python(version, build_cache, make_jobs=make_jobs, run=run)
+        with lock:
+            results[version] = how
+
+    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+        # Raise the first failure, after every build has finished.
+        for future in [executor.submit(install, version) for version in pending]:
+            future.result()
+    return results
@@ -0,0 +1,129 @@
+"""Registry of the projects the launcher has created.
+
+The registry lives in the launcher database (see ``nadoo_launchpad.db``).
+Django is set up on the first call, so importing this module is cheap.
+"""
+from nadoo_launchpad import db
+from nadoo_launchpad.db import prefix_filter
+
+
+def find_project(app_name):
+    """The registered project with an app name, or ``None``."""
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    return Project.objects.filter(app_name=app_name).first()
+
+
+def register_project(
+    context,
+    path,
+    venv_path="",
+    template_sha="",
+    briefcase_version="",
+):
+    """Record a new project, replacing any stale record with the same name.
+
+    :param context: The template context of the project; recorded, so the
+        project can be upgraded to a newer template.
+    :param path: The project directory.
+    :param venv_path: The project's virtual environment.
+    :param template_sha: The template commit the project was rendered from.
+    :param briefcase_version: The Briefcase version of the project.
+    :returns: The ``Project``.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    project, _ = Project.objects.update_or_create(
+        app_name=context["app_name"],
+        defaults={
+            "formal_name": context["formal_name"],
+            "bundle": context["bundle"],
+            "path": str(path),
+            "venv_path": str(venv_path or ""),
+            "template_sha": template_sha or "",
+            "briefcase_version": briefcase_version,
+            "context": dict(context),
+        },
+    )
+    return project
+
+
+def update_project(app_name, **fields):
+    """Change fields of a registered project, e.g. after an upgrade.
+
+    :returns: True if the project is registered.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    return Project.objects.filter(app_name=app_name).update(**fields) > 0
+
+
+def register_projects(projects):
+    """Record many projects in one transaction.
+
+    :param projects: Dicts with the arguments of ``register_project``.
+    :returns: The number of projects written.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    return db.bulk_write(
+        Project,
+        (
+            Project(
+                app_name=project["context"]["app_name"],
+                formal_name=project["context"]["formal_name"],
+                bundle=project["context"]["bundle"],
+                path=str(project["path"]),
+                venv_path=str(project.get("venv_path") or ""),
+                template_sha=project.get("template_sha") or "",
+                briefcase_version=project.get("briefcase_version", ""),
+                context=dict(project["context"]),
+            )
+            for project in projects
+        ),
+        unique_fields=["app_name"],
+        update_fields=[
+            "formal_name",
+            "bundle",
+            "path",
+            "venv_path",
+            "template_sha",
+            "briefcase_version",
+            "context",
+        ],
+    )
+
+
+def forget_project(app_name):
+    """Remove a project from the registry.
+
+    :returns: True if the project was registered.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    deleted, _ = Project.objects.filter(app_name=app_name).delete()
+    return deleted > 0
+
+
+def search_projects(prefix="", limit=50):
+    """Find projects by app name or bundle prefix.
+
+    :param prefix: The start of the app name or bundle. App names are lower
+        case, so the prefix is matched case insensitively against them.
+    :param limit: The maximum number of projects to return; ``None`` for all.
+    :returns: A list of ``Project``, ordered by app name.
+    """
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    projects = Project.objects.all()
+    if prefix:
+        projects = projects.filter(
+            prefix_filter("app_name", prefix.lower()) | prefix_filter("bundle", prefix)
+        )
+    return list(projects[:limit])
@@ -0,0 +1,196 @@
+"""Index of the Briefcase projects in the project folder.
+
+The project folder holds many repositories the launcher didn't create.
+Scanning it finds every ``pyproject.toml`` and reads its
+``[tool.briefcase]`` section. The results are kept in
+``<cache>/project-index.json``, keyed by pyproject path with the file's
+mtime and size, so a rescan only parses the files that changed.
+
+Directories are listed with ``os.scandir`` on a thread pool, because on
+network drives and cold caches the scan is dominated by directory I/O.
+"""
+import json
+import os
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from nadoo_launchpad.fileops import atomic_write
+
+INDEX_FILE = "project-index.json"
+INDEX_VERSION = 1
+PYPROJECT = "pyproject.toml"
+
+# Directories that never contain a project root of their own.
+SKIP_DIRS = {".git", ".venv", "venv", "node_modules", "build", "dist", "__pycache__"}
+
+
+def index_path(cache_dir) -> Path:
+    return Path(cache_dir) / INDEX_FILE
+
+
+def load_index(cache_dir) -> dict:
+    """Read the index of a previous scan.
+
+    :returns: A dict of pyproject path to ``{"mtime_ns", "size", "apps"}``;
+        empty if there is no usable index.
+    """
+    try:
+        with open(index_path(cache_dir), "r") as index_file:
+            index = json.load(index_file)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index["files"]
+
+
+def save_index(cache_dir, files):
+    path = index_path(cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path) as index_file:
+        json.dump({"version": INDEX_VERSION, "files": files}, index_file)
+
+
+def parse_pyproject(pyproject_path):
+    """Read the Briefcase apps defined in a ``pyproject.toml``.
+
+    :returns: A list of app dicts with ``app_name``, ``formal_name``,
+        ``bundle`` and ``project_name``; empty if the file isn't a Briefcase
+        project or can't be parsed.
+    """
+    try:
+        with open(pyproject_path, "rb") as pyproject_file:
+            pyproject = tomllib.load(pyproject_file)
+    except (OSError, ValueError):
+        return []
+
+    briefcase = pyproject.get("tool", {}).get("briefcase")
+    if not isinstance(briefcase, dict):
+        return []
+    apps = []
+    for app_name, app in briefcase.get("app", {}).items():
+        if not isinstance(app, dict):
+            continue
+        apps.append(
+            {
+                "app_name": app_name,
+                "formal_name": app.get("formal_name", app_name),
+                # App settings override the project settings.
+                "bundle": app.get("bundle", briefcase.get("bundle", "")),
+                "project_name": briefcase.get("project_name", ""),
+            }
+        )
+    return apps
+
+
+def _find_pyprojects(directory, depth, max_depth):
+    """Find the pyproject files below a directory.
+
+    :returns: A list of ``(path, stat)`` pairs.
+    """
+    found = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name == PYPROJECT and entry.is_file():
+                    found.append((entry.path, entry.stat()))
+                elif (
+                    depth < max_depth
+                    and entry.name not in SKIP_DIRS
+                    and not entry.name.startswith(".")
+                    and entry.is_dir(follow_symlinks=False)
+                ):
+                    subdirs.append(entry.path)
+    except OSError:
+        # Unreadable, or deleted while scanning.
+        return found
+    if found:
+        # A project root; its subdirectories are the project's own.
+        return found
+    for subdir in subdirs:
+        found.extend(_find_pyprojects(subdir, depth + 1, max_depth))
+    return found
+
+
+def scan_projects(project_folder, cache_dir, max_workers=None, max_depth=2):
+    """Find the Briefcase projects in the project folder.
+
+    :param project_folder: The folder to scan (``get_project_folder_path()``).
+    :param cache_dir: The launcher cache directory, for the index.
+    :param max_workers: The size of the thread pool.
+    :param max_depth: How many directory levels below the project folder a
+        ``pyproject.toml`` is looked for.
+    :returns: A list of app dicts, with the app fields (see
+        ``parse_pyproject``) plus ``path``, the project directory.
+    """
+    try:
+        with os.scandir(project_folder) as entries:
+            roots = [
+                entry.path
+                for entry in entries
+                if entry.name not in SKIP_DIRS
+                and not entry.name.startswith(".")
+                and entry.is_dir(follow_symlinks=False)
+            ]
+    except FileNotFoundError:
+        roots = []
+
+    old_index = load_index(cache_dir)
+    files = {}
+
+    def index(directory):
+        entries = {}
+        for path, stat in _find_pyprojects(directory, 1, max_depth):
+            cached = old_index.get(path)
+            if (
+                cached is not None
+                and cached["mtime_ns"] == stat.st_mtime_ns
+                and cached["size"] == stat.st_size
+            ):
+                entries[path] = cached
+            else:
+                entries[path] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "apps": parse_pyproject(path),
+                }
+        return entries
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for entries in executor.map(index, sorted(roots)):
+            files.update(entries)
+
+    if files != old_index:
+        save_index(cache_dir, files)
+
+    projects = []
+    for path, entry in sorted(files.items()):
+        for app in entry["apps"]:
+            projects.append({**app, "path": str(Path(path).parent)})
+    return projects
+
+
+def find_collisions(projects, app_name, bundle):
+    """The projects a new app would collide with.
+
+    Two apps collide if they share a module name (``my-app`` and ``my_app``
+    both import as ``my_app``), or a bundle identifier; platforms compare
+    bundle identifiers case insensitively.
+
+    :param projects: The projects found by ``scan_projects``.
+    :param app_name: The app name of the new app.
+    :param bundle: The bundle of the new app.
+    :returns: The colliding projects.
+    """
+    from nadoo_launchpad.utils import make_module_name
+
+    module_name = make_module_name(app_name)
+    bundle_identifier = f"{bundle}.{app_name}".lower()
+    return [
+        project
+        for project in projects
+        if make_module_name(project["app_name"]) == module_name
+        or f"{project['bundle']}.{project['app_name']}".lower() == bundle_identifier
+    ]
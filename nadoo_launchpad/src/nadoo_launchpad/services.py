@@ -1,152 +1,463 @@
-from typing import Dict
-import briefcase
-import toga
-import toml
+from __future__ import annotations
+
+import functools
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Dict
 #from nadoo_launchpad.models import Developer
+from nadoo_launchpad import golden_venv, registry, scanner, telemetry
+from nadoo_launchpad.settings_store import open_settings
+from nadoo_launchpad.jobs import Job
+from nadoo_launchpad.supervisor import NETWORK_RETRIES
 from nadoo_launchpad.utils import *
 
+if TYPE_CHECKING:
+    # Only for annotations; the CLI uses this module without Toga.
+    import toga
+
+TEMPLATE = "git@github.com:NADOOIT/batteries-included-briefcase-template.git"
+
+# Seconds a step may take before its commands are killed
+STEP_TIMEOUTS = {
+    "Installing pyenv": 15 * 60,
+    # Compiling several Python versions on a slow machine
+    "Installing Python": 90 * 60,
+    "Preparing Python environment": 20 * 60,
+    "Creating virtual environment": 5 * 60,
+}
 
 
 def check_installation_state(app:toga.App):
-    # Check the config file for the installation state
-    config_path = app.paths.config / "install_state.toml"
-    if config_path.exists():
-        with open(config_path, "r") as config_file:
-            config_data = toml.load(config_file)
-        return config_data.get("installed", False)
-    return False
-
-def install(self:toga.Box, app):
-    # Installation logic
-    # Update installation state in config file
-    set_installation_state()
-    project_folder = setup_project_folder()
-    install_pyenv()
-    install_python_with_pyenv()
-    set_installation_state()
-
-    # Correctly initialize ProjectInfoComponent
-    #project_info_component = ProjectInfoComponent(self.app)
+    # Check the settings for the installation state
+    return open_settings(app.paths.config).get("installed", False)
 
-def add_new_project(self, widget):
-    # Step 1: Create a project folder
-    project_name = self.project_name_input.value.replace(" ", "-")
-    project_folder = os.path.join(get_project_folder_path(), project_name)
-    os.makedirs(project_folder, exist_ok=True)
+def prepare_project_folder(job:Job):
+    job.state["project_folder"] = setup_project_folder()
+
+def ensure_pyenv(job:Job):
+    if shutil.which("pyenv"):
+        job.report("pyenv is already installed.")
+        return
+    install_pyenv(run=job.run_command)
+
+def ensure_python(job:Job):
+    from nadoo_launchpad import python_builds
+
+    settings = open_settings(job.state["config_dir"])
+    versions = job.state.get("python_versions") or python_builds.configured_versions(
+        settings
+    )
+    build_cache = job.state.get("python_build_cache") or python_builds.build_cache_path(
+        settings, job.state["cache_dir"]
+    )
+    installed = install_python_with_pyenv(versions, build_cache, run=job.run_command)
+    for version, how in installed.items():
+        job.report(f"Python {version}: {how}")
+
+def mark_installed(job:Job):
+    settings = open_settings(job.state["config_dir"])
+    settings.update_section("tools", {"pyenv": shutil.which("pyenv")})
+    settings.update_section("interpreters", {"default": get_python_path()})
+    set_installation_state(job.state["config_dir"])
 
-    # Step 2: Create and activate a virtual environment
-    developer_name = self.author_input.value.replace(" ", "_")
+def record_timings(config_dir, kind, job:Job):
+    # The step timings of the last run of every kind of job
+    open_settings(config_dir).update_section("timings", {kind: dict(job.timings)})
 
-    venv_path = self.create_and_activate_venv()
+def installation_steps():
+    return [
+        ("Preparing project folder", prepare_project_folder),
+        ("Installing pyenv", ensure_pyenv),
+        ("Installing Python", ensure_python),
+        ("Saving installation state", mark_installed),
+    ]
 
-    # Step 3: Install Briefcase in the virtual environment
-    pip_path = os.path.join(venv_path, "bin", "pip")
-    subprocess.run([pip_path, "install", "briefcase"])
+def install(self:toga.Box, widget):
+    # Installation logic; the installation state is saved last, so an
+    # interrupted installation is retried on the next start.
+    if self.job_runner.busy:
+        return
+
+    job = Job(
+        "Install",
+        installation_steps(),
+        state={"config_dir": self.app.paths.config, "cache_dir": self.app.paths.cache},
+        on_progress=self.on_job_progress,
+        on_output=self.on_job_output,
+        timeouts=STEP_TIMEOUTS,
+    )
+    self.on_job_started(job)
+    self.job_runner.submit(job, on_done=self.on_job_done)
 
-    # Step 4: Create a project template from the entered data
-    # (Assuming create_pyproject_file is a method to generate the pyproject.toml file)
+def build_project_context(
+    formal_name,
+    bundle,
+    author,
+    author_email,
+    url="",
+    description="",
+    license="Proprietary",
+    gui_framework="Toga",
+) -> Dict[str, str]:
+    """Build the cookiecutter context for a new project.
 
+    :param formal_name: The formal name of the project.
+    :returns: The template context.
+    :raises BriefcaseCommandError: If no valid app name can be derived from
+        the formal name.
+    """
     # The class name can be completely derived from the formal name.
     from briefcase.config import make_class_name, is_valid_app_name
+    from briefcase.exceptions import BriefcaseCommandError
 
-    formal_name = self.project_name_input.value
     class_name = make_class_name(formal_name)
 
     # Check if the app name is valid
     app_name = make_app_name(formal_name)
     if not is_valid_app_name(app_name):
-        # If not valid, display the error using display_error
-        error_message = (
+        raise BriefcaseCommandError(
             f"'{app_name}' is not a valid app name. Please choose a different name."
         )
-        self.app.display_error(error_message)
-        return
 
     # The module name can be completely derived from the app name.
     module_name = make_module_name(app_name)
 
-    context = {
-        "formal_name": formal_name,  # Assuming formal_name is the same as project_name
-        "app_name": app_name,  # Assuming app_name is a lowercase, underscored version of project_name
+    return {
+        "formal_name": formal_name,
+        "app_name": app_name,
         "class_name": class_name,
         "module_name": module_name,
-        "project_name": self.project_name_input.value,
-        "description": self.description_input.value,
-        "author": self.author_input.value,
-        "author_email": self.author_email_input.value,
-        "bundle": self.bundle_input.value,
-        "url": self.url_input.value,
-        "license": self.license_dropdown.value,
-        "gui_framework": self.gui_framework_dropdown.value,
+        "project_name": formal_name,
+        "description": description,
+        "author": author,
+        "author_email": author_email,
+        "bundle": bundle,
+        "url": url,
+        "license": license,
+        "gui_framework": gui_framework,
     }
-    # If a branch wasn't supplied through the --template-branch argument,
-    # use the branch derived from the Briefcase version
-    version = Version(briefcase.__version__)
 
-    branch = f"v{version.base_version}"
+def check_project_path(job:Job):
+    from briefcase.exceptions import BriefcaseCommandError
 
-    # Get the project folder path as a Path object
-    project_folder_path = Path(get_project_folder_path())
+    app_name = job.state["context"]["app_name"]
 
-    # Ensure context["app_name"] is a string
-    app_name = str(context["app_name"])
-
-    # Construct the path to the new app's directory
-    new_app_path = project_folder_path / app_name
+    # App names must be unique across all projects the launcher created,
+    # wherever they live. Records of deleted projects don't count.
+    project = registry.find_project(app_name)
+    if project is not None:
+        if Path(project.path).exists():
+            raise BriefcaseCommandError(
+                f"A project named '{app_name}' already exists in {project.path}."
+            )
+        registry.forget_project(app_name)
 
     # Make extra sure we won't clobber an existing application.
-    if new_app_path.exists():
-        self.app.display_error(
-            f"A directory named '{context['app_name']}' already exists."
+    app_path = Path(get_project_folder_path()) / app_name
+    if app_path.exists():
+        raise BriefcaseCommandError(
+            f"A directory named '{app_path.name}' already exists."
+        )
+
+    # Nor collide with a project the launcher didn't create. Batches check
+    # every project against a single scan before they start.
+    if not job.state.get("collisions_checked"):
+        projects = scanner.scan_projects(
+            get_project_folder_path(), job.state["cache_dir"]
+        )
+        collisions = scanner.find_collisions(
+            projects, app_name, job.state["context"]["bundle"]
         )
+        if collisions:
+            other = collisions[0]
+            raise BriefcaseCommandError(
+                f"'{app_name}' collides with the app '{other['app_name']}' "
+                f"({other['bundle']}.{other['app_name']}) in {other['path']}."
+            )
+    job.state["app_path"] = app_path
+
+def render_project_template(job:Job):
+    render_template_branch(job)
+    telemetry.add("bytes_written", tree_size(job.state["app_path"]))
+
+# The template branch of each (template, Briefcase version), once resolved
+_template_branches = {}
+
+def resolve_template_branch(template, force_refresh=False):
+    """The template branch for the installed Briefcase version.
+
+    Released Briefcase versions use the ``v<version>`` branch; development
+    versions fall back to ``main`` if their branch doesn't exist yet. The
+    branch is looked up in the local template mirror before anything is
+    rendered, and the answer is kept for the rest of the process.
+
+    :param template: The template URL.
+    :param force_refresh: Fetch the template, and resolve the branch again.
+    :returns: The branch.
+    :raises TemplateUnsupportedVersion: If a released Briefcase version has
+        no template branch.
+    :raises NetworkFailure: If the template can't be cloned.
+    """
+    import briefcase
+    from briefcase.exceptions import NetworkFailure, TemplateUnsupportedVersion
+    from cookiecutter.repository import is_repo_url
+    from packaging.version import Version
+
+    key = (template, briefcase.__version__)
+    if key in _template_branches and not force_refresh:
+        return _template_branches[key]
+
+    # Use the branch derived from the Briefcase version
+    version = Version(briefcase.__version__)
+    candidates = [f"v{version.base_version}"]
+    if version.dev is not None:
+        # Development branches can use the main template.
+        candidates.append("main")
+    if not is_repo_url(template):
+        # A local template has no branches to choose from.
+        return candidates[0]
 
-    # project_template = self.create_pyproject_file(user_data, project_folder)
+    import git
+    from nadoo_launchpad import template_cache
 
-    # Step 5: Use Briefcase to create a new project
+    try:
+        branch = template_cache.resolve_branch(
+            template, candidates, force_refresh=force_refresh
+        )
+    except IndexError as e:
+        # Raise an error about the missing template branch.
+        raise TemplateUnsupportedVersion(candidates[0]) from e
+    except git.exc.GitCommandError as e:
+        # The mirror couldn't be cloned; we are probably offline.
+        raise NetworkFailure("clone template repository") from e
+    _template_branches[key] = branch
+    return branch
 
-    template = "git@github.com:NADOOIT/batteries-included-briefcase-template.git"
+def render_template_branch(job:Job):
+    import briefcase
+    from briefcase.exceptions import BriefcaseCommandError
+
+    context = job.state["context"]
+    branch = resolve_template_branch(
+        TEMPLATE, force_refresh=job.state.get("force_refresh", False)
+    )
+    if branch == "main":
+        job.report("Template branch for this Briefcase not found; using development template")
 
     # Additional context for the Briefcase template pyproject.toml header to
     # include the version of Briefcase as well as the source of the template.
     context.update(
         {
-            "template_source": template,
+            "template_source": TEMPLATE,
             "template_branch": branch,
             "briefcase_version": briefcase.__version__,
         }
     )
 
-    # briefcase_path = os.path.join(venv_path, "bin", "briefcase")
-    # briefcase_command = [briefcase_path, "new", "--template", template]
-    # subprocess.run(briefcase_command, cwd=project_folder)
-
-    try:
-        # Unroll the new app template
-        generate_template(
-            template=template,
+    # Unroll the new app template into a scratch directory next to its
+    # destination, and move it into place once it is complete; a failed
+    # render never leaves a partial project behind.
+    app_path = Path(job.state["app_path"])
+    with tempfile.TemporaryDirectory(prefix=".nadoo-render-", dir=app_path.parent) as render_path:
+        job.state["template_sha"] = generate_template(
+            template=TEMPLATE,
             branch=branch,
-            output_path=get_project_folder_path(),
+            output_path=render_path,
             extra_context=context,
+            cache_dir=job.state["cache_dir"],
         )
-    except TemplateUnsupportedVersion:
-        # If we're *not* on a development branch, raise an error about
-        # the missing template branch.
-        if version.dev is None:
+        rendered = Path(render_path) / context["app_name"]
+        # Claim the destination; an exists() check would race with anyone
+        # else creating it, and rename silently replaces empty directories.
+        try:
+            os.mkdir(app_path)
+        except FileExistsError:
+            raise BriefcaseCommandError(
+                f"A directory named '{app_path.name}' already exists."
+            ) from None
+        try:
+            # Replaces the empty directory we just claimed.
+            os.rename(rendered, app_path)
+        except OSError:
+            os.rmdir(app_path)
             raise
 
-        # Development branches can use the main template.
-        self.logger.info(
-            f"Template branch {branch} not found; falling back to development template"
-        )
-        branch = "main"
-        generate_template(
-            template=template,
-            branch=branch,
-            output_path=get_project_folder_path(),
-            extra_context=context,
+def tree_size(path):
+    # The bytes of all files below a directory
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return size
+
+def prepare_golden_venv(job:Job):
+    import briefcase
+
+    # Built once per interpreter and Briefcase version; later projects
+    # reuse it.
+    job.state["golden_venv_path"] = golden_venv.build_golden_venv(
+        get_python_path(),
+        job.state["cache_dir"],
+        briefcase.__version__,
+        # pip downloads Briefcase and its dependencies.
+        run=functools.partial(job.run_command, retries=NETWORK_RETRIES),
+    )
+
+def create_project_venv(job:Job):
+    job.state["venv_path"] = golden_venv.clone_venv(
+        job.state["golden_venv_path"], job.state["app_path"] / ".venv"
+    )
+
+def wire_build_cache(job:Job):
+    from nadoo_launchpad import build_cache
+
+    # The project's briefcase reuses the requirements and support packages
+    # other projects already installed.
+    root = build_cache.build_cache_path(job.state["cache_dir"])
+    if not build_cache.wire_venv(job.state["venv_path"], root):
+        job.report("This platform's briefcase can't use the build cache")
+
+def register_new_project(job:Job):
+    import briefcase
+
+    registry.register_project(
+        job.state["context"],
+        path=job.state["app_path"],
+        venv_path=job.state["venv_path"],
+        template_sha=job.state.get("template_sha"),
+        briefcase_version=briefcase.__version__,
+    )
+
+def remember_developer(job:Job):
+    from nadoo_launchpad import developers
+
+    # New authors show up in the developer dropdown next time.
+    context = job.state["context"]
+    developers.add_developer(context["author"], context["author_email"])
+
+def project_creation_steps():
+    # The template is rendered first, because cookiecutter refuses to render
+    # into an existing directory; the venv then lives inside the new project.
+    return [
+        ("Checking project name", check_project_path),
+        ("Rendering project template", render_project_template),
+        ("Preparing Python environment", prepare_golden_venv),
+        ("Creating virtual environment", create_project_venv),
+        ("Wiring build cache", wire_build_cache),
+        ("Registering project", register_new_project),
+    ]
+
+def new_project_steps():
+    # A project created by hand, in the GUI or the CLI, also adds its author
+    # to the developer directory.
+    return project_creation_steps() + [("Saving developer", remember_developer)]
+
+def resolve_upgrade_target(job:Job):
+    from nadoo_launchpad import template_cache
+
+    # Every project is upgraded to the same commit.
+    branch = resolve_template_branch(
+        TEMPLATE, force_refresh=job.state.get("force_refresh", False)
+    )
+    _, sha = template_cache.checkout_template(TEMPLATE, branch)
+    job.state["template_branch"] = branch
+    job.state["template_sha"] = sha
+    job.report(f"Upgrading to {branch} ({sha[:10]})")
+    job.state.setdefault("upgrades", {})
+
+def upgrade_step(app_name):
+    def upgrade_registered_project(job:Job):
+        import briefcase
+        from nadoo_launchpad import upgrade
+
+        # A failing project doesn't stop the upgrade of the others.
+        try:
+            project = registry.find_project(app_name)
+            if project is None:
+                raise upgrade.UpgradeError(f"No project named '{app_name}' is registered.")
+            context = dict(
+                project.context,
+                template_branch=job.state["template_branch"],
+                briefcase_version=briefcase.__version__,
+            )
+            changes = upgrade.upgrade_project(
+                project,
+                TEMPLATE,
+                job.state["template_sha"],
+                job.state["cache_dir"],
+                context,
+                dry_run=job.state.get("dry_run", False),
+            )
+        except Exception as e:
+            job.report(f"{app_name}: {e or type(e).__name__}")
+            job.state["upgrades"][app_name] = {"status": "failed", "error": str(e)}
+            return
+
+        for path, kind, file in changes:
+            job.report(f"{app_name}: {kind} {path}")
+        upgraded = project.template_sha != job.state["template_sha"]
+        if upgraded and not job.state.get("dry_run", False):
+            registry.update_project(
+                app_name,
+                template_sha=job.state["template_sha"],
+                briefcase_version=briefcase.__version__,
+                context=context,
+            )
+        conflicted = any(kind in (upgrade.CONFLICT, upgrade.KEPT) for _, kind, _ in changes)
+        job.state["upgrades"][app_name] = {
+            "status": "conflicts" if conflicted else "ok",
+            "changes": [{"path": path, "kind": kind} for path, kind, file in changes],
+        }
+
+    return (f"Upgrading {app_name}", upgrade_registered_project)
+
+def project_upgrade_steps(app_names):
+    return [("Resolving template", resolve_upgrade_target)] + [
+        upgrade_step(app_name) for app_name in app_names
+    ]
+
+def add_new_project(self, widget):
+    from briefcase.exceptions import BriefcaseCommandError
+
+    if self.job_runner.busy:
+        return
+
+    try:
+        context = build_project_context(
+            formal_name=self.project_name_input.value,
+            bundle=self.bundle_input.value,
+            author=self.author_input.value,
+            author_email=self.author_email_input.value,
+            url=self.url_input.value,
+            description=self.description_input.value,
+            license=self.license_dropdown.value,
+            gui_framework=self.gui_framework_dropdown.value,
         )
+    except BriefcaseCommandError as e:
+        self.show_error(str(e))
+        return
+
+    job = Job(
+        f"Add project {context['app_name']}",
+        new_project_steps(),
+        state={"context": context, "cache_dir": self.app.paths.cache},
+        on_progress=self.on_job_progress,
+        on_output=self.on_job_output,
+        timeouts=STEP_TIMEOUTS,
+        span_name="Add project",
+        attributes={"app_name": context["app_name"]},
+    )
+    self.on_job_started(job)
+    self.job_runner.submit(job, on_done=self.on_job_done)
 
-def cancel_action(self:toga.App):
+def cancel_action(self:toga.Box):
+    # Cancel a running job first; the next press restores the initial values.
+    if self.job_runner.cancel():
+        return
     # Restore initial values
-    if self.app.main_box:
-        self.app.main_box.children.pop()
\ No newline at end of file
+    if getattr(self.app, "main_box", None):
+        self.app.main_box.children.pop()
@@ -0,0 +1,161 @@
+"""The launcher's persistent settings.
+
+All launcher state lives in one small JSON file in the config directory:
+the install state, tool paths, interpreter locations and step timings. It
+is read once and cached; the cache is invalidated when another process
+changes the file.
+
+Writes are coalesced: ``set`` and ``update`` only mark the settings dirty,
+and a single write follows ``WRITE_DELAY`` seconds later (or on ``flush``,
+or when the process exits). Every write goes to a temporary file that is
+renamed over the settings file, so a crash never leaves a half written
+file behind.
+
+This module is imported while the launcher window is being built, so it only
+uses the standard library.
+"""
+import atexit
+import json
+import os
+import threading
+import tomllib
+from pathlib import Path
+
+from nadoo_launchpad.config import INSTALL_STATE_FILE
+from nadoo_launchpad.fileops import atomic_write
+
+SETTINGS_FILE = "settings.json"
+
+# Seconds to wait for more changes before writing
+WRITE_DELAY = 0.5
+
+# The stamp of a store that hasn't read its file yet
+_UNREAD = object()
+
+
+class SettingsStore:
+    def __init__(self, config_dir, write_delay=WRITE_DELAY):
+        """The settings in a config directory.
+
+        Use ``open_settings`` rather than creating stores directly, so that
+        every part of the launcher shares one cache.
+
+        :param config_dir: The launcher config directory (``app.paths.config``).
+        :param write_delay: Seconds to coalesce changes before writing them.
+        """
+        self.path = Path(config_dir) / SETTINGS_FILE
+        self.write_delay = write_delay
+        self._lock = threading.RLock()
+        self._values = {}
+        self._stamp = _UNREAD
+        self._dirty = {}
+        self._timer = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as settings_file:
+                return json.load(settings_file)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            # Not written by this module; start over rather than fail.
+            return {}
+
+        # Older launchers only kept the install state.
+        try:
+            with open(self.path.with_name(INSTALL_STATE_FILE), "rb") as state_file:
+                return tomllib.load(state_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _refresh(self):
+        """Reload the file if it changed since it was last read."""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._values = self._read()
+            self._stamp = stamp
+            # Changes that haven't been written yet still apply.
+            self._values.update(self._dirty)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._values.get(key, default)
+
+    def as_dict(self):
+        with self._lock:
+            self._refresh()
+            return json.loads(json.dumps(self._values))
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        """Change settings; they are written after the write delay.
+
+        :param values: A dict of settings. Values must be JSON serializable.
+        """
+        with self._lock:
+            self._refresh()
+            self._values.update(values)
+            self._dirty.update(values)
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def update_section(self, section, values):
+        """Change some entries of a dict valued setting."""
+        with self._lock:
+            self._refresh()
+            merged = dict(self._values.get(section) or {})
+            merged.update(values)
+            self.update({section: merged})
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            # Merge with changes other processes made in the meantime.
+            self._stamp = _UNREAD
+            self._refresh()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(self.path, fsync=True) as settings_file:
+                json.dump(self._values, settings_file, indent=2, sort_keys=True)
+            self._stamp = self._file_stamp()
+            self._dirty = {}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_settings(config_dir) -> SettingsStore:
+    """The shared settings store of a config directory."""
+    key = os.path.abspath(config_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SettingsStore(config_dir)
+        return store
+
+
+@atexit.register
+def flush_all():
+    """Write the pending changes of every store."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
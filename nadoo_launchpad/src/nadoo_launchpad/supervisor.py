@@ -0,0 +1,192 @@
+"""Supervised subprocesses.
+
+Every external tool the launcher runs (pyenv, the pyenv installer, pip,
+venv) goes through a ``Supervisor``. It
+
+* streams the merged stdout and stderr of a command line by line, and keeps
+  the last ``OUTPUT_LINES`` lines in a ring buffer for error reports;
+* starts each command in its own process group, so killing a command also
+  kills the compilers and downloaders it started;
+* kills a command that runs past its timeout;
+* retries failed commands with exponential backoff, for network bound
+  steps.
+
+Jobs own a supervisor (``Job.run_command``); code that runs outside a job
+uses ``run_command`` from this module.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+
+from nadoo_launchpad import telemetry
+
+# Lines of output kept for error reports
+OUTPUT_LINES = 200
+
+# Seconds before the first retry; doubled for every later one
+RETRY_BACKOFF = 2.0
+
+# Retries for commands that download something
+NETWORK_RETRIES = 3
+
+
+def kill_process_group(process):
+    """Kill a command and every process it started."""
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class Supervisor:
+    def __init__(self, on_output=None, cancelled=None, max_lines=OUTPUT_LINES):
+        """Runs commands, and kills them on timeout or cancellation.
+
+        :param on_output: Called with every line of output, on the thread
+            that runs the command.
+        :param cancelled: A ``threading.Event`` that is set once the owner
+            is cancelled; no command is started or retried after that.
+        :param max_lines: How many lines of output to keep in ``output``.
+        """
+        self.on_output = on_output
+        self.cancelled = cancelled or threading.Event()
+        # The last lines of output, of all commands
+        self.output = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        # Commands may run on several threads at once.
+        self._processes = set()
+
+    def cancel(self):
+        """Kill all running commands."""
+        self.cancelled.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            kill_process_group(process)
+
+    def _line(self, line):
+        self.output.append(line)
+        if self.on_output is not None:
+            self.on_output(line)
+
+    def tail(self):
+        return "\n".join(self.output)
+
+    def _run_once(self, args, cwd, env, timeout, attempt):
+        # Commands are aggregated by program (``$ pyenv``, ``$ python``).
+        with telemetry.span(
+            f"$ {Path(args[0]).name}", kind="command", command=args, attempt=attempt
+        ) as command_span:
+            process = subprocess.Popen(
+                args,
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                # A process group of its own, so it can be killed as a whole
+                start_new_session=os.name != "nt",
+                creationflags=(
+                    subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+                ),
+            )
+            with self._lock:
+                self._processes.add(process)
+            timed_out = threading.Event()
+
+            def expire():
+                timed_out.set()
+                kill_process_group(process)
+
+            watchdog = None
+            if timeout is not None:
+                watchdog = threading.Timer(timeout, expire)
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                # Cancelled before the process was registered
+                if self.cancelled.is_set():
+                    kill_process_group(process)
+                for line in process.stdout:
+                    command_span.add("output_bytes", len(line))
+                    self._line(line.rstrip("\n"))
+                returncode = process.wait()
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+                process.stdout.close()
+                with self._lock:
+                    self._processes.discard(process)
+
+            command_span.set(returncode=returncode)
+            # A command that finished just as it timed out still counts.
+            if timed_out.is_set() and returncode != 0:
+                command_span.status = "timeout"
+                raise subprocess.TimeoutExpired(args, timeout, output=self.tail())
+            if returncode != 0:
+                command_span.status = "error"
+                raise subprocess.CalledProcessError(returncode, args, output=self.tail())
+            return returncode
+
+    def run(self, args, cwd=None, env=None, timeout=None, retries=0, backoff=RETRY_BACKOFF):
+        """Run a command to completion.
+
+        :param args: The command to run.
+        :param cwd: The working directory for the command.
+        :param env: The environment for the command.
+        :param timeout: Seconds after which an attempt is killed.
+        :param retries: How often to retry a failed or timed out command.
+        :param backoff: Seconds to wait before the first retry; doubled for
+            every later one.
+        :returns: The exit code, 0.
+        :raises subprocess.CalledProcessError: If the command fails. Its
+            ``output`` is the tail of the output.
+        :raises subprocess.TimeoutExpired: If the last attempt timed out.
+        """
+        args = [str(arg) for arg in args]
+        attempt = 0
+        while True:
+            try:
+                return self._run_once(args, cwd, env, timeout, attempt)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                if attempt >= retries or self.cancelled.is_set():
+                    raise
+                delay = backoff * 2**attempt
+                self._line(
+                    f"{Path(args[0]).name} failed ({type(e).__name__}); "
+                    f"retrying in {delay:.0f}s"
+                )
+                # Waiting ends early on cancellation.
+                if self.cancelled.wait(delay):
+                    raise
+                attempt += 1
+
+
+def _echo(line):
+    # stdout is reserved for the JSON output of the command line.
+    print(line, file=sys.stderr)
+
+
+def run_command(args, cwd=None, env=None, timeout=None, retries=0):
+    """Run a command outside a job, echoing its output on stderr.
+
+    See ``Supervisor.run``.
+    """
+    return Supervisor(on_output=_echo).run(
+        args, cwd=cwd, env=env, timeout=timeout, retries=retries
+    )
@@ -0,0 +1,254 @@
+"""Timings of the steps of the install and project creation flows.
+
+Work is measured in spans::
+
+    with telemetry.span("Rendering project template", app_name=app_name) as span:
+        ...
+        span.add("bytes_written", size)
+
+Spans nest per thread: every job is a span, each of its steps a child span,
+and each command a step runs a grandchild span with the command's exit
+code and the bytes of output it produced. Finished spans are appended, one
+JSON object per line, to ``telemetry.jsonl`` in the launcher log directory
+(``app.paths.logs``). The log is rotated once it grows past
+``MAX_LOG_BYTES``, keeping ``LOG_BACKUPS`` older files.
+
+``summarize`` aggregates the spans of all runs in the log into percentiles;
+``python -m nadoo_launchpad timings`` prints them.
+
+This module is imported while the launcher window is being built, so it only
+uses the standard library.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+LOG_FILE = "telemetry.jsonl"
+
+# Rotate the log past this size, keeping this many old logs
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# The percentiles reported by summarize
+PERCENTILES = (50, 90, 99)
+
+
+class Span:
+    def __init__(self, name, parent=None, attributes=None):
+        """A measured piece of work.
+
+        :param name: What is measured; spans with the same name are
+            aggregated together.
+        :param parent: The enclosing span, if any.
+        :param attributes: Extra JSON serializable values to record.
+        """
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        # All spans of a job share the id of the job's span.
+        self.run_id = parent.run_id if parent is not None else self.id
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.started = time.time()
+        self.duration = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key, amount):
+        """Add to a counter attribute, such as ``bytes_written``."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def record(self):
+        return {
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent.id if self.parent is not None else None,
+            "run": self.run_id,
+            "started": self.started,
+            "duration": self.duration,
+            "status": self.status,
+            **self.attributes,
+        }
+
+
+class TelemetryLog:
+    def __init__(self, log_dir, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+        """An append only JSONL log that rotates itself.
+
+        :param log_dir: The launcher log directory.
+        :param max_bytes: The size past which the log is rotated.
+        :param backups: How many rotated logs to keep.
+        """
+        self.path = Path(log_dir) / LOG_FILE
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def backup_path(self, number) -> Path:
+        return self.path.with_name(f"{self.path.name}.{number}")
+
+    def paths(self):
+        """The log files, oldest first."""
+        return [self.backup_path(n) for n in range(self.backups, 0, -1)] + [self.path]
+
+    def _rotate(self):
+        for number in range(self.backups - 1, 0, -1):
+            try:
+                os.replace(self.backup_path(number), self.backup_path(number + 1))
+            except FileNotFoundError:
+                pass
+        if self.backups:
+            os.replace(self.path, self.backup_path(1))
+        else:
+            os.unlink(self.path)
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A single append of a whole line, so concurrent launchers
+            # never interleave their records.
+            with open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.write(line)
+                size = log_file.tell()
+            if size > self.max_bytes:
+                try:
+                    self._rotate()
+                except FileNotFoundError:
+                    # Another launcher rotated it first.
+                    pass
+
+    def read(self):
+        """Every record in the log, oldest first; unreadable lines are skipped."""
+        for path in self.paths():
+            try:
+                with open(path, "r", encoding="utf-8") as log_file:
+                    for line in log_file:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            # Cut off by a crash
+                            continue
+            except FileNotFoundError:
+                continue
+
+
+_log = None
+_local = threading.local()
+
+
+def configure(log_dir):
+    """Write spans to the log in a directory.
+
+    Until the log is configured, spans are measured but not written.
+    """
+    global _log
+    _log = TelemetryLog(log_dir) if log_dir is not None else None
+
+
+def current_span():
+    """The innermost open span of this thread, or ``None``."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def add(key, amount):
+    """Add to a counter attribute of the current span, if there is one."""
+    current = current_span()
+    if current is not None:
+        current.add(key, amount)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Measure the wall time of the enclosed block.
+
+    An exception leaving the block marks the span as failed, unless the
+    block already set another status.
+
+    :param name: What is measured.
+    :param attributes: Extra values to record.
+    :returns: The ``Span``.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    current = Span(name, parent=stack[-1] if stack else None, attributes=attributes)
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        if current.status == "ok":
+            current.status = "error"
+        current.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        stack.pop()
+        current.finish()
+        log = _log
+        if log is not None:
+            try:
+                log.write(current.record())
+            except OSError:
+                # Telemetry never breaks the work it measures.
+                pass
+
+
+def percentile(values, percent):
+    """A percentile of sorted values, interpolating between neighbours."""
+    if not values:
+        return None
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(records, kinds=None):
+    """Aggregate the spans of many runs by name.
+
+    :param records: Span records, as read from a ``TelemetryLog``.
+    :param kinds: Only aggregate spans with one of these ``kind`` attributes.
+    :returns: A dict of span name to ``count``, ``failed``, ``mean``, ``max``
+        and ``p50``, ``p90``, ``p99`` durations, and the total
+        ``bytes_written``; in the order the names first appear.
+    """
+    durations = {}
+    failed = {}
+    written = {}
+    for record in records:
+        if kinds is not None and record.get("kind") not in kinds:
+            continue
+        if record.get("duration") is None:
+            continue
+        name = record["name"]
+        durations.setdefault(name, []).append(record["duration"])
+        failed[name] = failed.get(name, 0) + (record.get("status") != "ok")
+        written[name] = written.get(name, 0) + record.get("bytes_written", 0)
+
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "failed": failed[name],
+            "mean": sum(values) / len(values),
+            "max": values[-1],
+            **{f"p{percent}": percentile(values, percent) for percent in PERCENTILES},
+            "bytes_written": written[name],
+        }
+    return summary
+
+
+def read_summary(log_dir, kinds=None):
+    """Aggregate the spans in the log of a log directory."""
+    return summarize(TelemetryLog(log_dir).read(), kinds=kinds)
@@ -0,0 +1,391 @@
+"""Local mirror of the cookiecutter templates.
+
+Each template URL gets a bare mirror, plus one git worktree per commit::
+
+    ~/.cookiecutters/<name>.mirror/
+        repo.git/           bare mirror of the template remote
+        worktrees/<sha>/    a checkout of a single commit
+        lock                guards the mirror against concurrent updates
+
+Worktrees are keyed by SHA, so they never change once they exist: switching
+between branches costs nothing, and parallel renders of different branches
+can't interfere with each other. After every fetch, the worktrees of commits
+no branch points at anymore are pruned once they have been unused for a day.
+
+Fetching the remote on every project creation is slow on a VPN and noisy
+when offline. Next to the template cache (see ``cookiecutter_cache_path``) a
+small JSON file records when the mirror was last fetched and the SHA each
+branch resolved to. Within the TTL the fetch is skipped entirely.
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+from nadoo_launchpad.fileops import atomic_write
+from nadoo_launchpad.locks import FileLock
+
+# Seconds a fetched template cache is considered current.
+TEMPLATE_CACHE_TTL = int(os.environ.get("NADOO_TEMPLATE_CACHE_TTL", 15 * 60))
+
+# Seconds an unused worktree is kept before it can be pruned.
+WORKTREE_GRACE_PERIOD = 24 * 60 * 60
+
+FRESHNESS_SUFFIX = ".freshness.json"
+MIRROR_SUFFIX = ".mirror"
+
+
+def _cache_path(template) -> Path:
+    from nadoo_launchpad.utils import cookiecutter_cache_path
+
+    return cookiecutter_cache_path(template)
+
+
+def mirror_root(template) -> Path:
+    cache_path = _cache_path(template)
+    return cache_path.with_name(cache_path.name + MIRROR_SUFFIX)
+
+
+def mirror_path(template) -> Path:
+    return mirror_root(template) / "repo.git"
+
+
+def worktree_path(template, sha) -> Path:
+    return mirror_root(template) / "worktrees" / sha
+
+
+def worktree_sha(template, path):
+    """The SHA checked out in a path, if it is a worktree of the mirror."""
+    path = Path(path)
+    if path.parent == mirror_root(template) / "worktrees":
+        return path.name
+    return None
+
+
+def _ready_marker(worktree) -> Path:
+    return worktree.with_name(worktree.name + ".ready")
+
+
+def _use_worktree(worktree) -> bool:
+    """Mark a worktree as used now, so it isn't pruned while a render reads it.
+
+    :returns: False if the worktree isn't (or is no longer) checked out.
+    """
+    try:
+        os.utime(_ready_marker(worktree))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def mirror_lock(template) -> FileLock:
+    return FileLock(mirror_root(template) / "lock")
+
+
+def freshness_path(cached_template) -> Path:
+    cached_template = Path(cached_template)
+    return cached_template.with_name(cached_template.name + FRESHNESS_SUFFIX)
+
+
+def read_freshness(cached_template) -> dict:
+    """Read the freshness metadata of a cached template.
+
+    :param cached_template: The template cache path (``cookiecutter_cache_path``).
+    :returns: A dict with ``last_fetch`` (epoch seconds, or None),
+        ``branches`` (branch name to SHA, for the branches checked out so
+        far) and ``heads`` (every branch of the last fetch, or None).
+    """
+    try:
+        with open(freshness_path(cached_template), "r") as freshness_file:
+            freshness = json.load(freshness_file)
+    except (FileNotFoundError, ValueError):
+        freshness = {}
+    freshness.setdefault("last_fetch", None)
+    freshness.setdefault("branches", {})
+    freshness.setdefault("heads", None)
+    return freshness
+
+
+def write_freshness(cached_template, freshness):
+    path = freshness_path(cached_template)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path) as freshness_file:
+        json.dump(freshness, freshness_file, indent=2)
+
+
+def is_fresh(freshness, ttl=None) -> bool:
+    """Was the cache fetched within the TTL?"""
+    if ttl is None:
+        ttl = TEMPLATE_CACHE_TTL
+    last_fetch = freshness["last_fetch"]
+    return last_fetch is not None and time.time() - last_fetch < ttl
+
+
+def _record_fetch(repo, template, freshness):
+    freshness["last_fetch"] = time.time()
+    freshness["heads"] = sorted(head.name for head in repo.heads)
+    for branch in list(freshness["branches"]):
+        try:
+            freshness["branches"][branch] = repo.heads[branch].commit.hexsha
+        except IndexError:
+            # The branch has been deleted upstream.
+            del freshness["branches"][branch]
+    write_freshness(_cache_path(template), freshness)
+
+
+def open_mirror(template, freshness):
+    """Open the mirror of a template, cloning it if needed.
+
+    The caller must hold the mirror lock.
+
+    :returns: A ``(repo, fetched)`` tuple; ``fetched`` is True if the mirror
+        was just cloned.
+    :raises git.exc.GitCommandError: If the mirror can't be cloned.
+    """
+    import git
+
+    path = mirror_path(template)
+    if (path / "HEAD").exists():
+        return git.Repo(path), False
+
+    # Clean up after an interrupted clone.
+    shutil.rmtree(path, ignore_errors=True)
+    repo = git.Repo.clone_from(template, path, mirror=True)
+    _record_fetch(repo, template, freshness)
+    return repo, True
+
+
+def fetch(repo, template, freshness):
+    """Fetch the mirror, recording the fetch time.
+
+    The caller must hold the mirror lock.
+
+    :returns: True if the fetch succeeded.
+    """
+    import git
+
+    try:
+        repo.remote(name="origin").fetch(prune=True)
+    except git.exc.GitCommandError:
+        # We are offline, or otherwise unable to contact the origin git
+        # repo. It's OK to continue with the cached template.
+        return False
+    _record_fetch(repo, template, freshness)
+    return True
+
+
+def ensure_worktree(repo, template, sha) -> Path:
+    """Check out a commit of the mirror into its own worktree.
+
+    The caller must hold the mirror lock.
+    """
+    path = worktree_path(template, sha)
+    if _use_worktree(path):
+        return path
+
+    # Clean up after an interrupted checkout.
+    shutil.rmtree(path, ignore_errors=True)
+    repo.git.worktree("prune")
+    repo.git.worktree("add", "--detach", str(path), sha)
+    _ready_marker(path).touch()
+    return path
+
+
+def checkout_template(template, branch, ttl=None, force_refresh=False):
+    """Get a worktree of a template branch, updating the mirror if needed.
+
+    :param template: The template URL.
+    :param branch: The template branch.
+    :param ttl: Seconds a fetch stays current. Default: ``TEMPLATE_CACHE_TTL``
+    :param force_refresh: Fetch even if the cache is current.
+    :returns: A ``(path, sha)`` tuple for the worktree of the branch.
+    :raises IndexError: If the branch doesn't exist.
+    :raises git.exc.GitCommandError: If the mirror can't be cloned.
+    """
+    cache_path = _cache_path(template)
+    freshness = read_freshness(cache_path)
+    sha = freshness["branches"].get(branch)
+    if (
+        sha is not None
+        and not force_refresh
+        and is_fresh(freshness, ttl)
+        and _use_worktree(worktree_path(template, sha))
+    ):
+        # Nothing to update; don't even wait for the lock.
+        return worktree_path(template, sha), sha
+
+    with mirror_lock(template):
+        # Another process may have updated the mirror while we waited.
+        freshness = read_freshness(cache_path)
+        repo, fetched = open_mirror(template, freshness)
+        if not fetched and (force_refresh or not is_fresh(freshness, ttl)):
+            fetched = fetch(repo, template, freshness)
+
+        try:
+            sha = repo.heads[branch].commit.hexsha
+        except IndexError:
+            if fetched:
+                raise
+            # The branch may have been created since the last fetch.
+            fetched = fetch(repo, template, freshness)
+            sha = repo.heads[branch].commit.hexsha
+
+        if freshness["branches"].get(branch) != sha:
+            freshness["branches"][branch] = sha
+            write_freshness(cache_path, freshness)
+        path = ensure_worktree(repo, template, sha)
+    if fetched:
+        # The fetch may have moved branches off older worktrees.
+        prune_worktrees(template, keep=set(freshness["branches"].values()))
+    return path, sha
+
+
+def checkout_commit(template, sha):
+    """Get a worktree of a template commit, e.g. the one a project was
+    rendered from.
+
+    :param template: The template URL.
+    :param sha: The full SHA of the commit.
+    :returns: The path of the worktree.
+    :raises ValueError: If the mirror doesn't have the commit, even after a
+        fetch.
+    :raises git.exc.GitCommandError: If the mirror can't be cloned.
+    """
+    import gitdb
+
+    path = worktree_path(template, sha)
+    if _use_worktree(path):
+        return path
+
+    with mirror_lock(template):
+        freshness = read_freshness(_cache_path(template))
+        repo, fetched = open_mirror(template, freshness)
+        try:
+            repo.commit(sha)
+        except (ValueError, gitdb.exc.BadName):
+            if fetched or not fetch(repo, template, freshness):
+                raise ValueError(f"The template has no commit {sha}")
+            try:
+                repo.commit(sha)
+            except (ValueError, gitdb.exc.BadName) as e:
+                raise ValueError(f"The template has no commit {sha}") from e
+        return ensure_worktree(repo, template, sha)
+
+
+def resolve_branch(template, candidates, ttl=None, force_refresh=False):
+    """The first of several branches that exists in the template.
+
+    Within the TTL this only reads the branch list recorded at the last
+    fetch; otherwise the mirror is cloned or fetched first.
+
+    :param template: The template URL.
+    :param candidates: Branch names, in order of preference.
+    :param ttl: Seconds a fetch stays current. Default: ``TEMPLATE_CACHE_TTL``
+    :param force_refresh: Fetch even if the cache is current.
+    :returns: The branch.
+    :raises IndexError: If none of the branches exist.
+    :raises git.exc.GitCommandError: If the mirror can't be cloned.
+    """
+    cache_path = _cache_path(template)
+    freshness = read_freshness(cache_path)
+    if not force_refresh and is_fresh(freshness, ttl) and freshness["heads"] is not None:
+        for branch in candidates:
+            if branch in freshness["heads"]:
+                return branch
+
+    with mirror_lock(template):
+        freshness = read_freshness(cache_path)
+        repo, fetched = open_mirror(template, freshness)
+        if not fetched and (
+            force_refresh or not is_fresh(freshness, ttl) or freshness["heads"] is None
+        ):
+            fetched = fetch(repo, template, freshness)
+        heads = {head.name for head in repo.heads}
+    if fetched:
+        prune_worktrees(template, keep=set(freshness["branches"].values()))
+    for branch in candidates:
+        if branch in heads:
+            return branch
+    raise IndexError(f"None of the branches {', '.join(candidates)} exist")
+
+
+def prune_worktrees(template, keep, grace_period=WORKTREE_GRACE_PERIOD):
+    """Remove the worktrees of commits no branch points at anymore.
+
+    Worktrees used within the grace period are kept, because a render may
+    still be reading them; every checkout of a worktree touches its
+    ``.ready`` marker.
+
+    :param keep: The SHAs to keep.
+    :returns: The SHAs that were removed.
+    """
+    import git
+
+    worktrees = mirror_root(template) / "worktrees"
+    if not worktrees.exists():
+        return []
+    removed = []
+    with mirror_lock(template):
+        repo = git.Repo(mirror_path(template))
+        for ready in worktrees.glob("*.ready"):
+            sha = ready.name[: -len(".ready")]
+            if sha in keep or time.time() - ready.stat().st_mtime < grace_period:
+                continue
+            ready.unlink()
+            shutil.rmtree(worktrees / sha, ignore_errors=True)
+            removed.append(sha)
+        if removed:
+            repo.git.worktree("prune")
+    return removed
+
+
+def refresh_template_cache(template, ttl=None, force_refresh=False):
+    """Fetch the mirror of a template if it is stale.
+
+    :param template: The template URL.
+    :param ttl: Seconds a fetch stays current. Default: ``TEMPLATE_CACHE_TTL``
+    :param force_refresh: Fetch even if the cache is current.
+    :returns: True if the mirror was fetched.
+    """
+    import git
+
+    cache_path = _cache_path(template)
+    if not force_refresh and is_fresh(read_freshness(cache_path), ttl):
+        return False
+    if not (mirror_path(template) / "HEAD").exists():
+        # Nothing to refresh; the mirror is cloned on first use.
+        return False
+    with mirror_lock(template):
+        freshness = read_freshness(cache_path)
+        fetched = fetch(git.Repo(mirror_path(template)), template, freshness)
+    if fetched:
+        prune_worktrees(template, keep=set(freshness["branches"].values()))
+    return fetched
+
+
+class TemplateCacheRefresher(threading.Thread):
+    def __init__(self, template, interval=None):
+        """Keep a template cache fresh from a background thread.
+
+        :param template: The template URL.
+        :param interval: Seconds between checks. Default: the TTL, so a
+            project creation never has to fetch.
+        """
+        super().__init__(name="nadoo-template-refresher", daemon=True)
+        self.template = template
+        self.interval = TEMPLATE_CACHE_TTL if interval is None else interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                refresh_template_cache(self.template, ttl=self.interval)
+            except Exception as e:
+                print(f"Unable to refresh template cache: {e}", file=sys.stderr)
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
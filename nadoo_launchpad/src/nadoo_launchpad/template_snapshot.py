@@ -0,0 +1,217 @@
+"""Cached renders of the project template.
+
+Most of a rendered project doesn't depend on the context at all: icons, CI
+files and static resources come out of cookiecutter exactly as they went in.
+For each template SHA the template is split once into two layers::
+
+    <cache>/template-snapshots/<sha>/
+        manifest.json       which files are static
+        static/<n>          static files, exactly as cookiecutter writes them
+        template/           the template with every static file replaced by
+                            a small placeholder
+
+A project is rendered by running cookiecutter over the reduced template,
+which only has to render the dynamic files, and then swapping every
+placeholder for its static file. Static files are materialized with
+reflinks or an in-kernel copy; never with hardlinks, because project files
+are edited in place.
+
+Templates with hooks or custom Jinja settings are rendered with plain
+cookiecutter.
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from nadoo_launchpad.fileops import Linker
+
+SNAPSHOT_DIR = "template-snapshots"
+MANIFEST_FILE = "manifest.json"
+PLACEHOLDER_SUFFIX = ".nadoo-static"
+
+# Any of these in a file means it has to be rendered for every project.
+JINJA_MARKERS = (b"{{", b"{%", b"{#")
+
+# Context variables that differ between a render of the reduced template
+# and a plain render.
+PATH_VARIABLES = (b"_repo_dir", b"cookiecutter._template")
+
+
+class SnapshotUnsupported(Exception):
+    """The template can't be split into a static and a dynamic layer."""
+
+
+def snapshot_path(cache_dir, sha) -> Path:
+    return Path(cache_dir) / SNAPSHOT_DIR / sha
+
+
+def _detect_newline(infile, context):
+    # The same newline handling as cookiecutter.generate.generate_file
+    if context["cookiecutter"].get("_new_lines", False):
+        return context["cookiecutter"]["_new_lines"]
+    with open(infile, encoding="utf-8") as rd:
+        rd.readline()
+    return rd.newlines[0] if isinstance(rd.newlines, tuple) else rd.newlines
+
+
+def _split_template(template_path, target):
+    """Split a template into its static and dynamic layers.
+
+    :param template_path: The checked out template.
+    :param target: The snapshot directory to populate.
+    :returns: The manifest.
+    :raises SnapshotUnsupported: If the template can't be split.
+    """
+    from binaryornot.check import is_binary
+    from cookiecutter.environment import StrictEnvironment
+    from cookiecutter.find import find_template
+    from cookiecutter.generate import is_copy_only_path
+    from cookiecutter.utils import work_in
+    from jinja2 import FileSystemLoader
+
+    with open(template_path / "cookiecutter.json", encoding="utf-8") as context_file:
+        context = {"cookiecutter": json.load(context_file)}
+    if (template_path / "hooks").exists():
+        raise SnapshotUnsupported("the template has hooks")
+    if {"_jinja2_env_vars", "template", "templates"} & set(context["cookiecutter"]):
+        raise SnapshotUnsupported("the template has custom Jinja settings")
+
+    reduced = target / "template"
+    shutil.copytree(template_path, reduced, ignore=shutil.ignore_patterns(".git"))
+    static_dir = target / "static"
+    static_dir.mkdir()
+
+    env = StrictEnvironment(context=context, keep_trailing_newline=True)
+    template_dir = find_template(template_path, env)
+    reduced_template_dir = reduced / Path(template_dir).relative_to(template_path)
+    static = {}
+    copy_only_dirs = set()
+    with work_in(template_dir):
+        env.loader = FileSystemLoader([".", "../templates"])
+        for root, dirs, files in os.walk("."):
+            root = os.path.normpath(root)
+            for name in dirs:
+                path = os.path.normpath(os.path.join(root, name))
+                # cookiecutter copies everything below a copy only dir.
+                if root in copy_only_dirs or is_copy_only_path(path, context):
+                    copy_only_dirs.add(path)
+            for name in sorted(files):
+                infile = os.path.normpath(os.path.join(root, name))
+                with open(infile, "rb") as source:
+                    content = source.read()
+                static_file = static_dir / str(len(static))
+
+                if (
+                    root in copy_only_dirs
+                    or is_copy_only_path(infile, context)
+                    or is_binary(infile)
+                ):
+                    shutil.copyfile(infile, static_file)
+                elif any(marker in content for marker in JINJA_MARKERS):
+                    # Dynamic; left in the reduced template.
+                    if any(variable in content for variable in PATH_VARIABLES):
+                        raise SnapshotUnsupported("the template renders its own path")
+                    continue
+                else:
+                    rendered = env.get_template(infile.replace(os.path.sep, "/")).render()
+                    newline = _detect_newline(infile, context)
+                    with open(static_file, "w", encoding="utf-8", newline=newline) as fh:
+                        fh.write(rendered)
+                shutil.copymode(infile, static_file)
+
+                # Swap the file for a placeholder that records its index.
+                index = len(static)
+                static[index] = infile
+                reduced_file = reduced_template_dir / infile
+                reduced_file.unlink()
+                with open(f"{reduced_file}{PLACEHOLDER_SUFFIX}", "w") as placeholder:
+                    placeholder.write(str(index))
+
+    return {"supported": True, "static": static}
+
+
+def ensure_snapshot(template_path, sha, cache_dir):
+    """Get the snapshot of a template SHA, building it if needed.
+
+    :param template_path: The checked out template at ``sha``.
+    :param sha: The template SHA.
+    :param cache_dir: The launcher cache directory (``app.paths.cache``).
+    :returns: The snapshot directory and its manifest.
+    :raises SnapshotUnsupported: If the template can't be split.
+    """
+    target = snapshot_path(cache_dir, sha)
+    manifest_path = target / MANIFEST_FILE
+    if not manifest_path.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        build_path = Path(tempfile.mkdtemp(prefix=f".{sha}-", dir=target.parent))
+        try:
+            try:
+                manifest = _split_template(Path(template_path), build_path)
+            except SnapshotUnsupported as e:
+                # Remember that, so the template isn't scanned again.
+                manifest = {"supported": False, "reason": str(e)}
+            with open(build_path / MANIFEST_FILE, "w") as manifest_file:
+                json.dump(manifest, manifest_file)
+            try:
+                build_path.rename(target)
+            except OSError:
+                # Another launcher built the same snapshot at the same time.
+                if not manifest_path.exists():
+                    raise
+        finally:
+            shutil.rmtree(build_path, ignore_errors=True)
+
+    with open(manifest_path, "r") as manifest_file:
+        manifest = json.load(manifest_file)
+    if not manifest["supported"]:
+        raise SnapshotUnsupported(manifest["reason"])
+    return target, manifest
+
+
+def _fill_placeholders(project_dir, snapshot, linker):
+    for placeholder in list(Path(project_dir).rglob(f"*{PLACEHOLDER_SUFFIX}")):
+        index = placeholder.read_text()
+        name = placeholder.name[: -len(PLACEHOLDER_SUFFIX)]
+        placeholder.unlink()
+        if name:
+            # An empty name means cookiecutter would have skipped the file.
+            linker(snapshot / "static" / index, placeholder.with_name(name))
+
+
+def render_template(template_path, sha, cache_dir, output_path, extra_context, checkout=None):
+    """Render a template like cookiecutter, reusing cached layers.
+
+    The result is byte-identical to a plain cookiecutter render.
+
+    :param template_path: The checked out template.
+    :param sha: The SHA of the checked out template.
+    :param cache_dir: The launcher cache directory.
+    :param output_path: The directory to render the project into.
+    :param extra_context: Extra context to pass to the template.
+    :param checkout: The template branch, for the template context.
+    :returns: The path to the rendered project.
+    """
+    from cookiecutter.main import cookiecutter
+
+    try:
+        snapshot, manifest = ensure_snapshot(template_path, sha, cache_dir)
+    except SnapshotUnsupported:
+        return cookiecutter(
+            str(template_path),
+            no_input=True,
+            output_dir=str(output_path),
+            checkout=checkout,
+            extra_context=extra_context,
+        )
+
+    project_dir = cookiecutter(
+        str(snapshot / "template"),
+        no_input=True,
+        output_dir=str(output_path),
+        checkout=checkout,
+        extra_context=extra_context,
+    )
+    _fill_placeholders(project_dir, snapshot, Linker(hardlinks=False))
+    return project_dir
@@ -0,0 +1,260 @@
+"""In-place upgrades of projects to a newer template commit.
+
+A project records the template SHA and the context it was rendered with
+(see ``registry.register_project``). To upgrade it, the template is
+rendered twice with that context, into memory:
+
+* the *old* render, at the recorded SHA: what the project looked like
+  before anyone edited it;
+* the *new* render, at the new SHA.
+
+The two renders and the working tree are merged file by file, like
+``git merge``:
+
+* files the template didn't change are skipped without reading the
+  working tree, which is most of them;
+* files nobody edited since the project was created get the new content;
+* files both the template and the project changed are merged line by line
+  with ``git merge-file``; overlapping edits are written with conflict
+  markers and reported.
+
+Only files whose content actually changes are written, each atomically, so
+a template bump touches a handful of files per project. Both renders reuse
+the cached static layer of the template (see ``template_snapshot``).
+"""
+import os
+import stat
+import subprocess
+import tempfile
+from pathlib import Path
+
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.fileops import atomic_write
+from nadoo_launchpad.supervisor import run_command
+
+# The kinds of change an upgrade makes
+ADDED = "added"
+UPDATED = "updated"
+MERGED = "merged"
+DELETED = "deleted"
+# Written with conflict markers
+CONFLICT = "conflict"
+# Left alone; the project changed or deleted it, and it can't be merged
+KEPT = "kept"
+
+
+class UpgradeError(Exception):
+    """A project can't be upgraded."""
+
+
+def read_render(path):
+    """Read a rendered project into memory.
+
+    :param path: The rendered project.
+    :returns: A dict of relative POSIX path to ``(content, executable)``.
+    """
+    path = Path(path)
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            file_path = Path(dirpath) / name
+            files[file_path.relative_to(path).as_posix()] = _read_file(file_path)
+    return files
+
+
+def _read_file(path):
+    """A file as ``(content, executable)``, or ``None`` if it doesn't exist."""
+    try:
+        with open(path, "rb") as file:
+            return file.read(), bool(os.fstat(file.fileno()).st_mode & stat.S_IXUSR)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+
+
+def render_files(template, sha, context, cache_dir, branch=None):
+    """Render a template commit into memory.
+
+    :param template: The template URL.
+    :param sha: The template commit.
+    :param context: The template context.
+    :param cache_dir: The launcher cache directory.
+    :param branch: The template branch, for the template context.
+    :returns: The rendered files; see ``read_render``.
+    """
+    from nadoo_launchpad import template_cache, template_snapshot
+
+    worktree = template_cache.checkout_commit(template, sha)
+    with tempfile.TemporaryDirectory(prefix=".nadoo-render-") as render_path:
+        project_dir = template_snapshot.render_template(
+            worktree,
+            sha,
+            cache_dir,
+            output_path=render_path,
+            extra_context=context,
+            checkout=branch,
+        )
+        return read_render(project_dir)
+
+
+def merge_file(
+    base,
+    current,
+    other,
+    labels=("project", "old template", "new template"),
+    run=run_command,
+):
+    """Merge the changes from ``base`` to ``other`` into ``current``.
+
+    :param base: The common ancestor.
+    :param current: The content in the project.
+    :param other: The content in the new render.
+    :param labels: The names of ``current``, ``base`` and ``other`` in
+        conflict markers.
+    :param run: Runs a command.
+    :returns: A ``(content, conflicted)`` tuple.
+    """
+    with tempfile.TemporaryDirectory(prefix=".nadoo-merge-") as merge_path:
+        paths = []
+        for name, content in [("current", current), ("base", base), ("other", other)]:
+            path = Path(merge_path) / name
+            path.write_bytes(content)
+            paths.append(path)
+        # Merged in place rather than with --stdout; the supervisor reads
+        # output as text, and the result must stay byte for byte.
+        args = ["git", "merge-file", "-q"]
+        for label in labels:
+            args += ["-L", label]
+        try:
+            run(args + paths)
+            conflicted = False
+        except subprocess.CalledProcessError as e:
+            # The exit code is the number of conflicts; negative (>127) on
+            # errors.
+            if not 0 < e.returncode < 128:
+                raise
+            conflicted = True
+        return paths[0].read_bytes(), conflicted
+
+
+def _is_binary(*contents):
+    return any(b"\0" in content for content in contents if content is not None)
+
+
+def plan_upgrade(old, new, project_path):
+    """Three-way merge two renders and a project.
+
+    :param old: The render the project was created from; see ``read_render``.
+    :param new: The render of the new template.
+    :param project_path: The project.
+    :returns: A list of ``(path, kind, file)`` tuples, sorted by path. ``file``
+        is the ``(content, executable)`` to write, or ``None`` for deletions
+        and kept files.
+    """
+    project_path = Path(project_path)
+    changes = []
+    for path in sorted(old.keys() | new.keys()):
+        base = old.get(path)
+        other = new.get(path)
+        if base == other:
+            # The template didn't change it; whatever the project did stays.
+            continue
+        current = _read_file(project_path / path)
+        if current == other:
+            # The project already has the new content.
+            continue
+        if current == base:
+            # Nobody touched it since it was rendered.
+            if other is None:
+                changes.append((path, DELETED, None))
+            else:
+                changes.append((path, ADDED if current is None else UPDATED, other))
+        elif current is None or other is None:
+            # Deleted on one side, edited on the other; the project wins.
+            changes.append((path, KEPT, None))
+        elif _is_binary(base and base[0], current[0], other[0]):
+            changes.append((path, KEPT, None))
+        else:
+            content, conflicted = merge_file(base[0] if base else b"", current[0], other[0])
+            # The template's executable bit wins, unless only the project
+            # changed it.
+            executable = current[1] if base and base[1] == other[1] else other[1]
+            if not conflicted and (content, executable) == current:
+                continue
+            changes.append((path, CONFLICT if conflicted else MERGED, (content, executable)))
+    return changes
+
+
+def _write_file(target, file):
+    content, executable = file
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    executable_bits = stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+    mode = (mode | executable_bits) if executable else (mode & ~executable_bits)
+    with atomic_write(target, "wb", permissions=mode) as target_file:
+        target_file.write(content)
+
+
+def apply_upgrade(project_path, changes):
+    """Write the changes of ``plan_upgrade`` to a project.
+
+    :returns: The number of bytes written.
+    """
+    project_path = Path(project_path)
+    written = 0
+    for path, kind, file in changes:
+        target = project_path / path
+        if kind == DELETED:
+            target.unlink()
+            # Remove the directories the template no longer has.
+            parent = target.parent
+            while parent != project_path:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+        elif file is not None:
+            _write_file(target, file)
+            written += len(file[0])
+    return written
+
+
+def upgrade_project(project, template, sha, cache_dir, context, dry_run=False):
+    """Upgrade a registered project to a template commit, in place.
+
+    :param project: The ``Project`` to upgrade.
+    :param template: The template URL.
+    :param sha: The template commit to upgrade to.
+    :param cache_dir: The launcher cache directory.
+    :param context: The template context for the new render.
+    :param dry_run: Only work out the changes.
+    :returns: The changes; see ``plan_upgrade``.
+    :raises UpgradeError: If the project can't be upgraded.
+    """
+    if not project.template_sha or not project.context:
+        raise UpgradeError(
+            f"'{project.app_name}' was created without recording its template; "
+            "it can't be upgraded."
+        )
+    if not Path(project.path).is_dir():
+        raise UpgradeError(f"'{project.app_name}' no longer exists in {project.path}.")
+    if project.template_sha == sha:
+        return []
+
+    old = render_files(
+        template,
+        project.template_sha,
+        project.context,
+        cache_dir,
+        branch=project.context.get("template_branch"),
+    )
+    new = render_files(
+        template, sha, context, cache_dir, branch=context.get("template_branch")
+    )
+    changes = plan_upgrade(old, new, project.path)
+    if not dry_run:
+        telemetry.add("bytes_written", apply_upgrade(project.path, changes))
+    return changes
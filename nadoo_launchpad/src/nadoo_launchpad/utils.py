@@ -1,22 +1,24 @@
+from __future__ import annotations
+
 import os
 import platform
 import re
+import shutil
 import unicodedata
 import subprocess
-from briefcase.exceptions import (
-    InvalidTemplateRepository,
-    NetworkFailure,
-    TemplateUnsupportedVersion,
-    BriefcaseCommandError,
-)
-from cookiecutter import exceptions as cookiecutter_exceptions
-from cookiecutter.main import cookiecutter
-from cookiecutter.repository import is_repo_url
+import sys
+import tempfile
 from pathlib import Path
-import toga
-import toml
+from typing import TYPE_CHECKING
+
+from nadoo_launchpad.supervisor import NETWORK_RETRIES, run_command
+
+if TYPE_CHECKING:
+    # Only for annotations; the CLI uses this module without Toga.
+    import toga
 
-cookiecutter = staticmethod(cookiecutter)
+# Briefcase, cookiecutter, git and toml are imported where they are used, so
+# that starting the launcher doesn't pay for them before a project is created.
 
 def make_app_name(formal_name):
     """Construct a candidate app name from a formal name.
@@ -43,7 +45,9 @@ def make_module_name(app_name):
     return app_name.replace("-", "_")
 
 
-def generate_template(template, branch, output_path, extra_context):
+def generate_template(
+    template, branch, output_path, extra_context, force_refresh=False, cache_dir=None
+):
     """Ensure the named template is up-to-date for the given branch, and roll out
     that template.
 
@@ -51,20 +55,49 @@ def generate_template(template, branch, output_path, extra_context):
     :param branch: The branch of the template to use
     :param output_path: The filesystem path where the template will be generated.
     :param extra_context: Extra context to pass to the cookiecutter template
+    :param force_refresh: Fetch the template even if the cache is current.
+    :param cache_dir: The launcher cache directory. If given, renders reuse
+        the cached static layer of the template.
+    :returns: The SHA of the rendered template commit, or ``None`` if the
+        template is a local path.
     """
+    from briefcase.exceptions import (
+        InvalidTemplateRepository,
+        NetworkFailure,
+        TemplateUnsupportedVersion,
+    )
+    from cookiecutter import exceptions as cookiecutter_exceptions
+    from cookiecutter.main import cookiecutter
+
     # Make sure we have an updated cookiecutter template,
     # checked out to the right branch
-    cached_template = update_cookiecutter_cache(template=template, branch=branch)
+    cached_template = update_cookiecutter_cache(
+        template=template, branch=branch, force_refresh=force_refresh
+    )
+
+    from nadoo_launchpad import template_cache, template_snapshot
 
+    sha = template_cache.worktree_sha(template, cached_template)
     try:
-        # Unroll the template
-        cookiecutter(
-            str(cached_template),
-            no_input=True,
-            output_dir=str(output_path),
-            checkout=branch,
-            extra_context=extra_context,
-        )
+        if cache_dir is not None and sha is not None:
+            # Unroll the template, reusing the cached static files
+            template_snapshot.render_template(
+                cached_template,
+                sha,
+                cache_dir,
+                output_path=output_path,
+                extra_context=extra_context,
+                checkout=branch,
+            )
+        else:
+            # Unroll the template
+            cookiecutter(
+                str(cached_template),
+                no_input=True,
+                output_dir=str(output_path),
+                checkout=branch,
+                extra_context=extra_context,
+            )
     except subprocess.CalledProcessError as e:
         # Computer is offline
         # status code == 128 - certificate validation error.
@@ -76,70 +109,53 @@ def generate_template(template, branch, output_path, extra_context):
     except cookiecutter_exceptions.RepositoryCloneFailed as e:
         # Branch does not exist.
         raise TemplateUnsupportedVersion(branch) from e
+    return sha
 
 
-def update_cookiecutter_cache(template: str, branch="master"):
+def update_cookiecutter_cache(template: str, branch="master", ttl=None, force_refresh=False):
     """Ensure that we have a current checkout of a template path.
 
     If the path is a local path, use the path as is.
 
-    If the path is a URL, look for a local cache; if one exists, update it,
-    including checking out the required branch.
+    If the path is a URL, use a worktree of the required branch from the
+    launcher's mirror of the template, cloning the mirror if needed. The
+    remote is only fetched if the mirror is older than the TTL.
 
     :param template: The template URL or path.
     :param branch: The template branch to use. Default: ``master``
+    :param ttl: Seconds a fetch of the template stays current. Default:
+        ``template_cache.TEMPLATE_CACHE_TTL``
+    :param force_refresh: Fetch the template even if the cache is current.
     :return: The path to the cached template. This may be the originally
         provided path if the template was a file path.
     """
+    from cookiecutter.repository import is_repo_url
+
     if is_repo_url(template):
-        # The app template is a repository URL.
-        #
-        # When in `no_input=True` mode, cookiecutter deletes and reclones
-        # a template directory, rather than updating the existing repo.
-        #
-        # Look for a cookiecutter cache of the template; if one exists,
-        # try to update it using git. If no cache exists, or if the cache
-        # directory isn't a git directory, or git fails for some reason,
-        # fall back to using the specified template directly.
-        cached_template = cookiecutter_cache_path(template)
-        try:
-            repo = self.tools.git.Repo(cached_template)
-            # Raises ValueError if "origin" isn't a valid remote
-            remote = repo.remote(name="main")
-            try:
-                # Attempt to update the repository
-                remote.fetch()
-            except self.tools.git.exc.GitCommandError as e:
-                # We are offline, or otherwise unable to contact
-                # the origin git repo. It's OK to continue; but
-                # capture the error in the log and warn the user
-                # that the template may be stale.
-                pass
+        import git
+        from briefcase.exceptions import (
+            BriefcaseCommandError,
+            NetworkFailure,
+            TemplateUnsupportedVersion,
+        )
+        from nadoo_launchpad import template_cache
 
-            try:
-                # Check out the branch for the required version tag.
-                head = remote.refs[branch]
-
-                self.logger.info(
-                    f"Using existing template (sha {head.commit.hexsha}, "
-                    f"updated {head.commit.committed_datetime.strftime('%c')})"
-                )
-                head.checkout()
-            except IndexError as e:
-                # No branch exists for the requested version.
-                raise TemplateUnsupportedVersion(branch) from e
-        except self.tools.git.exc.NoSuchPathError:
-            # Template cache path doesn't exist.
-            # Just use the template directly, rather than attempting an update.
-            cached_template = template
-        except self.tools.git.exc.InvalidGitRepositoryError:
-            # Template cache path exists, but isn't a git repository
-            # Just use the template directly, rather than attempting an update.
-            cached_template = template
-        except ValueError as e:
+        try:
+            cached_template, sha = template_cache.checkout_template(
+                template, branch, ttl=ttl, force_refresh=force_refresh
+            )
+        except IndexError as e:
+            # No branch exists for the requested version.
+            raise TemplateUnsupportedVersion(branch) from e
+        except git.exc.GitCommandError as e:
+            # The mirror couldn't be cloned; we are probably offline.
+            raise NetworkFailure("clone template repository") from e
+        except (git.exc.InvalidGitRepositoryError, ValueError) as e:
             raise BriefcaseCommandError(
-                f"Git repository in a weird state, delete {cached_template} and try briefcase create again"
+                f"Git repository in a weird state, delete {template_cache.mirror_root(template)} and try again"
             ) from e
+        # On stderr; stdout may be JSON for a script.
+        print(f"Using template {branch} (sha {sha})", file=sys.stderr)
     else:
         # If this isn't a repository URL, treat it as a local directory
         cached_template = template
@@ -165,55 +181,64 @@ def update_ui(self:toga.App):
     # Refresh the UI to show changes
     self.main_window.content = self.new_project_form
 
-def set_installation_state(self:toga.Box):
-    config_path = self.app.paths.config / "install_state.toml"
+def set_installation_state(config_dir):
+    from nadoo_launchpad.settings_store import open_settings
 
-    # Ensure the directory exists
-    config_path.parent.mkdir(parents=True, exist_ok=True)
+    settings = open_settings(config_dir)
+    settings.set("installed", True)
+    # Written right away; the installation must not be lost.
+    settings.flush()
 
-    # Check if the file exists
-    if not config_path.exists():
-        # If not, create it with the initial 'installed' state
-        config_data = {"installed": True}
-    else:
-        # If it exists, load the existing data
-        with open(config_path, "r") as config_file:
-            config_data = toml.load(config_file)
-
-    # Update the 'installed' state to True
-    config_data["installed"] = True
-
-    # Save the updated data
-    with open(config_path, "w") as config_file:
-        toml.dump(config_data, config_file)
-
-def update_ui_post_install(self:toga.App):
-    # Remove the 'Install' button and add the 'New Project' button
-    self.main_box.remove(self.install_btn)
-
-def install_python_with_pyenv():
-    # Check if the Python version already exists
-    pyenv_version_exists = (
-        subprocess.run(
-            ["pyenv", "versions", "--bare", "--skip-aliases", "3.11.7"],
-            capture_output=True,
-        ).returncode
-        == 0
-    )
+def install_python_with_pyenv(versions, build_cache, run=run_command):
+    """Install Python versions with pyenv, and make the first the default.
 
-    # If the version exists, skip installation
-    if not pyenv_version_exists:
-        # Use 'yes' to automatically answer 'y' to any prompts
-        subprocess.run("yes | pyenv install 3.11.7", shell=True)
-    else:
-        print("Python 3.11.7 is already installed.")
+    Versions are unpacked from the build cache when another machine has
+    already compiled them (see ``python_builds``).
+
+    :param versions: The Python versions to install.
+    :param build_cache: The directory of the interpreter tarballs.
+    :param run: Runs a command; a job's ``run_command`` streams its output
+        to the UI.
+    :returns: A dict of version to how it was installed.
+    """
+    from nadoo_launchpad.interpreters import set_global_pyenv_version
+    from nadoo_launchpad.python_builds import install_python_versions
+
+    installed = install_python_versions(versions, build_cache, run=run)
 
     # Set global version
-    subprocess.run(["pyenv", "global", "3.11.7"])
+    set_global_pyenv_version(versions[0])
+    return installed
+
+PYENV_INSTALLER_URL = "https://pyenv.run"
 
-def install_pyenv():
-    # Example command, adjust based on OS
-    subprocess.run(["curl", "-L", "https://pyenv.run", "|", "bash"])
+def install_pyenv(run=run_command):
+    """Install pyenv with its installer script.
+
+    :param run: Runs a command; a job's ``run_command`` streams its output
+        to the UI.
+    """
+    from nadoo_launchpad.interpreters import pyenv_root
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        installer = os.path.join(temp_dir, "pyenv-installer.sh")
+        # Downloaded to a file rather than piped into bash, so a failed
+        # download is retried instead of running half a script.
+        run(
+            ["curl", "-fsSL", "-o", installer, PYENV_INSTALLER_URL],
+            retries=NETWORK_RETRIES,
+        )
+        # The installer clones the pyenv repositories. It refuses to run
+        # once $PYENV_ROOT exists, so every retry starts from scratch.
+        root = pyenv_root()
+        for attempt in range(NETWORK_RETRIES + 1):
+            try:
+                run(["bash", installer])
+                break
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                shutil.rmtree(root, ignore_errors=True)
+                if attempt == NETWORK_RETRIES:
+                    raise
     # Additional commands may be needed to integrate pyenv into the shell
 
 def setup_project_folder():
@@ -231,24 +256,38 @@ def get_project_folder_path():
 
     return project_folder
 
-def create_and_activate_venv(self):
+def create_and_activate_venv(venv_path, run=run_command):
+    """Create a virtual environment.
+
+    :param venv_path: Where to create the virtual environment.
+    :param run: Runs a command; a job's ``run_command`` streams its output
+        to the UI.
+    :returns: The path to the virtual environment, or ``None`` if the OS is
+        not supported.
+    """
     os_type = platform.system()
-    if os_type == "Darwin":  # macOS
-        return self.create_and_activate_venv_mac()
+    if os_type in ("Darwin", "Linux"):  # macOS and Linux share the venv layout
+        return create_and_activate_venv_mac(venv_path, run=run)
     # Add more conditions for other OS types here
     else:
         print(f"OS {os_type} not supported yet")
 
-def create_and_activate_venv_mac(self):
-    python_path = (
-        subprocess.check_output(["pyenv", "which", "python"]).decode().strip()
-    )
-    # Create the virtual environment inside the project folder
-    venv_path = os.path.join(get_project_folder_path(), "env")
-    subprocess.run([python_path, "-m", "venv", venv_path])
-    # Activate the virtual environment - for macOS
-    activate_command = f"source {venv_path}/bin/activate"
-    subprocess.run(["bash", "-c", activate_command])
+def get_python_path(spec=None):
+    from nadoo_launchpad.config import launcher_paths
+    from nadoo_launchpad.interpreters import find_python
+    from nadoo_launchpad.settings_store import open_settings
+
+    # The interpreter pyenv would pick, found without running pyenv; the
+    # one recorded at installation if pyenv's pick isn't installed.
+    default = open_settings(launcher_paths().config).get("interpreters", {}).get("default")
+    return find_python(spec, default=default)
+
+def create_and_activate_venv_mac(venv_path, run=run_command):
+    python_path = get_python_path()
+    # Create the virtual environment inside the project folder. Activating
+    # it in a subprocess would have no effect on anything else; project
+    # commands run the venv's own interpreter instead.
+    run([python_path, "-m", "venv", str(venv_path)])
 
     return venv_path
 
@@ -260,6 +299,9 @@ def on_new_developer_name_entered(self, widget):
         self.author_email_input.value = new_email
 
 def create_pyproject_file(self, user_data, project_folder):
+    from nadoo_launchpad import telemetry
+    from nadoo_launchpad.placeholders import PlaceholderError, load_template
+
     # Construct the path to the template file
     template_file_name = "base_project_template.toml"
     template_path = Path(self.app.paths.app / "resources" / template_file_name)
@@ -272,25 +314,22 @@ def create_pyproject_file(self, user_data, project_folder):
     new_project_path = project_subfolder / "pyproject.toml"
 
     try:
-        with open(template_path, "r") as template_file:
-            template_content = template_file.read()
-
-        # Replace placeholders with actual data
-        for key, value in user_data.items():
-            placeholder = "{{" + key.upper() + "}}"
-            template_content = template_content.replace(placeholder, value)
-
-        print(template_content)
+        # Parsed once, and cached until the template file changes
+        template = load_template(template_path)
 
-        # Write the new pyproject.toml file
-        with open(new_project_path, "w") as new_project_file:
-            new_project_file.write(template_content)
+        # Write the new pyproject.toml file, replacing the placeholders
+        # with the actual data
+        with open(new_project_path, "w", encoding="utf-8") as new_project_file:
+            template.render_to(new_project_file, user_data)
+            telemetry.add("bytes_written", new_project_file.tell())
 
-        return new_project_file
+        return new_project_path
 
+    except PlaceholderError as e:
+        self.display_error(f"The project data doesn't match the template: {e}")
     except FileNotFoundError as e:
         self.display_error(f"Template file not found: {e}")
     except IOError as e:
         self.display_error(f"Error while handling the file: {e}")
     except Exception as e:
-        self.display_error(f"An unexpected error occurred: {e}")
\ No newline at end of file
+        self.display_error(f"An unexpected error occurred: {e}")
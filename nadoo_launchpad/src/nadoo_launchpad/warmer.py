@@ -0,0 +1,144 @@
+"""Warms the launcher's caches in the background after startup.
+
+Without warming, the first project creation after a launch pays for
+importing Briefcase, cookiecutter, GitPython and Django, for fetching the
+template, for finding out which template branch matches the installed
+Briefcase, and for building the golden venv. The warmer does all of that
+on a worker thread once the launcher window is shown, so the first project
+is created as fast as the tenth.
+
+The warmer is best effort: a step that fails (e.g. offline) is reported to
+``warmer.log`` in the launcher log directory and skipped, and the project
+creation steps do the work themselves. On Linux the imports and the template
+refresh run at a lower CPU priority, as do the commands they start. The
+golden venv is built at normal priority: a project creation waiting for it
+would otherwise wait for a low priority thread.
+"""
+import os
+import platform
+import threading
+import time
+
+from nadoo_launchpad.jobs import Job, JobRunner
+
+# Seconds after the window is shown before the warmer starts
+WARM_DELAY = 2.0
+
+# CPU priority (nice value) of the warmer, where the OS supports it per thread
+WARM_NICENESS = 10
+
+# The output of the last warm-up, in the launcher log directory
+LOG_FILE = "warmer.log"
+
+
+def lower_priority(job):
+    # Linux schedules threads individually, and the commands the thread
+    # starts inherit its priority. Elsewhere the whole app would be slowed.
+    if platform.system() == "Linux":
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WARM_NICENESS)
+        except OSError:
+            pass
+
+
+def at_low_priority(step):
+    """Run a step on a thread of its own at a lower priority.
+
+    An unprivileged thread can't raise its priority again, so the thread
+    ends with the step.
+    """
+
+    def run(job):
+        errors = []
+
+        def target():
+            lower_priority(job)
+            try:
+                step(job)
+            except BaseException as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=target, name="nadoo-warmer-low-priority")
+        thread.start()
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    return run
+
+
+def import_packages(job):
+    # Python caches imported modules process wide; the UI thread then finds
+    # them loaded.
+    import briefcase.config  # noqa: F401
+    import cookiecutter.main  # noqa: F401
+    import git  # noqa: F401
+    import jinja2  # noqa: F401
+    from nadoo_launchpad import db
+
+    db.setup()
+
+
+def resolve_template(job):
+    from nadoo_launchpad.services import TEMPLATE, resolve_template_branch
+
+    # Clones or refreshes the template mirror on the way.
+    job.state["template_branch"] = resolve_template_branch(TEMPLATE)
+
+
+def warm_golden_venv(job):
+    from nadoo_launchpad.services import prepare_golden_venv
+
+    # Fills the wheelhouse, and builds the venv new projects are cloned from.
+    prepare_golden_venv(job)
+
+
+def best_effort(label, step):
+    def run(job):
+        try:
+            step(job)
+        except Exception as e:
+            job.report(f"{label} skipped: {e or type(e).__name__}")
+
+    return (label, run)
+
+
+def warming_steps():
+    return [
+        best_effort("Importing project packages", at_low_priority(import_packages)),
+        best_effort("Resolving template branch", at_low_priority(resolve_template)),
+        best_effort("Warming Python environment", warm_golden_venv),
+    ]
+
+
+def log_to(path):
+    """An ``on_output`` callback appending timestamped lines to a file."""
+
+    def write(line):
+        with open(path, "a", encoding="utf-8") as log_file:
+            log_file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {line}\n")
+
+    return write
+
+
+def start_warmer(app):
+    """Warm the caches on a worker thread of its own.
+
+    :param app: The launcher app; its cache directory is warmed, and the
+        warmer's output goes to its log directory.
+    :returns: The ``JobRunner`` running the warmer; cancel it on exit.
+    """
+    log_path = app.paths.logs / LOG_FILE
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    # Only the last warm-up is kept.
+    log_path.write_text("")
+    runner = JobRunner()
+    runner.submit(
+        Job(
+            "Warm caches",
+            warming_steps(),
+            state={"cache_dir": app.paths.cache},
+            on_output=log_to(log_path),
+        )
+    )
+    return runner
@@ -0,0 +1,207 @@
+"""Launcher managed wheelhouse for installing Briefcase into project venvs.
+
+The wheels for each Briefcase version are downloaded once into
+``<cache>/wheelhouse/briefcase-<version>``. Later installs use
+``pip install --no-index --find-links`` against that directory, so creating a
+project doesn't touch the network once the wheelhouse is warm.
+
+A wheelhouse is replaced as a whole when wheels are added to it, so both
+populating and installing from it hold a per-version lock; several launchers
+(the GUI, the CLI, batch workers) may use the same wheelhouse at once.
+"""
+import argparse
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from nadoo_launchpad.locks import FileLock
+from nadoo_launchpad.supervisor import run_command
+
+WHEELHOUSE_DIR = "wheelhouse"
+COMPLETE_MARKER = ".complete"
+
+
+def wheelhouse_root(cache_dir) -> Path:
+    return Path(cache_dir) / WHEELHOUSE_DIR
+
+
+def wheelhouse_path(cache_dir, briefcase_version) -> Path:
+    """The wheelhouse directory for a Briefcase version.
+
+    :param cache_dir: The launcher cache directory (``app.paths.cache``).
+    :param briefcase_version: The Briefcase version.
+    """
+    return wheelhouse_root(cache_dir) / f"briefcase-{briefcase_version}"
+
+
+def wheelhouse_lock(cache_dir, briefcase_version) -> FileLock:
+    """The lock guarding the wheelhouse of a Briefcase version."""
+    return FileLock(wheelhouse_root(cache_dir) / f".briefcase-{briefcase_version}.lock")
+
+
+def is_warm(cache_dir, briefcase_version) -> bool:
+    """Has the wheelhouse for a Briefcase version been fully populated?"""
+    return (wheelhouse_path(cache_dir, briefcase_version) / COMPLETE_MARKER).exists()
+
+
+def populate_wheelhouse(pip_path, cache_dir, briefcase_version, run=run_command):
+    """Download the wheels for a Briefcase version into the wheelhouse.
+
+    Wheels are downloaded into a temporary directory which is then renamed
+    into place, so an interrupted download never leaves a wheelhouse that
+    looks warm. If the wheelhouse already exists, missing wheels (e.g. for a
+    different interpreter version) are added to it.
+
+    :param pip_path: The pip of the interpreter the wheels are for.
+    :param cache_dir: The launcher cache directory.
+    :param briefcase_version: The Briefcase version to download.
+    :param run: Runs a command.
+    :returns: The path to the wheelhouse.
+    """
+    with wheelhouse_lock(cache_dir, briefcase_version):
+        return _populate(pip_path, cache_dir, briefcase_version, run)
+
+
+def _populate(pip_path, cache_dir, briefcase_version, run):
+    """``populate_wheelhouse``; the caller holds the wheelhouse lock."""
+    target = wheelhouse_path(cache_dir, briefcase_version)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    download_dir = Path(tempfile.mkdtemp(prefix=f".{target.name}-", dir=target.parent))
+    try:
+        if target.exists():
+            # Reuse the wheels that are already there.
+            shutil.copytree(target, download_dir, dirs_exist_ok=True)
+        run(
+            [
+                pip_path,
+                "download",
+                "--dest",
+                str(download_dir),
+                f"briefcase=={briefcase_version}",
+            ]
+        )
+        (download_dir / COMPLETE_MARKER).touch()
+        if target.exists():
+            shutil.rmtree(target)
+        download_dir.rename(target)
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+    return target
+
+
+def install_args(cache_dir, briefcase_version):
+    """The pip arguments to install a Briefcase version from the wheelhouse."""
+    return [
+        "install",
+        "--no-index",
+        "--find-links",
+        str(wheelhouse_path(cache_dir, briefcase_version)),
+        f"briefcase=={briefcase_version}",
+    ]
+
+
+def install_briefcase(pip_path, cache_dir, briefcase_version, run=run_command):
+    """Install Briefcase into a venv, populating the wheelhouse if needed.
+
+    :param pip_path: The pip of the venv to install into.
+    :param cache_dir: The launcher cache directory.
+    :param briefcase_version: The Briefcase version to install.
+    :param run: Runs a command; raises ``subprocess.CalledProcessError`` on
+        failure.
+    """
+    # Held during the install, so nobody replaces the wheelhouse under pip.
+    with wheelhouse_lock(cache_dir, briefcase_version):
+        if not is_warm(cache_dir, briefcase_version):
+            _populate(pip_path, cache_dir, briefcase_version, run)
+        try:
+            run([pip_path] + install_args(cache_dir, briefcase_version))
+        except subprocess.CalledProcessError:
+            # The wheelhouse was populated for a different interpreter;
+            # add the wheels this one needs and try again.
+            _populate(pip_path, cache_dir, briefcase_version, run)
+            run([pip_path] + install_args(cache_dir, briefcase_version))
+
+
+def cached_versions(cache_dir):
+    """The Briefcase versions that have a wheelhouse."""
+    root = wheelhouse_root(cache_dir)
+    if not root.exists():
+        return []
+    return sorted(
+        path.name[len("briefcase-"):]
+        for path in root.iterdir()
+        if path.is_dir() and path.name.startswith("briefcase-")
+    )
+
+
+def versions_in_use(project_folder):
+    """The Briefcase versions installed in the project venvs.
+
+    :param project_folder: The folder holding the projects
+        (``get_project_folder_path()``).
+    """
+    versions = set()
+    pattern = "*/.venv/lib/python*/site-packages/briefcase-*.dist-info"
+    for dist_info in Path(project_folder).glob(pattern):
+        versions.add(dist_info.name[len("briefcase-"):-len(".dist-info")])
+    return versions
+
+
+def prune_wheelhouse(cache_dir, keep):
+    """Remove the wheelhouses of all Briefcase versions not in ``keep``.
+
+    :param cache_dir: The launcher cache directory.
+    :param keep: The Briefcase versions to keep.
+    :returns: The versions that were removed.
+    """
+    removed = []
+    for version in cached_versions(cache_dir):
+        if version not in keep:
+            with wheelhouse_lock(cache_dir, version):
+                shutil.rmtree(wheelhouse_path(cache_dir, version), ignore_errors=True)
+            removed.append(version)
+    return removed
+
+
+def main(argv=None):
+    import briefcase
+    from nadoo_launchpad.config import launcher_paths
+    from nadoo_launchpad.utils import get_project_folder_path
+
+    parser = argparse.ArgumentParser(
+        prog="python -m nadoo_launchpad.wheelhouse",
+        description="Manage the launcher's Briefcase wheelhouse.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=launcher_paths().cache,
+        help="The launcher cache directory.",
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("list", help="List the cached Briefcase versions.")
+    prune = subcommands.add_parser(
+        "prune", help="Remove the Briefcase versions no project uses."
+    )
+    prune.add_argument(
+        "--keep",
+        action="append",
+        default=[],
+        help="An additional Briefcase version to keep. Can be repeated.",
+    )
+    options = parser.parse_args(argv)
+
+    if options.command == "list":
+        for version in cached_versions(options.cache_dir):
+            print(version)
+    else:
+        keep = versions_in_use(get_project_folder_path())
+        keep.add(briefcase.__version__)
+        keep.update(options.keep)
+        for version in prune_wheelhouse(options.cache_dir, keep):
+            print(f"Removed briefcase {version}")
+
+
+if __name__ == "__main__":
+    main()
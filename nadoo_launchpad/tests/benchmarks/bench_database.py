@@ -0,0 +1,89 @@
+"""Insert and query throughput of the launcher database.
+
+Run with ``python -m tests.benchmarks.bench_database``. Each configuration
+runs in its own interpreter, because Django settings are per process:
+
+- before: the stock SQLite settings, one autocommitted save() per row.
+- after: the tuned connection pragmas, rows written with ``bulk_write``.
+
+Both then run the same indexed prefix searches.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROWS = 5_000
+SEARCHES = 2_000
+
+
+def run(mode, database):
+    """Measure one configuration; runs in a child process."""
+    os.environ["NADOO_DATABASE"] = database
+    os.environ["NADOO_SQLITE_TUNING"] = "1" if mode == "after" else "0"
+
+    from nadoo_launchpad import db, registry
+
+    db.setup()
+    from nadoo_launchpad.models import Project
+
+    projects = [
+        {
+            "context": {
+                "app_name": f"project{index:05d}",
+                "formal_name": f"Project {index}",
+                "bundle": f"com.example{index % 50}",
+            },
+            "path": f"/projects/project{index:05d}",
+        }
+        for index in range(ROWS)
+    ]
+    start = time.perf_counter()
+    if mode == "after":
+        registry.register_projects(projects)
+    else:
+        for project in projects:
+            context = project["context"]
+            Project(
+                app_name=context["app_name"],
+                formal_name=context["formal_name"],
+                bundle=context["bundle"],
+                path=project["path"],
+            ).save()
+    insert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in range(SEARCHES):
+        registry.search_projects(f"project{index % 100:02d}", limit=20)
+    query = time.perf_counter() - start
+    return {"inserts_per_second": ROWS / insert, "queries_per_second": SEARCHES / query}
+
+
+def main():
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="nadoo-db-") as tmp:
+        for mode in ["before", "after"]:
+            output = subprocess.check_output(
+                [
+                    sys.executable,
+                    "-c",
+                    "import json, sys; from tests.benchmarks.bench_database import run; "
+                    "print(json.dumps(run(sys.argv[1], sys.argv[2])))",
+                    mode,
+                    str(Path(tmp) / f"{mode}.sqlite3"),
+                ],
+                env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            )
+            results[mode] = json.loads(output)
+            print(
+                f"{mode:6s} {results[mode]['inserts_per_second']:10.0f} inserts/s "
+                f"{results[mode]['queries_per_second']:10.0f} queries/s"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare the placeholder engine with the chained ``str.replace`` it replaced.
+
+Run with ``python -m tests.benchmarks.bench_placeholders``.
+"""
+import timeit
+from pathlib import Path
+
+from nadoo_launchpad.placeholders import PLACEHOLDER_RE, CompiledTemplate
+
+TEMPLATE = (
+    Path(__file__).parents[2]
+    / "src"
+    / "nadoo_launchpad"
+    / "resources"
+    / "base_project_template.toml"
+)
+
+
+def naive_render(text, values):
+    for key, value in values.items():
+        text = text.replace("{{" + key.upper() + "}}", value)
+    return text
+
+
+def main(repeat=200):
+    text = TEMPLATE.read_text()
+    names = sorted(set(PLACEHOLDER_RE.findall(text)))
+    for extra in (0, 100, 1000):
+        # Large contexts also carry values without a placeholder in this
+        # template; give those placeholders too, so both renders agree.
+        padding = [f"EXTRA_{index}" for index in range(extra)]
+        source = text + "".join(f"# {{{{{name}}}}}\n" for name in padding)
+        values = {name.lower(): f"value of {name}" for name in names + padding}
+
+        compiled = CompiledTemplate(source)
+        assert compiled.render(values) == naive_render(source, values)
+        naive = timeit.timeit(lambda: naive_render(source, values), number=repeat)
+        engine = timeit.timeit(lambda: compiled.render(values), number=repeat)
+        print(
+            f"{len(values):5d} placeholders: "
+            f"str.replace {naive / repeat * 1e6:9.1f}us  "
+            f"compiled {engine / repeat * 1e6:9.1f}us  "
+            f"({naive / engine:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Scan a synthetic project folder of 10,000 directories.
+
+Run with ``python -m tests.benchmarks.bench_scanner``. Reports the first
+scan, a rescan with nothing changed, and a rescan after 1% of the
+pyproject files changed; the first scan is repeated on one thread for
+comparison.
+"""
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from nadoo_launchpad import scanner
+
+PYPROJECT = """
+[tool.briefcase]
+project_name = "Project {index}"
+bundle = "com.example"
+version = "0.0.1"
+
+[tool.briefcase.app.project{index}]
+formal_name = "Project {index}"
+description = "A synthetic project"
+sources = ["src/project{index}"]
+"""
+
+
+def make_tree(root, directories=10_000, briefcase_share=5):
+    """Every ``briefcase_share``th repository is a Briefcase project; the
+    others have a plain ``pyproject.toml``, or none at all."""
+    pyprojects = []
+    for index in range(directories):
+        repo = root / f"repo{index:05d}"
+        (repo / "src").mkdir(parents=True)
+        if index % briefcase_share == 0:
+            pyproject = repo / "pyproject.toml"
+            pyproject.write_text(PYPROJECT.format(index=index))
+            pyprojects.append(pyproject)
+        elif index % 2:
+            (repo / "pyproject.toml").write_text("[project]\nname = 'library'\n")
+    return pyprojects
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:32s} {time.perf_counter() - start:8.3f}s")
+    return result
+
+
+def main(directories=10_000):
+    root = Path(tempfile.mkdtemp(prefix="nadoo-scan-"))
+    try:
+        pyprojects = make_tree(root / "projects", directories)
+        cache = root / "cache"
+
+        def scan(max_workers=None):
+            return scanner.scan_projects(root / "projects", cache, max_workers=max_workers)
+
+        projects = timed("first scan", scan)
+        timed("rescan, nothing changed", scan)
+        for pyproject in pyprojects[:: max(1, len(pyprojects) // (directories // 100))]:
+            stat = pyproject.stat()
+            os.utime(pyproject, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        timed("rescan, 1% changed", scan)
+
+        scanner.index_path(cache).unlink()
+        timed("first scan, one thread", lambda: scan(max_workers=1))
+        print(f"{len(projects)} Briefcase projects in {directories} directories")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark suite for the scaffolding hot paths.
+
+The benchmarks are skipped by the regular test run. Run them with::
+
+    python tests/nadoo_launchpad.py --benchmark
+    python tests/nadoo_launchpad.py --benchmark --benchmark-json before.json
+    python tests/nadoo_launchpad.py --benchmark --benchmark-compare before.json
+
+Results are written as JSON. When comparing, a benchmark whose median is
+more than ``--benchmark-threshold`` times (default 1.5) the median of the
+same benchmark in the baseline fails. Only compare runs from the same
+machine.
+
+The ``bench_*.py`` modules are standalone comparisons, run with
+``python -m tests.benchmarks.<name>``.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+# Only collected when the suite is run on purpose.
+collect_ignore_glob = [] if os.environ.get("NADOO_BENCHMARK") else ["test_*.py"]
+
+DEFAULT_THRESHOLD = 1.5
+
+
+class Benchmark:
+    def __init__(self, results, baseline, threshold):
+        self.results = results
+        self.baseline = baseline
+        self.threshold = threshold
+
+    def __call__(self, name, function, repeat=5, setup=None):
+        """Time a function, and check it against the baseline.
+
+        :param name: The name of the benchmark in the results.
+        :param function: The code to time.
+        :param repeat: The number of timed runs.
+        :param setup: Called before every run, untimed; its result is
+            passed to ``function``.
+        :returns: The result of the last run.
+        """
+        times = []
+        for _ in range(repeat):
+            args = () if setup is None else (setup(),)
+            start = time.perf_counter()
+            result = function(*args)
+            times.append(time.perf_counter() - start)
+
+        self.results[name] = {
+            "median": statistics.median(times),
+            "min": min(times),
+            "mean": statistics.fmean(times),
+            "repeat": repeat,
+        }
+        baseline = self.baseline.get(name)
+        if baseline is not None:
+            limit = baseline["median"] * self.threshold
+            if self.results[name]["median"] > limit:
+                pytest.fail(
+                    f"{name} regressed: median {self.results[name]['median']:.4f}s, "
+                    f"baseline {baseline['median']:.4f}s (limit {limit:.4f}s)"
+                )
+        return result
+
+
+@pytest.fixture(scope="session")
+def benchmark_results():
+    results = {}
+    yield results
+    path = os.environ.get("NADOO_BENCHMARK_JSON", "benchmark-results.json")
+    with open(path, "w") as results_file:
+        json.dump(
+            {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": results,
+            },
+            results_file,
+            indent=2,
+        )
+
+
+@pytest.fixture(scope="session")
+def benchmark_baseline():
+    path = os.environ.get("NADOO_BENCHMARK_BASELINE")
+    if not path:
+        return {}
+    with open(path, "r") as baseline_file:
+        return json.load(baseline_file)["results"]
+
+
+@pytest.fixture
+def benchmark(benchmark_results, benchmark_baseline):
+    threshold = float(os.environ.get("NADOO_BENCHMARK_THRESHOLD", DEFAULT_THRESHOLD))
+    return Benchmark(benchmark_results, benchmark_baseline, threshold)
@@ -0,0 +1,196 @@
+"""Benchmarks of the steps of creating a project.
+
+The template benchmarks run against a local bare git repository standing in
+for the batteries-included template, so they don't depend on the network.
+"""
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from nadoo_launchpad import golden_venv, placeholders, template_cache
+from nadoo_launchpad.utils import (
+    create_pyproject_file,
+    generate_template,
+    make_app_name,
+    update_cookiecutter_cache,
+)
+
+SRC_PATH = Path(placeholders.__file__).parent.parent
+RESOURCES = Path(placeholders.__file__).parent / "resources"
+
+BRANCH = "v0.3.16"
+ROOT = "{{ cookiecutter.app_name }}"
+MODULE = f"{ROOT}/src/{{{{ cookiecutter.module_name }}}}"
+
+# A template shaped like the batteries-included template: a handful of
+# rendered files, and many static ones (docs, CI, resources).
+STANDIN_FILES = {
+    "cookiecutter.json": json.dumps(
+        {
+            "formal_name": "App",
+            "app_name": "{{ cookiecutter.formal_name|lower|replace(' ', '') }}",
+            "module_name": "{{ cookiecutter.app_name|replace('-', '_') }}",
+            "bundle": "com.example",
+            "author": "Jane Developer",
+            "_copy_without_render": [".github"],
+        }
+    ),
+    f"{ROOT}/pyproject.toml": (
+        '[tool.briefcase]\nproject_name = "{{ cookiecutter.formal_name }}"\n'
+        'bundle = "{{ cookiecutter.bundle }}"\n'
+    ),
+    f"{ROOT}/README.md": "# {{ cookiecutter.formal_name }}\n",
+    f"{MODULE}/__init__.py": "",
+    f"{MODULE}/app.py": "class {{ cookiecutter.formal_name|replace(' ', '') }}:\n    pass\n",
+    f"{MODULE}/resources/{{{{ cookiecutter.app_name }}}}.png": bytes(range(256)) * 64,
+    **{
+        f"{ROOT}/docs/page{index:03d}.md": f"# Page {index}\n\n" + "Static text.\n" * 200
+        for index in range(200)
+    },
+    **{
+        f"{ROOT}/.github/workflows/job{index}.yml": "run: echo ${{ matrix.python }}\n"
+        for index in range(20)
+    },
+}
+
+
+@pytest.fixture
+def standin(home, template_remote):
+    template_remote.commit(STANDIN_FILES, branch=BRANCH)
+    return template_remote
+
+
+def test_make_app_name(benchmark):
+    names = [
+        f"Prójekt Ñumber {index} — {'Ünïcode' * (index % 5)} App!" for index in range(20_000)
+    ]
+
+    benchmark("make_app_name 20k names", lambda: [make_app_name(name) for name in names])
+
+
+def test_create_pyproject_file(benchmark, tmp_path):
+    values = {
+        name.lower(): f"value-{name.lower()}"
+        for name in placeholders.load_template(
+            RESOURCES / "base_project_template.toml"
+        ).placeholders
+    }
+    component = SimpleNamespace(
+        app=SimpleNamespace(paths=SimpleNamespace(app=RESOURCES.parent)),
+        display_error=pytest.fail,
+    )
+    folders = iter(range(1000))
+
+    benchmark(
+        "create_pyproject_file",
+        lambda folder: create_pyproject_file(component, values, folder),
+        repeat=50,
+        setup=lambda: tmp_path / str(next(folders)),
+    )
+
+
+def test_update_cookiecutter_cache(benchmark, standin):
+    def clear_cache():
+        shutil.rmtree(template_cache.mirror_root(standin.url), ignore_errors=True)
+        template_cache.freshness_path(template_cache._cache_path(standin.url)).unlink(
+            missing_ok=True
+        )
+
+    benchmark(
+        "update_cookiecutter_cache cold",
+        lambda _: update_cookiecutter_cache(standin.url, BRANCH),
+        repeat=3,
+        setup=clear_cache,
+    )
+    benchmark(
+        "update_cookiecutter_cache fresh",
+        lambda: update_cookiecutter_cache(standin.url, BRANCH),
+        repeat=50,
+    )
+    benchmark(
+        "update_cookiecutter_cache fetch",
+        lambda: update_cookiecutter_cache(standin.url, BRANCH, force_refresh=True),
+        repeat=5,
+    )
+
+
+def test_generate_template(benchmark, standin, tmp_path):
+    update_cookiecutter_cache(standin.url, BRANCH)
+    outputs = iter(range(1000))
+
+    def output():
+        path = tmp_path / "output" / str(next(outputs))
+        path.mkdir(parents=True)
+        return path
+
+    def render(output_path, cache_dir=None, formal_name="My App"):
+        generate_template(
+            standin.url,
+            BRANCH,
+            output_path,
+            {"formal_name": formal_name},
+            cache_dir=cache_dir,
+        )
+
+    benchmark("generate_template cookiecutter", render, setup=output)
+
+    cache_dir = tmp_path / "cache"
+    # The first render splits the template into its static and dynamic layers.
+    render(output(), cache_dir, formal_name="Warm Up")
+    names = iter(range(1000))
+    benchmark(
+        "generate_template snapshot",
+        lambda path: render(path, cache_dir, formal_name=f"App {next(names)}"),
+        setup=output,
+    )
+
+
+def test_venv_creation(benchmark, tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("venv layout differs on Windows")
+
+    def run(args):
+        # A golden venv with pip, but without installing Briefcase.
+        if args[1:3] == ["-m", "venv"]:
+            subprocess.check_call(args)
+
+    golden = golden_venv.build_golden_venv(
+        sys.executable, tmp_path / "cache", "benchmark", run=run
+    )
+    venvs = iter(range(1000))
+
+    def target():
+        return tmp_path / "venvs" / str(next(venvs))
+
+    benchmark(
+        "venv python -m venv",
+        lambda path: subprocess.check_call([sys.executable, "-m", "venv", str(path)]),
+        repeat=3,
+        setup=target,
+    )
+    benchmark(
+        "venv golden clone",
+        lambda path: golden_venv.clone_venv(golden, path),
+        repeat=10,
+        setup=target,
+    )
+
+
+@pytest.mark.parametrize("module", ["nadoo_launchpad.app", "nadoo_launchpad.cli"])
+def test_cold_import(benchmark, module):
+    if module == "nadoo_launchpad.app":
+        pytest.importorskip("toga")
+
+    benchmark(
+        f"cold import {module}",
+        lambda: subprocess.check_call(
+            [sys.executable, "-c", f"import {module}"],
+            env={"PYTHONPATH": str(SRC_PATH), "PATH": ""},
+        ),
+        repeat=10,
+    )
@@ -0,0 +1,110 @@
+import os
+import subprocess
+
+import pytest
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+}
+
+
+def git(*args, cwd=None):
+    "Run git, returning its output"
+    return subprocess.check_output(
+        ["git", *args],
+        cwd=cwd,
+        env={**os.environ, **GIT_ENV},
+        stderr=subprocess.STDOUT,
+    ).decode().strip()
+
+
+class TemplateRemote:
+    """A local bare git repository standing in for the project template.
+
+    Commits are made in a working clone and pushed to the bare repository.
+    """
+
+    def __init__(self, root):
+        self.bare = root / "template.git"
+        self.work = root / "template-work"
+        self.url = f"file://{self.bare}"
+        git("init", "--bare", "-b", "main", str(self.bare))
+        git("clone", str(self.bare), str(self.work))
+        git("checkout", "-b", "main", cwd=self.work)
+        self.commit({"cookiecutter.json": '{"app_name": "app"}\n'}, "Initial template")
+        git("push", "origin", "main", cwd=self.work)
+
+    def commit(self, files, message="Update template", branch=None):
+        "Commit files to a branch and push it; returns the new SHA"
+        if branch is not None:
+            git("checkout", "-B", branch, cwd=self.work)
+        for name, content in files.items():
+            path = self.work / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, bytes):
+                path.write_bytes(content)
+            else:
+                path.write_text(content)
+        git("add", "-A", cwd=self.work)
+        git("commit", "-m", message, cwd=self.work)
+        if branch is not None:
+            git("push", "origin", branch, cwd=self.work)
+        return git("rev-parse", "HEAD", cwd=self.work)
+
+    def push(self, branch):
+        git("push", "origin", branch, cwd=self.work)
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    "Point the home directory (and with it ~/.cookiecutters) at a temp dir"
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    return home
+
+
+@pytest.fixture(autouse=True)
+def telemetry_log(monkeypatch):
+    "Spans are only written by tests that configure a log of their own"
+    from nadoo_launchpad import telemetry
+
+    monkeypatch.setattr(telemetry, "_log", None)
+
+
+@pytest.fixture
+def template_remote(tmp_path):
+    return TemplateRemote(tmp_path)
+
+
+@pytest.fixture(scope="session")
+def database(tmp_path_factory):
+    "Points the launcher database at a throwaway file for the whole session"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(
+            "NADOO_DATABASE", str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+        )
+
+        from nadoo_launchpad import db
+
+        db.setup()
+        yield
+
+
+@pytest.fixture
+def registry_db(database):
+    "An empty project registry"
+    from nadoo_launchpad.models import Project
+
+    Project.objects.all().delete()
+
+
+@pytest.fixture
+def developer_db(database):
+    "An empty developer directory"
+    from nadoo_launchpad.models import Developer
+
+    Developer.objects.all().delete()
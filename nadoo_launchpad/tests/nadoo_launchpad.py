@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 import tempfile
@@ -6,15 +7,37 @@ from pathlib import Path
 import pytest
 
 
+def benchmark_options(argv):
+    """Split the benchmark options (see tests/benchmarks/conftest.py) from
+    the pytest arguments."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--benchmark-json")
+    parser.add_argument("--benchmark-compare")
+    parser.add_argument("--benchmark-threshold")
+    return parser.parse_known_args(argv)
+
+
 def run_tests():
     project_path = Path(__file__).parent.parent
+    options, args = benchmark_options(sys.argv[1:])
+    if options.benchmark:
+        # Resolve the paths before changing directory.
+        os.environ["NADOO_BENCHMARK"] = "1"
+        if options.benchmark_json:
+            os.environ["NADOO_BENCHMARK_JSON"] = os.path.abspath(options.benchmark_json)
+        if options.benchmark_compare:
+            os.environ["NADOO_BENCHMARK_BASELINE"] = os.path.abspath(
+                options.benchmark_compare
+            )
+        if options.benchmark_threshold:
+            os.environ["NADOO_BENCHMARK_THRESHOLD"] = options.benchmark_threshold
     os.chdir(project_path)
 
     # Determine any args to pass to pytest. If there aren't any,
-    # default to running the whole test suite.
-    args = sys.argv[1:]
+    # default to running the whole test suite (or all benchmarks).
     if len(args) == 0:
-        args = ["tests"]
+        args = ["tests/benchmarks"] if options.benchmark else ["tests"]
 
     returncode = pytest.main(
         [
@@ -0,0 +1,169 @@
+import json
+
+import pytest
+
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.batch import ManifestError, load_manifest, run_batch
+from nadoo_launchpad.jobs import Job
+
+MANIFEST = """
+[defaults]
+bundle = "de.nadooit"
+author = "Jane Developer"
+author_email = "jane.developer@nadooit.de"
+
+[[project]]
+formal_name = "Invoice Scanner"
+description = "Scans invoices"
+
+[[project]]
+formal_name = "Time Tracker"
+license = "MIT license"
+"""
+
+
+def fake_scaffold(context, cache_dir):
+    "Stands in for scaffold_project; fails for one project"
+    if context["app_name"] == "broken":
+        raise RuntimeError("scaffolding failed")
+    return {
+        "app_name": context["app_name"],
+        "status": "ok",
+        "error": None,
+        "duration": 0.1,
+        "steps": [],
+    }
+
+
+def timed_scaffold(context, cache_dir):
+    "Stands in for scaffold_project; runs a job like it"
+    Job(
+        f"Add project {context['app_name']}",
+        [("Rendering", lambda job: None)],
+        span_name="Add project",
+        attributes={"app_name": context["app_name"]},
+    ).run()
+    return {"app_name": context["app_name"], "status": "ok", "error": None}
+
+
+def test_load_toml_manifest(tmp_path):
+    "Defaults are applied to every project"
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+    projects = load_manifest(manifest)
+
+    assert [project["formal_name"] for project in projects] == [
+        "Invoice Scanner",
+        "Time Tracker",
+    ]
+    assert projects[0]["bundle"] == "de.nadooit"
+    assert projects[0]["license"] == "Proprietary"
+    assert projects[1]["license"] == "MIT license"
+
+
+def test_load_json_manifest(tmp_path):
+    "A JSON manifest can be a plain list of projects"
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(
+        json.dumps(
+            [
+                {
+                    "formal_name": "Time Tracker",
+                    "bundle": "de.nadooit",
+                    "author": "Jane Developer",
+                    "author_email": "jane.developer@nadooit.de",
+                }
+            ]
+        )
+    )
+    assert load_manifest(manifest)[0]["formal_name"] == "Time Tracker"
+
+
+def test_manifest_missing_fields(tmp_path):
+    "Projects without the required fields are rejected"
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text('[[project]]\nformal_name = "Time Tracker"\n')
+    with pytest.raises(ManifestError, match="missing author, author_email, bundle"):
+        load_manifest(manifest)
+
+
+def test_failures_do_not_abort_batch(tmp_path):
+    "Invalid, duplicate and failing projects are reported; the rest succeed"
+    common = {
+        "bundle": "de.nadooit",
+        "author": "Jane Developer",
+        "author_email": "jane.developer@nadooit.de",
+        "url": "",
+        "description": "",
+        "license": "Proprietary",
+        "gui_framework": "Toga",
+    }
+    projects = [
+        {"formal_name": "Time Tracker", **common},
+        {"formal_name": "Broken", **common},
+        {"formal_name": "Time-Tracker", **common},
+        {"formal_name": "Invoice Scanner", **common},
+        {"formal_name": "Class", **common},
+    ]
+    seen = []
+    summary = run_batch(
+        projects,
+        tmp_path,
+        max_workers=2,
+        on_result=seen.append,
+        scaffold=fake_scaffold,
+    )
+
+    statuses = [(result["app_name"], result["status"]) for result in summary["projects"]]
+    assert statuses == [
+        ("timetracker", "ok"),
+        ("broken", "failed"),
+        ("timetracker", "failed"),
+        ("invoicescanner", "ok"),
+        (None, "failed"),
+    ]
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 3
+    assert "Duplicate app name" in summary["projects"][2]["error"]
+    assert summary["projects"][1]["error"] == "scaffolding failed"
+    assert len(seen) == 5
+    json.dumps(summary)
+
+
+def test_projects_are_checked_against_the_project_folder(tmp_path):
+    "One scan of the project folder, in the parent, covers every project"
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+    existing = [
+        {"app_name": "timetracker", "bundle": "com.example", "path": "/projects/old"}
+    ]
+    summary = run_batch(
+        load_manifest(manifest),
+        tmp_path,
+        max_workers=1,
+        scaffold=fake_scaffold,
+        existing_projects=existing,
+    )
+
+    statuses = [(result["app_name"], result["status"]) for result in summary["projects"]]
+    assert statuses == [("invoicescanner", "ok"), ("timetracker", "failed")]
+    assert "collides with the app 'timetracker'" in summary["projects"][1]["error"]
+
+
+def test_workers_record_timings(tmp_path):
+    "Workers write the spans of their jobs to the launcher log"
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(MANIFEST)
+    run_batch(
+        load_manifest(manifest),
+        tmp_path,
+        max_workers=2,
+        scaffold=timed_scaffold,
+        log_dir=tmp_path / "logs",
+    )
+
+    records = list(telemetry.TelemetryLog(tmp_path / "logs").read())
+    jobs = sorted(record["app_name"] for record in records if record["kind"] == "job")
+    assert jobs == ["invoicescanner", "timetracker"]
+    assert telemetry.summarize(records)["Add project"]["count"] == 2
+
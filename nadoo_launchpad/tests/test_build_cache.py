@@ -0,0 +1,183 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import briefcase
+import pytest
+from briefcase.commands import create
+
+from nadoo_launchpad import build_cache, fileops
+from nadoo_launchpad.build_cache import BuildCache
+
+
+def make_tree(path, files):
+    for name, content in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content)
+    return path
+
+
+def test_restore_copies_stored_trees(tmp_path, monkeypatch):
+    # As on filesystems without reflinks
+    monkeypatch.setattr(fileops, "reflink", lambda src, dst: False)
+    cache = BuildCache(tmp_path / "cache")
+    source = make_tree(tmp_path / "a" / "app_packages", {"toga/__init__.py": "toga"})
+    key = build_cache.cache_key("app-packages", ["toga"], "linux")
+
+    assert not cache.restore(key, tmp_path / "b" / "app_packages")
+    assert cache.store(key, source, description="toga")
+    target = make_tree(tmp_path / "b" / "app_packages", {"stale.py": ""})
+    assert cache.restore(key, target)
+
+    assert sorted(path.name for path in target.iterdir()) == ["toga"]
+    assert (target / "toga" / "__init__.py").read_text() == "toga"
+    # Never hardlinked; signing a bundle must not change the cache.
+    cached = cache.entry_path(key) / "toga" / "__init__.py"
+    assert not os.path.samefile(target / "toga" / "__init__.py", cached)
+    assert not os.path.samefile(source / "toga" / "__init__.py", cached)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["entries"] == 1 and stats["size"] == 4
+
+
+def test_changed_entries_are_evicted(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    cache.store("key", make_tree(tmp_path / "source", {"lib.so": "binary"}))
+    (cache.entry_path("key") / "lib.so").write_text("signed in place")
+
+    assert not cache.restore("key", tmp_path / "target")
+    assert not (tmp_path / "target").exists()
+    assert cache.entries() == []
+    assert cache.stats()["corrupted"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = BuildCache(tmp_path / "cache", max_bytes=250)
+    for index, key in enumerate(["old", "used", "new"]):
+        cache.store(key, make_tree(tmp_path / key, {"data": "x" * 100}))
+        os.utime(cache.entries_path / f"{key}.json", (index, index))
+    assert [entry["key"] for entry in cache.entries()] == ["used", "new"]
+
+    # Using an entry keeps it.
+    assert cache.restore("used", tmp_path / "restored")
+    cache.store("newest", make_tree(tmp_path / "newest", {"data": "x" * 100}))
+    assert [entry["key"] for entry in cache.entries()] == ["used", "newest"]
+    assert not cache.entry_path("new").exists()
+    assert cache.stats()["evictions"] == 2
+
+    # Trees larger than the whole cache aren't stored.
+    assert not cache.store("huge", make_tree(tmp_path / "huge", {"data": "x" * 300}))
+
+
+@pytest.fixture
+def pip_installs(monkeypatch):
+    "Stands in for Briefcase's pip install, and undoes the hook afterwards"
+    installs = []
+
+    def install_app_requirements(self, app, test_mode):
+        installs.append(app.app_name)
+        make_tree(self.app_packages_path(app), {"toga/__init__.py": "toga"})
+
+    monkeypatch.setattr(
+        create.CreateCommand, "install_app_requirements", install_app_requirements
+    )
+    monkeypatch.setattr(
+        create.CreateCommand,
+        "_unpack_support_package",
+        create.CreateCommand._unpack_support_package,
+    )
+    return installs
+
+
+def command(tmp_path, app_name):
+    def app_requirements_path(app):
+        raise KeyError("app_requirements_path")
+
+    return SimpleNamespace(
+        platform="linux",
+        output_format="system",
+        logger=SimpleNamespace(info=lambda message: None),
+        app_requirements_path=app_requirements_path,
+        app_packages_path=lambda app: tmp_path / app.app_name / "app_packages",
+    )
+
+
+def test_projects_share_installed_requirements(tmp_path, pip_installs):
+    cache = BuildCache(tmp_path / "cache")
+    build_cache.install_hook(cache)
+
+    for app_name in ["first", "second"]:
+        app = SimpleNamespace(app_name=app_name, requires=["toga==0.4.9"], test_requires=[])
+        create.CreateCommand.install_app_requirements(
+            command(tmp_path, app_name), app, test_mode=False
+        )
+        assert (tmp_path / app_name / "app_packages" / "toga" / "__init__.py").exists()
+    # Anything but pinned requirements may install something else next time.
+    for app_name, requires in [("unpinned", ["toga"]), ("local", ["../widgets"])]:
+        for attempt in range(2):
+            app = SimpleNamespace(app_name=app_name, requires=requires, test_requires=[])
+            create.CreateCommand.install_app_requirements(
+                command(tmp_path, app_name), app, test_mode=False
+            )
+
+    assert pip_installs == ["first", "unpinned", "unpinned", "local", "local"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_wire_venv(tmp_path):
+    venv = tmp_path / ".venv"
+    site_packages = venv / "lib" / "python3.11" / "site-packages"
+    site_packages.mkdir(parents=True)
+    script = make_tree(venv, {"bin/briefcase": f"#!{sys.executable}\nimport briefcase\n"})
+    os.chmod(script / "bin" / "briefcase", 0o755)
+
+    assert build_cache.wire_venv(venv, tmp_path / "cache", max_bytes=1024)
+
+    content = (venv / "bin" / "briefcase").read_text()
+    assert content.startswith(f"#!{sys.executable}\n")
+    assert f"run_briefcase({str(tmp_path / 'cache')!r}, 1024)" in content
+    compile(content, "briefcase", "exec")
+    assert os.access(venv / "bin" / "briefcase", os.X_OK)
+    pth = (site_packages / build_cache.PTH_FILE).read_text().strip()
+    # Only the hook is put on the venv's path.
+    assert os.listdir(pth) == ["nadoo_launchpad"]
+    assert sorted(os.listdir(os.path.join(pth, "nadoo_launchpad"))) == [
+        "__init__.py",
+        "build_cache.py",
+        "fileops.py",
+        "locks.py",
+    ]
+    imported = subprocess.run(
+        [
+            sys.executable,
+            "-I",
+            "-c",
+            f"import sys; sys.path.insert(0, {pth!r}); "
+            "from nadoo_launchpad.build_cache import run_briefcase; "
+            "print(run_briefcase.__module__, sys.modules['nadoo_launchpad'].__file__)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert imported == [
+        "nadoo_launchpad.build_cache",
+        os.path.join(pth, "nadoo_launchpad", "__init__.py"),
+    ]
+
+
+def test_other_briefcase_versions_build_without_the_cache(
+    tmp_path, pip_installs, monkeypatch
+):
+    cache = BuildCache(tmp_path / "cache")
+    install_app_requirements = create.CreateCommand.install_app_requirements
+
+    with monkeypatch.context() as patch:
+        patch.setattr(briefcase, "__version__", "0.4.0")
+        assert not build_cache.install_hook(cache)
+    monkeypatch.delattr(create.CreateCommand, "_unpack_support_package")
+    assert not build_cache.install_hook(cache)
+
+    assert create.CreateCommand.install_app_requirements is install_app_requirements
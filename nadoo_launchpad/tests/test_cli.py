@@ -0,0 +1,176 @@
+import json
+import sys
+
+import pytest
+
+from nadoo_launchpad import cli, developers, services, supervisor, utils
+from nadoo_launchpad.settings_store import open_settings
+
+# The CLI records step timings in the launcher log directory.
+pytestmark = pytest.mark.usefixtures("home")
+
+CONTEXT = """
+formal_name = "Invoice Scanner"
+bundle = "de.nadooit"
+author = "Jane Developer"
+author_email = "jane.developer@nadooit.de"
+"""
+
+
+@pytest.fixture
+def steps(monkeypatch, developer_db):
+    "Replaces the project creation steps; records the job state"
+    states = []
+
+    def record(job):
+        states.append(job.state)
+        job.state["app_path"] = "/projects/" + job.state["context"]["app_name"]
+        job.report("working")
+
+    monkeypatch.setattr(
+        services, "project_creation_steps", lambda: [("Recording", record)]
+    )
+    return states
+
+
+def test_new_project_from_context_file(tmp_path, steps, capsys):
+    "Flags override the context file"
+    context = tmp_path / "context.toml"
+    context.write_text(CONTEXT)
+
+    returncode = cli.main(
+        [
+            "--cache-dir",
+            str(tmp_path),
+            "--config-dir",
+            str(tmp_path / "config"),
+            "new-project",
+            "--context",
+            str(context),
+            "--description",
+            "Scans invoices",
+            "--json",
+        ]
+    )
+
+    assert returncode == 0
+    [state] = steps
+    assert state["context"]["app_name"] == "invoicescanner"
+    assert state["context"]["description"] == "Scans invoices"
+    assert state["context"]["license"] == "Proprietary"
+    assert state["cache_dir"] == tmp_path
+    assert state["force_refresh"] is False
+
+    out, err = capsys.readouterr()
+    assert json.loads(out)["path"] == "/projects/invoicescanner"
+    assert "[1/2] Recording" in err
+    assert "working" in err
+
+    settings = open_settings(tmp_path / "config")
+    assert list(settings.get("timings")["add_project"]) == [
+        "Recording",
+        "Saving developer",
+    ]
+    # The author shows up in the GUI's developer dropdown.
+    assert [
+        (developer.name, developer.email)
+        for developer in developers.search_developers("Jane")
+    ] == [("Jane Developer", "jane.developer@nadooit.de")]
+
+
+def test_json_output_is_not_mixed_with_messages(
+    tmp_path, template_remote, developer_db, monkeypatch, capsys
+):
+    "Template and tool messages go to stderr, even with --quiet"
+
+    def render(job):
+        utils.update_cookiecutter_cache(template_remote.url, "main")
+        supervisor.run_command([sys.executable, "-c", "print('Collecting toga')"])
+        job.state["app_path"] = "/projects/invoicescanner"
+
+    monkeypatch.setattr(services, "project_creation_steps", lambda: [("Rendering", render)])
+    context = tmp_path / "context.toml"
+    context.write_text(CONTEXT)
+
+    args = ["-q", "--cache-dir", str(tmp_path), "--config-dir", str(tmp_path / "config")]
+    assert cli.main(args + ["new-project", "--context", str(context), "--json"]) == 0
+
+    out, err = capsys.readouterr()
+    assert json.loads(out)["path"] == "/projects/invoicescanner"
+    assert "Using template main" in err
+    assert "Collecting toga" in err
+
+
+def test_new_project_missing_fields(steps, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main(["new-project", "--formal-name", "Invoice Scanner"])
+
+    assert excinfo.value.code == 2
+    assert "missing --author, --author-email, --bundle" in capsys.readouterr().err
+    assert steps == []
+
+
+def test_context_file_rejects_unknown_fields(tmp_path):
+    context = tmp_path / "context.json"
+    context.write_text(json.dumps({"formal_name": "X", "colour": "blue"}))
+
+    with pytest.raises(cli.ContextError, match="unknown fields colour"):
+        cli.load_context(context)
+
+
+def test_failed_step_sets_exit_code(monkeypatch, capsys):
+    def fail(job):
+        raise RuntimeError("no network")
+
+    monkeypatch.setattr(services, "installation_steps", lambda: [("Failing", fail)])
+
+    assert cli.main(["-q", "install"]) == 1
+    assert capsys.readouterr().err == "Error: no network\n"
+
+
+def test_timings_summarize_runs(tmp_path, steps, capsys):
+    "Every run records its step durations; timings aggregates them"
+    context = tmp_path / "context.toml"
+    context.write_text(CONTEXT)
+    for _ in range(3):
+        args = ["-q", "--cache-dir", str(tmp_path), "--log-dir", str(tmp_path / "logs")]
+        assert cli.main(args + ["new-project", "--context", str(context)]) == 0
+    capsys.readouterr()
+
+    assert cli.main(["--log-dir", str(tmp_path / "logs"), "timings", "--json"]) == 0
+
+    summary = json.loads(capsys.readouterr().out)
+    assert list(summary) == ["Recording", "Saving developer", "Add project"]
+    assert summary["Recording"]["count"] == 3
+    assert summary["Recording"]["failed"] == 0
+    assert summary["Recording"]["p50"] <= summary["Recording"]["max"]
+
+
+def test_batch_command(tmp_path, monkeypatch, capsys):
+    "batch scans the project folder once and hands the result to run_batch"
+    from nadoo_launchpad import batch, db
+
+    manifest = tmp_path / "manifest.toml"
+    manifest.write_text(f"[[project]]\n{CONTEXT}")
+    existing = [{"app_name": "old", "bundle": "de.nadooit", "path": "/projects/old"}]
+    calls = []
+
+    def run_batch(projects, cache_dir, **kwargs):
+        calls.append((projects, cache_dir, kwargs))
+        return {"succeeded": 1, "failed": 0, "projects": []}
+
+    monkeypatch.setattr(db, "_database_path", None)
+    monkeypatch.setattr(batch, "prepare_batch", lambda cache_dir: existing)
+    monkeypatch.setattr(batch, "run_batch", run_batch)
+
+    args = ["-q", "--cache-dir", str(tmp_path), "--log-dir", str(tmp_path / "logs")]
+    assert cli.main(args + ["batch", str(manifest), "-j", "2"]) == 0
+
+    [(projects, cache_dir, kwargs)] = calls
+    assert [project["formal_name"] for project in projects] == ["Invoice Scanner"]
+    assert cache_dir == tmp_path
+    assert kwargs["max_workers"] == 2
+    assert kwargs["existing_projects"] is existing
+    assert kwargs["on_result"] is None
+    assert db._database_path == kwargs["data_dir"] / db.DATABASE_FILE
+    assert json.loads(capsys.readouterr().out)["succeeded"] == 1
@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from nadoo_launchpad import db
+
+
+def test_database_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "_database_path", None)
+    monkeypatch.delenv("NADOO_DATABASE", raising=False)
+    assert db.database_path().name == db.DATABASE_FILE
+
+    db.configure(tmp_path)
+    assert db.database_path() == tmp_path / db.DATABASE_FILE
+
+    monkeypatch.setenv("NADOO_DATABASE", "/elsewhere/test.sqlite3")
+    assert db.database_path() == Path("/elsewhere/test.sqlite3")
+
+
+def test_connections_are_tuned(database):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        assert cursor.fetchone()[0] == "wal"
+        cursor.execute("PRAGMA synchronous")
+        # NORMAL
+        assert cursor.fetchone()[0] == 1
+        cursor.execute("PRAGMA mmap_size")
+        assert cursor.fetchone()[0] == db.PRAGMAS["mmap_size"]
+
+
+def test_snapshot_is_current():
+    "Rebuild with python -m nadoo_launchpad.db.snapshot after adding a migration"
+    import sqlite3
+
+    connection = sqlite3.connect(db.SNAPSHOT_PATH)
+    try:
+        applied = sorted(
+            name for (name,) in connection.execute("SELECT name FROM django_migrations")
+        )
+    finally:
+        connection.close()
+
+    assert db.read_schema_version(db.SNAPSHOT_PATH) == db.schema_version()
+    assert applied == sorted(
+        path.stem for path in db.MIGRATIONS_PATH.glob("[0-9][0-9][0-9][0-9]_*.py")
+    )
+
+
+SETUP_SCRIPT = """
+import django.core.management
+from nadoo_launchpad import db
+
+migrations = []
+django.core.management.call_command = lambda *args, **kwargs: migrations.append(args)
+db.setup()
+from nadoo_launchpad.models import Project
+Project.objects.count()
+print(len(migrations))
+"""
+
+
+def setup_in_subprocess(database):
+    "Run db.setup() in a fresh interpreter; returns the number of migrate calls"
+    output = subprocess.check_output(
+        [sys.executable, "-c", SETUP_SCRIPT],
+        env={
+            **os.environ,
+            "NADOO_DATABASE": str(database),
+            "PYTHONPATH": str(Path(db.__file__).parents[2]),
+        },
+    )
+    return int(output)
+
+
+def test_first_run_copies_snapshot(tmp_path):
+    database = tmp_path / "data" / db.DATABASE_FILE
+
+    assert setup_in_subprocess(database) == 0
+    assert db.read_schema_version(database) == db.schema_version()
+
+
+def test_outdated_database_is_migrated(tmp_path):
+    import sqlite3
+
+    database = tmp_path / db.DATABASE_FILE
+    shutil.copyfile(db.SNAPSHOT_PATH, database)
+    connection = sqlite3.connect(database)
+    connection.execute("PRAGMA user_version = 1")
+    connection.close()
+
+    assert setup_in_subprocess(database) == 1
@@ -0,0 +1,106 @@
+import base64
+
+from nadoo_launchpad import developers
+
+LDIF = """\
+# Exported from the company directory
+dn: uid=jdoe,ou=people,dc=nadooit,dc=de
+cn: Jane Doe
+displayName: Jane
+  Doe
+mail: Jane.Doe@nadooit.de
+
+dn: uid=service,ou=people,dc=nadooit,dc=de
+cn: Build Service
+
+dn: uid=jlee,ou=people,dc=nadooit,dc=de
+cn:: {name}
+mail: joerg.lee@nadooit.de
+""".format(name=base64.b64encode("Jörg Lee".encode()).decode())
+
+
+def names(page):
+    return [developer.name for developer in page]
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "team.csv"
+    path.write_text("Name,Email\nJane Doe, jane.doe@nadooit.de\n")
+
+    assert developers.read_developers(path) == [("Jane Doe", "jane.doe@nadooit.de")]
+
+
+def test_read_ldif(tmp_path):
+    "Folded and base64 values are decoded; entries without mail are skipped"
+    path = tmp_path / "people.ldif"
+    path.write_text(LDIF, encoding="utf-8")
+
+    assert developers.read_developers(path) == [
+        ("Jane Doe", "Jane.Doe@nadooit.de"),
+        ("Jörg Lee", "joerg.lee@nadooit.de"),
+    ]
+
+
+def test_import_updates_known_emails(developer_db):
+    developers.import_developers([("Jane Doe", "jane.doe@nadooit.de")])
+    count = developers.import_developers(
+        [
+            ("Jane Smith", "Jane.Doe@nadooit.de"),
+            ("Max Mustermann", "max@nadooit.de"),
+        ]
+    )
+
+    assert count == 2
+    assert names(developers.search_developers()) == ["Jane Smith", "Max Mustermann"]
+
+
+def test_search_is_case_insensitive(developer_db):
+    developers.import_developers(
+        [
+            ("Jane Doe", "jane@nadooit.de"),
+            ("jan Berg", "jan@nadooit.de"),
+            ("Max Mustermann", "max@nadooit.de"),
+        ]
+    )
+
+    assert names(developers.search_developers("JAN")) == ["jan Berg", "Jane Doe"]
+    assert names(developers.search_developers("ma")) == ["Max Mustermann"]
+    assert developers.search_developers("x") == []
+
+
+def test_search_pages(developer_db):
+    "Pages continue after the last developer, including duplicate names"
+    developers.import_developers(
+        [(f"Developer {index % 7:02d}", f"dev{index:03d}@nadooit.de") for index in range(30)]
+    )
+
+    seen = []
+    after = None
+    while page := developers.search_developers("developer", after=after, limit=4):
+        seen.extend((developer.name, developer.email) for developer in page)
+        after = page[-1]
+
+    assert len(seen) == 30
+    assert seen == sorted(seen)
+
+
+def test_default_developers(developer_db):
+    developers.ensure_default_developers()
+    developers.ensure_default_developers()
+
+    assert len(developers.search_developers()) == len(developers.DEFAULT_DEVELOPERS)
+
+
+def test_search_uses_index(developer_db):
+    from django.db import connection
+
+    from nadoo_launchpad.models import Developer
+
+    queryset = Developer.objects.filter(developers.prefix_filter("search_name", "jan"))
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = " ".join(row[-1] for row in cursor.fetchall())
+
+    assert "developer_search_idx" in plan
+    assert "TEMP B-TREE" not in plan
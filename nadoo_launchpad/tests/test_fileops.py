@@ -0,0 +1,41 @@
+import os
+import stat
+
+import pytest
+
+from nadoo_launchpad.fileops import atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("old")
+
+    with atomic_write(path) as file:
+        file.write("new")
+        # Readers still see the old content.
+        assert path.read_text() == "old"
+
+    assert path.read_text() == "new"
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_failed_atomic_write_leaves_the_file_alone(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as file:
+            file.write("half")
+            raise RuntimeError("disk full")
+
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_atomic_write_sets_permissions(tmp_path):
+    path = tmp_path / "briefcase"
+
+    with atomic_write(path, "wb", permissions=0o755) as file:
+        file.write(b"#!/bin/sh\n")
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
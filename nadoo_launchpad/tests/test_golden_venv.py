@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from nadoo_launchpad import golden_venv
+
+
+def fake_run(args):
+    "Create venvs for real, but install a fake briefcase console script"
+    if args[1:3] == ["-m", "venv"]:
+        subprocess.check_call(args + ["--without-pip"])
+    elif args[1] == "install":
+        bin_path = Path(args[0]).parent
+        script = bin_path / "briefcase"
+        script.write_text(f"#!{bin_path / 'python'}\nprint('briefcase')\n")
+        script.chmod(0o755)
+        site_packages = next(bin_path.parent.glob("lib/python*/site-packages"))
+        (site_packages / "briefcase.py").write_text("VERSION = '0.3.16'\n")
+    elif args[1] == "download":
+        dest = Path(args[args.index("--dest") + 1])
+        (dest / "briefcase.whl").write_text("wheel")
+
+
+@pytest.fixture
+def golden(tmp_path):
+    if sys.platform == "win32":
+        pytest.skip("venv layout differs on Windows")
+    return golden_venv.build_golden_venv(
+        sys.executable, tmp_path / "cache", "0.3.16", run=fake_run
+    )
+
+
+def test_golden_venv_is_built_once(tmp_path, golden):
+    "A second build reuses the existing golden venv"
+    calls = []
+    again = golden_venv.build_golden_venv(
+        sys.executable, tmp_path / "cache", "0.3.16", run=calls.append
+    )
+    assert again == golden
+    assert calls == []
+
+
+def test_concurrent_builds_build_once(tmp_path):
+    "Callers racing for the same golden venv wait for a single build"
+    if sys.platform == "win32":
+        pytest.skip("venv layout differs on Windows")
+    venvs = []
+
+    def run(args):
+        if args[1:3] == ["-m", "venv"]:
+            venvs.append(args[-1])
+        fake_run(args)
+
+    results = []
+
+    def build():
+        results.append(
+            golden_venv.build_golden_venv(sys.executable, tmp_path / "cache", "0.3.16", run=run)
+        )
+
+    threads = [threading.Thread(target=build) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert len(venvs) == 1
+    assert len(set(results)) == 1 and len(results) == 3
+
+
+def test_clone_rewrites_venv_paths(tmp_path, golden):
+    "The clone is a working venv that refers only to its own path"
+    target = golden_venv.clone_venv(golden, tmp_path / "project" / ".venv")
+    built_at = golden_venv.read_metadata(golden)["built_at"]
+
+    assert not (target / golden_venv.METADATA_FILE).exists()
+    for path in [target / "pyvenv.cfg", target / "bin" / "activate", target / "bin" / "briefcase"]:
+        content = path.read_text()
+        assert built_at not in content
+    assert (target / "bin" / "briefcase").read_text().startswith(f"#!{target}/bin/python\n")
+    assert os.access(target / "bin" / "briefcase", os.X_OK)
+    assert "(.venv) " in (target / "bin" / "activate").read_text()
+
+    prefix = subprocess.check_output(
+        [str(target / "bin" / "python"), "-c", "import sys, briefcase; print(sys.prefix)"]
+    )
+    assert prefix.decode().strip() == str(target)
+
+
+def test_clone_shares_file_contents(tmp_path, golden):
+    "Package files are linked rather than copied"
+    target = golden_venv.clone_venv(golden, tmp_path / "project" / ".venv")
+    source = next(golden.glob("lib/python*/site-packages/briefcase.py"))
+    clone = next(target.glob("lib/python*/site-packages/briefcase.py"))
+
+    assert clone.read_text() == source.read_text()
+    # Hardlinks share the inode; reflinks share the extents, but not the inode.
+    if source.stat().st_ino == clone.stat().st_ino:
+        assert source.stat().st_nlink == 2
@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from nadoo_launchpad import interpreters
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX layout")
+
+
+def make_pyenv_version(root, version):
+    "A pyenv interpreter that can only be identified by its headers"
+    prefix = root / "versions" / version
+    (prefix / "bin").mkdir(parents=True)
+    python = prefix / "bin" / "python3"
+    python.write_text("#!/bin/sh\nexit 1\n")
+    python.chmod(0o755)
+    minor = ".".join(version.split(".")[:2])
+    (prefix / "include" / f"python{minor}").mkdir(parents=True)
+    (prefix / "include" / f"python{minor}" / "patchlevel.h").write_text(
+        f'#define PY_MAJOR_VERSION 3\n#define PY_VERSION "{version}"\n'
+    )
+    return python
+
+
+def make_path_python(directory, name, version):
+    "An interpreter on PATH without headers"
+    directory.mkdir(exist_ok=True)
+    python = directory / name
+    python.write_text(f"#!/bin/sh\necho {version}\n")
+    python.chmod(0o755)
+    return python
+
+
+@pytest.fixture
+def machine(tmp_path, monkeypatch):
+    "A pyenv root with 3.11.7 and 3.12.1, and a PATH with python3.12 (3.12.1)"
+    root = tmp_path / "pyenv"
+    bin_dir = tmp_path / "bin"
+    monkeypatch.setenv("PYENV_ROOT", str(root))
+    monkeypatch.setenv("PATH", f"{root / 'shims'}{os.pathsep}{bin_dir}")
+    monkeypatch.delenv("PYENV_VERSION", raising=False)
+    monkeypatch.chdir(tmp_path)
+    make_pyenv_version(root, "3.11.7")
+    make_pyenv_version(root, "3.12.1")
+    make_path_python(bin_dir, "python3.12", "3.12.1")
+    # The shims are never run.
+    make_path_python(root / "shims", "python3", "0.0.0")
+    return tmp_path
+
+
+def test_discovery_reads_the_filesystem(machine):
+    found = interpreters.find_interpreters(machine / "cache")
+
+    assert [(i["version"], i["source"], i["name"]) for i in found] == [
+        ("3.11.7", "pyenv", "3.11.7"),
+        ("3.12.1", "pyenv", "3.12.1"),
+        ("3.12.1", "path", None),
+    ]
+
+
+def test_discovery_is_cached_until_a_directory_changes(machine, monkeypatch):
+    cache_dir = machine / "cache"
+    interpreters.find_interpreters(cache_dir)
+    # A new process only has the cache file.
+    interpreters._memory_cache.clear()
+
+    def run(*args, **kwargs):
+        raise AssertionError("interpreter was run")
+
+    monkeypatch.setattr(subprocess, "check_output", run)
+    assert len(interpreters.find_interpreters(cache_dir)) == 3
+
+    # A new install changes the mtime of the versions directory; the known
+    # interpreters aren't asked for their version again.
+    make_pyenv_version(machine / "pyenv", "3.13.0")
+    assert [i["version"] for i in interpreters.find_interpreters(cache_dir)] == [
+        "3.11.7",
+        "3.12.1",
+        "3.13.0",
+        "3.12.1",
+    ]
+
+
+def test_find_python_follows_the_pyenv_selection(machine, monkeypatch):
+    cache_dir = machine / "cache"
+    root = machine / "pyenv"
+    interpreters.set_global_pyenv_version("3.11.7")
+    assert interpreters.find_python(cache_dir=cache_dir) == str(
+        root / "versions" / "3.11.7" / "bin" / "python3"
+    )
+
+    project = machine / "project" / "src"
+    project.mkdir(parents=True)
+    (machine / "project" / ".python-version").write_text("# pinned\n3.12.1\n")
+    assert "3.12.1" in interpreters.find_python(cwd=project, cache_dir=cache_dir)
+
+    monkeypatch.setenv("PYENV_VERSION", "3.11.7:3.12.1")
+    assert "3.11.7" in interpreters.find_python(cwd=project, cache_dir=cache_dir)
+
+
+def test_find_python_without_the_selected_version(machine):
+    "system is the PATH interpreter; an uninstalled selection isn't \"newest\""
+    cache_dir = machine / "cache"
+    system = make_path_python(machine / "bin", "python3", "3.10.13")
+    interpreters.set_global_pyenv_version("system")
+    assert interpreters.find_python(cache_dir=cache_dir) == str(system)
+
+    interpreters.set_global_pyenv_version("3.9.18")
+    assert interpreters.find_python(cache_dir=cache_dir) == str(
+        machine / "pyenv" / "versions" / interpreters.DEFAULT_VERSION / "bin" / "python3"
+    )
+    assert interpreters.find_python(cache_dir=cache_dir, default=str(system)) == str(
+        system
+    )
+
+
+def test_find_python_picks_the_best_match(machine):
+    cache_dir = machine / "cache"
+
+    # The newest version wins; pyenv wins ties.
+    assert interpreters.find_python("3", cache_dir=cache_dir) == str(
+        machine / "pyenv" / "versions" / "3.12.1" / "bin" / "python3"
+    )
+    assert "3.11.7" in interpreters.find_python("3.11", cache_dir=cache_dir)
+    assert "3.12.1" in interpreters.find_python(">=3.11.8", cache_dir=cache_dir)
+    with pytest.raises(interpreters.InterpreterNotFound, match="No Python 3.10"):
+        interpreters.find_python("3.10", cache_dir=cache_dir)
+
+
+def test_pyenv_state_without_pyenv(machine):
+    assert interpreters.pyenv_version_installed("3.11.7")
+    assert not interpreters.pyenv_version_installed("3.10.13")
+
+    interpreters.set_global_pyenv_version("3.12.1")
+    assert (machine / "pyenv" / "version").read_text() == "3.12.1\n"
+    assert interpreters.selected_pyenv_version() == "3.12.1"
@@ -0,0 +1,98 @@
+import subprocess
+import sys
+import threading
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from nadoo_launchpad import services
+from nadoo_launchpad.jobs import Job, JobCancelled, JobRunner
+
+
+def test_steps_run_in_order_with_progress():
+    "Steps share the job state and report progress before each step"
+    progress = []
+
+    def first(job):
+        job.state["seen"] = ["first"]
+
+    def second(job):
+        job.state["seen"].append("second")
+
+    job = Job(
+        "test",
+        [("First", first), ("Second", second)],
+        on_progress=lambda *args: progress.append(args),
+    )
+    state = job.run()
+
+    assert state["seen"] == ["first", "second"]
+    assert progress == [(0, 2, "First"), (1, 2, "Second"), (2, 2, "Done")]
+
+
+def test_run_command_streams_output():
+    "Subprocess output is reported line by line"
+    lines = []
+    job = Job("test", [], on_output=lines.append)
+    job.run_command([sys.executable, "-c", "print('one'); print('two')"])
+
+    assert lines == ["one", "two"]
+
+
+def test_run_command_failure():
+    "A failing command raises CalledProcessError"
+    job = Job("test", [])
+    with pytest.raises(subprocess.CalledProcessError):
+        job.run_command([sys.executable, "-c", "raise SystemExit(3)"])
+
+
+def test_cancel_kills_running_step():
+    "Cancelling a job kills the subprocess of the running step"
+    started = threading.Event()
+
+    def slow(job):
+        started.set()
+        job.run_command([sys.executable, "-c", "import time; time.sleep(30)"])
+
+    done = []
+    runner = JobRunner()
+    job = Job("test", [("Slow", slow)])
+    future = runner.submit(job, on_done=lambda job, error: done.append(error))
+
+    assert started.wait(5)
+    time.sleep(0.2)
+    assert runner.cancel()
+
+    with pytest.raises(JobCancelled):
+        future.result(timeout=5)
+    assert isinstance(done[0], JobCancelled)
+    assert not runner.busy
+
+
+def test_install_runs_off_the_ui_thread(tmp_path, monkeypatch):
+    "The installation is submitted to the component's runner"
+    threads = []
+    done = threading.Event()
+
+    def step(job):
+        threads.append(threading.current_thread())
+        job.report("installed")
+
+    monkeypatch.setattr(services, "installation_steps", lambda: [("Step", step)])
+    events = []
+    component = SimpleNamespace(
+        app=SimpleNamespace(paths=SimpleNamespace(config=tmp_path, cache=tmp_path)),
+        job_runner=JobRunner(),
+        on_job_started=lambda job: events.append("started"),
+        on_job_progress=lambda index, total, label: events.append((index, total)),
+        on_job_output=events.append,
+        on_job_done=lambda job, error: (events.append(error), done.set()),
+    )
+
+    services.install(component, None)
+
+    assert done.wait(5)
+    assert threads and threads[0] is not threading.current_thread()
+    assert events == ["started", (0, 1), "installed", (1, 1), None]
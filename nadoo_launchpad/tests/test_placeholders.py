@@ -0,0 +1,80 @@
+import io
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from nadoo_launchpad import placeholders
+from nadoo_launchpad.placeholders import CompiledTemplate, PlaceholderError
+
+RESOURCES = Path(placeholders.__file__).parent / "resources"
+
+
+def test_render_is_single_pass():
+    "Values that look like placeholders are not substituted again"
+    template = CompiledTemplate('name = "{{APP_NAME}}"\ndesc = "{{DESCRIPTION}}"\n')
+
+    rendered = template.render({"app_name": "{{DESCRIPTION}}", "description": "x"})
+
+    assert rendered == 'name = "{{DESCRIPTION}}"\ndesc = "x"\n'
+    assert template.placeholders == {"APP_NAME", "DESCRIPTION"}
+
+
+def test_render_reports_all_mismatches():
+    template = CompiledTemplate("{{A}} {{B}}")
+
+    with pytest.raises(PlaceholderError) as excinfo:
+        template.render({"a": "1", "c": "3"})
+
+    assert excinfo.value.missing == ["B"]
+    assert excinfo.value.unknown == ["C"]
+
+
+def test_render_to_streams_into_file():
+    template = CompiledTemplate("[{{A}}]")
+    output = io.StringIO()
+
+    template.render_to(output, {"A": 1})
+
+    assert output.getvalue() == "[1]"
+
+
+def test_load_template_recompiles_changed_file(tmp_path):
+    path = tmp_path / "template.toml"
+    path.write_text("{{A}}")
+    first = placeholders.load_template(path)
+    assert placeholders.load_template(path) is first
+
+    path.write_text("{{A}} {{B}}")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert placeholders.load_template(path).placeholders == {"A", "B"}
+
+
+def test_create_pyproject_file(tmp_path):
+    "The bundled template renders into valid TOML"
+    import tomllib
+
+    from nadoo_launchpad.utils import create_pyproject_file
+
+    user_data = {
+        name.lower(): f"value-{name.lower()}"
+        for name in placeholders.load_template(
+            RESOURCES / "base_project_template.toml"
+        ).placeholders
+    }
+    user_data["app_name"] = "demo_app"
+    component = SimpleNamespace(
+        app=SimpleNamespace(paths=SimpleNamespace(app=RESOURCES.parent)),
+        display_error=pytest.fail,
+    )
+
+    path = create_pyproject_file(component, user_data, tmp_path)
+
+    with open(path, "rb") as pyproject:
+        pyproject = tomllib.load(pyproject)
+    assert pyproject["tool"]["briefcase"]["app"]["demo_app"]["description"] == (
+        "value-description"
+    )
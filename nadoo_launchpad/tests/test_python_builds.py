@@ -0,0 +1,166 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from nadoo_launchpad import python_builds
+from nadoo_launchpad.supervisor import run_command
+from nadoo_launchpad.settings_store import SettingsStore
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX layout")
+
+
+def fake_pyenv_install(builds, python="#!/bin/sh\n"):
+    "Stands in for pyenv install, laying out a minimal interpreter"
+    lock = threading.Lock()
+
+    def run(args, env=None):
+        if args[1:] == ["-c", "pass"]:
+            # Smoke tests run the fake interpreter.
+            return run_command(args)
+        assert args[1:] == ["install", args[2]]
+        version = args[2]
+        with lock:
+            builds.append((version, env["MAKE_OPTS"]))
+        prefix = python_builds.pyenv_root() / "versions" / version
+        (prefix / "bin").mkdir(parents=True)
+        (prefix / "bin" / "python3").write_text(python)
+        (prefix / "bin" / "python3").chmod(0o755)
+        (prefix / "bin" / "pip3").write_text(f"#!{prefix}/bin/python3\n")
+        (prefix / "bin" / "pip3").chmod(0o755)
+        (prefix / "lib").mkdir()
+        (prefix / "lib" / "_sysconfigdata.py").write_text(f"prefix = '{prefix}'\n")
+        (prefix / "lib" / "libpython.a").write_bytes(b"\0" + os.fsencode(prefix))
+
+    return run
+
+
+@pytest.fixture
+def pyenv(tmp_path, monkeypatch):
+    root = tmp_path / "machine1" / ".pyenv"
+    monkeypatch.setenv("PYENV_ROOT", str(root))
+    return root
+
+
+def test_builds_are_shared_through_the_cache(tmp_path, pyenv, monkeypatch):
+    build_cache = tmp_path / "shared"
+    builds = []
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+
+    installed = python_builds.install_python_versions(
+        ["3.11.7", "3.12.1"], build_cache, run=fake_pyenv_install(builds)
+    )
+
+    assert installed == {"3.11.7": "built", "3.12.1": "built"}
+    # The two concurrent builds share the cores.
+    assert sorted(builds) == [("3.11.7", "-j4"), ("3.12.1", "-j4")]
+    assert python_builds.tarball_path(build_cache, "3.11.7").exists()
+
+    # Another machine, with another home directory, unpacks the builds.
+    other_root = tmp_path / "machine2" / ".pyenv"
+    monkeypatch.setenv("PYENV_ROOT", str(other_root))
+    installed = python_builds.install_python_versions(
+        ["3.11.7", "3.12.1"], build_cache, run=fake_pyenv_install(builds)
+    )
+
+    assert installed == {"3.11.7": "unpacked", "3.12.1": "unpacked"}
+    assert len(builds) == 2
+    prefix = other_root / "versions" / "3.11.7"
+    assert (prefix / "bin" / "pip3").read_text() == f"#!{prefix}/bin/python3\n"
+    assert os.access(prefix / "bin" / "pip3", os.X_OK)
+    assert (prefix / "lib" / "_sysconfigdata.py").read_text() == f"prefix = '{prefix}'\n"
+    # Binaries are left alone.
+    assert str(pyenv).encode() in (prefix / "lib" / "libpython.a").read_bytes()
+    assert not (prefix / python_builds.METADATA_FILE).exists()
+    assert sorted(path.name for path in (other_root / "versions").iterdir()) == [
+        "3.11.7",
+        "3.12.1",
+    ]
+
+    # Nothing to do the next time.
+    assert python_builds.install_python_versions(
+        ["3.11.7"], build_cache, run=fake_pyenv_install(builds)
+    ) == {"3.11.7": "installed"}
+
+
+def test_partial_installs_are_replaced(tmp_path, pyenv):
+    build_cache = tmp_path / "shared"
+    builds = []
+    # A build killed half way; its interpreter doesn't run.
+    prefix = pyenv / "versions" / "3.11.7"
+    (prefix / "bin").mkdir(parents=True)
+    (prefix / "bin" / "python3").write_text("#!/bin/sh\nexit 1\n")
+    (prefix / "bin" / "python3").chmod(0o755)
+
+    assert python_builds.install_python(
+        "3.11.7", build_cache, run=fake_pyenv_install(builds)
+    ) == "built"
+    assert builds == [("3.11.7", f"-j{os.cpu_count()}")]
+
+    # A build that doesn't run isn't published.
+    with pytest.raises(subprocess.CalledProcessError):
+        python_builds.install_python(
+            "3.12.1", build_cache, run=fake_pyenv_install(builds, "#!/bin/sh\nexit 1\n")
+        )
+    assert not python_builds.tarball_path(build_cache, "3.12.1").exists()
+
+
+def test_broken_versions_are_reinstalled(tmp_path, pyenv):
+    build_cache = tmp_path / "shared"
+    builds = []
+    prefix = pyenv / "versions" / "3.11.7"
+    (prefix / "bin").mkdir(parents=True)
+    (prefix / "bin" / "python3").write_text("#!/bin/sh\nexit 1\n")
+    (prefix / "bin" / "python3").chmod(0o755)
+
+    assert python_builds.install_python_versions(
+        ["3.11.7"], build_cache, run=fake_pyenv_install(builds)
+    ) == {"3.11.7": "built"}
+    assert len(builds) == 1
+
+
+def test_tarballs_that_dont_run_are_rebuilt(tmp_path, pyenv):
+    build_cache = tmp_path / "shared"
+    builds = []
+    tarball = python_builds.tarball_path(build_cache, "3.11.7")
+    # Built on a machine the platform tag doesn't tell apart
+    python_builds.install_python(
+        "3.11.7", build_cache, run=fake_pyenv_install([], "#!/bin/sh\n")
+    )
+    prefix = pyenv / "versions" / "3.11.7"
+    (prefix / "bin" / "python3").write_text("#!/bin/sh\nexit 1\n")
+    python_builds.pack(prefix, tarball)
+    shutil.rmtree(prefix)
+
+    assert python_builds.install_python(
+        "3.11.7", build_cache, run=fake_pyenv_install(builds)
+    ) == "built"
+    assert len(builds) == 1
+    assert python_builds.python_works(prefix)
+
+    # The tarball was replaced by the working build.
+    shutil.rmtree(prefix)
+    assert python_builds.install_python(
+        "3.11.7", build_cache, run=fake_pyenv_install(builds)
+    ) == "unpacked"
+    assert len(builds) == 1
+
+
+def test_versions_and_cache_come_from_the_settings(tmp_path, monkeypatch):
+    monkeypatch.delenv("NADOO_PYTHON_BUILD_CACHE", raising=False)
+    settings = SettingsStore(tmp_path / "config")
+
+    assert python_builds.configured_versions(settings) == ["3.11.7"]
+    assert python_builds.build_cache_path(settings, tmp_path / "cache") == (
+        tmp_path / "cache" / "python-builds"
+    )
+
+    settings.update(
+        {"python": {"versions": ["3.12.1", "3.11.7"], "build_cache": "/mnt/builds"}}
+    )
+    assert python_builds.configured_versions(settings) == ["3.12.1", "3.11.7"]
+    assert str(python_builds.build_cache_path(settings, tmp_path)) == "/mnt/builds"
+    settings.flush()
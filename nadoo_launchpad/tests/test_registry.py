@@ -0,0 +1,103 @@
+from pathlib import Path
+
+import pytest
+
+from nadoo_launchpad import registry, services
+from nadoo_launchpad.db import prefix_filter
+from nadoo_launchpad.jobs import Job
+
+
+def context(app_name, bundle="de.nadooit"):
+    return {"app_name": app_name, "formal_name": app_name.title(), "bundle": bundle}
+
+
+def test_register_and_find(registry_db, tmp_path):
+    registry.register_project(
+        context("invoices"),
+        path=tmp_path / "invoices",
+        venv_path=tmp_path / "invoices" / ".venv",
+        template_sha="a" * 40,
+        briefcase_version="0.3.16",
+    )
+
+    project = registry.find_project("invoices")
+    assert project.bundle_identifier == "de.nadooit.invoices"
+    assert project.path == str(tmp_path / "invoices")
+    assert project.template_sha == "a" * 40
+    assert registry.find_project("invoice") is None
+
+    assert registry.forget_project("invoices")
+    assert registry.find_project("invoices") is None
+
+
+def test_search_by_prefix(registry_db, tmp_path):
+    for app_name, bundle in [
+        ("invoices", "de.nadooit"),
+        ("inventory", "com.example"),
+        ("timetracker", "de.nadooit.tools"),
+        ("zebra", "org.zoo"),
+    ]:
+        registry.register_project(context(app_name, bundle), path=tmp_path / app_name)
+
+    def search(prefix):
+        return [project.app_name for project in registry.search_projects(prefix)]
+
+    assert search("inv") == ["inventory", "invoices"]
+    assert search("INVO") == ["invoices"]
+    assert search("de.nadooit") == ["invoices", "timetracker"]
+    assert search("") == ["inventory", "invoices", "timetracker", "zebra"]
+    assert search("x") == []
+
+
+def test_prefix_search_uses_indexes(registry_db):
+    "Prefix searches are index range scans, not table scans"
+    from django.db import connection
+
+    from nadoo_launchpad.models import Project
+
+    queryset = Project.objects.filter(
+        prefix_filter("app_name", "inv") | prefix_filter("bundle", "de.")
+    )
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = " ".join(row[-1] for row in cursor.fetchall())
+
+    assert "SCAN" not in plan
+    assert "project_bundle_idx" in plan
+
+
+def test_check_project_path(registry_db, tmp_path, monkeypatch):
+    "Registered projects block their name until their directory is deleted"
+    monkeypatch.setattr(services, "get_project_folder_path", lambda: str(tmp_path / "new"))
+    existing = tmp_path / "elsewhere" / "invoices"
+    existing.mkdir(parents=True)
+    registry.register_project(context("invoices"), path=existing)
+    job = Job(
+        "Add project",
+        [],
+        state={"context": context("invoices"), "cache_dir": tmp_path / "cache"},
+    )
+
+    with pytest.raises(Exception, match="already exists in"):
+        services.check_project_path(job)
+
+    existing.rmdir()
+    services.check_project_path(job)
+    assert job.state["app_path"] == Path(tmp_path / "new" / "invoices")
+    assert registry.find_project("invoices") is None
+
+
+def test_register_many(registry_db, tmp_path):
+    "Bulk registration inserts new projects and updates known ones"
+    registry.register_project(context("invoices"), path=tmp_path / "old")
+
+    count = registry.register_projects(
+        {"context": context(f"project{index}"), "path": tmp_path / f"project{index}"}
+        for index in range(1200)
+    )
+    registry.register_projects([{"context": context("invoices"), "path": tmp_path / "new"}])
+
+    assert count == 1200
+    assert len(registry.search_projects("project", limit=2000)) == 1200
+    assert registry.find_project("invoices").path == str(tmp_path / "new")
@@ -0,0 +1,129 @@
+import json
+from pathlib import Path
+
+import briefcase
+import pytest
+from briefcase.exceptions import BriefcaseCommandError
+
+from nadoo_launchpad import services, template_cache
+from nadoo_launchpad.jobs import Job
+from nadoo_launchpad.utils import get_project_folder_path
+
+TEMPLATE_FILES = {
+    "cookiecutter.json": json.dumps(
+        {"formal_name": "App", "app_name": "app", "template_branch": ""}
+    ),
+    "{{ cookiecutter.app_name }}/README.md": (
+        "# {{ cookiecutter.formal_name }} ({{ cookiecutter.template_branch }})\n"
+    ),
+}
+
+
+@pytest.fixture
+def template(home, template_remote, tmp_path, monkeypatch):
+    "The stand-in template as the project template, with only a main branch"
+    template_remote.commit(TEMPLATE_FILES, branch="main")
+    monkeypatch.setattr(services, "TEMPLATE", template_remote.url)
+    monkeypatch.setattr(services, "_template_branches", {})
+    monkeypatch.setattr(briefcase, "__version__", "0.3.17.dev1")
+    return template_remote
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    "Records the branch of every template render"
+    branches = []
+    generate_template = services.generate_template
+
+    def record(**kwargs):
+        branches.append(kwargs["branch"])
+        return generate_template(**kwargs)
+
+    monkeypatch.setattr(services, "generate_template", record)
+    return branches
+
+
+def render(tmp_path, formal_name):
+    context = {"formal_name": formal_name, "app_name": formal_name.lower()}
+    app_path = Path(get_project_folder_path()) / context["app_name"]
+    job = Job(
+        "render",
+        [("Rendering", services.render_project_template)],
+        state={"context": context, "app_path": app_path, "cache_dir": tmp_path / "cache"},
+    )
+    job.run()
+    return app_path
+
+
+def test_each_project_is_rendered_once(template, renders, tmp_path, monkeypatch):
+    "A missing version branch is detected up front, not by a failed render"
+    resolve_branch = template_cache.resolve_branch
+    resolutions = []
+
+    def record(*args, **kwargs):
+        resolutions.append(args)
+        return resolve_branch(*args, **kwargs)
+
+    monkeypatch.setattr(template_cache, "resolve_branch", record)
+
+    first = render(tmp_path, "First")
+    second = render(tmp_path, "Second")
+
+    assert renders == ["main", "main"]
+    assert len(resolutions) == 1
+    assert (first / "README.md").read_text() == "# First (main)\n"
+    assert (second / "README.md").read_text() == "# Second (main)\n"
+    # Nothing but the projects is left in the project folder.
+    assert sorted(path.name for path in first.parent.iterdir()) == ["first", "second"]
+
+
+def test_renders_never_replace_a_directory(template, tmp_path, monkeypatch):
+    "Not even an empty one created while the project was rendered"
+    generate_template = services.generate_template
+    app_path = Path(get_project_folder_path()) / "taken"
+
+    def render_while_taken(**kwargs):
+        sha = generate_template(**kwargs)
+        app_path.mkdir()
+        return sha
+
+    monkeypatch.setattr(services, "generate_template", render_while_taken)
+
+    with pytest.raises(BriefcaseCommandError, match="'taken' already exists"):
+        render(tmp_path, "Taken")
+    assert list(Path(get_project_folder_path()).iterdir()) == [app_path]
+    assert list(app_path.iterdir()) == []
+
+
+def test_failed_render_leaves_nothing_behind(template, tmp_path, monkeypatch):
+    def fail(**kwargs):
+        project = Path(kwargs["output_path"]) / "broken"
+        project.mkdir()
+        (project / "half-written.txt").write_text("")
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(services, "generate_template", fail)
+
+    with pytest.raises(RuntimeError):
+        render(tmp_path, "Broken")
+    assert list(Path(get_project_folder_path()).iterdir()) == []
+
+
+def test_resolved_branches_are_read_from_the_fetch(template, tmp_path, monkeypatch):
+    "Within the TTL another process resolves branches without git"
+    assert template_cache.resolve_branch(template.url, ["v0.3.17", "main"]) == "main"
+
+    opened = []
+    open_mirror = template_cache.open_mirror
+
+    def record(*args):
+        opened.append(args)
+        return open_mirror(*args)
+
+    monkeypatch.setattr(template_cache, "open_mirror", record)
+    assert template_cache.resolve_branch(template.url, ["main"]) == "main"
+    assert opened == []
+    with pytest.raises(IndexError):
+        # Unknown branches still ask the mirror, which may have new ones.
+        template_cache.resolve_branch(template.url, ["v0.3.17"])
+    assert len(opened) == 1
@@ -0,0 +1,89 @@
+import os
+
+from nadoo_launchpad import scanner
+
+PYPROJECT = """
+[tool.briefcase]
+project_name = "{name}"
+bundle = "{bundle}"
+
+[tool.briefcase.app.{app_name}]
+formal_name = "{name}"
+"""
+
+
+def write_project(root, app_name, bundle="de.nadooit", name=None):
+    project = root / app_name
+    project.mkdir(parents=True, exist_ok=True)
+    (project / "pyproject.toml").write_text(
+        PYPROJECT.format(name=name or app_name.title(), bundle=bundle, app_name=app_name)
+    )
+    return project
+
+
+def test_scan_finds_briefcase_projects(tmp_path):
+    root = tmp_path / "projects"
+    write_project(root, "invoices")
+    write_project(root / "clients", "timetracker", bundle="com.example")
+    # Not Briefcase projects
+    (root / "library").mkdir()
+    (root / "library" / "pyproject.toml").write_text("[project]\nname = 'library'\n")
+    (root / "broken").mkdir()
+    (root / "broken" / "pyproject.toml").write_text("[tool.briefcase")
+    # Never scanned
+    write_project(root / "invoices" / "build", "nested")
+    write_project(root / ".hidden", "hidden")
+
+    projects = scanner.scan_projects(root, tmp_path / "cache")
+
+    assert [(project["app_name"], project["bundle"]) for project in projects] == [
+        ("timetracker", "com.example"),
+        ("invoices", "de.nadooit"),
+    ]
+    assert projects[1]["path"] == str(root / "invoices")
+
+
+def test_rescan_only_parses_changed_files(tmp_path, monkeypatch):
+    root = tmp_path / "projects"
+    invoices = write_project(root, "invoices")
+    write_project(root, "timetracker")
+    scanner.scan_projects(root, tmp_path / "cache")
+
+    parsed = []
+    parse = scanner.parse_pyproject
+    monkeypatch.setattr(
+        scanner, "parse_pyproject", lambda path: parsed.append(path) or parse(path)
+    )
+
+    scanner.scan_projects(root, tmp_path / "cache")
+    assert parsed == []
+
+    write_project(root, "invoices", name="Invoice Scanner")
+    stat = (invoices / "pyproject.toml").stat()
+    os.utime(invoices / "pyproject.toml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    projects = scanner.scan_projects(root, tmp_path / "cache")
+
+    assert parsed == [str(invoices / "pyproject.toml")]
+    assert projects[0]["formal_name"] == "Invoice Scanner"
+
+
+def test_removed_projects_leave_the_index(tmp_path):
+    root = tmp_path / "projects"
+    invoices = write_project(root, "invoices")
+    scanner.scan_projects(root, tmp_path / "cache")
+
+    (invoices / "pyproject.toml").unlink()
+
+    assert scanner.scan_projects(root, tmp_path / "cache") == []
+    assert scanner.load_index(tmp_path / "cache") == {}
+
+
+def test_find_collisions():
+    projects = [
+        {"app_name": "my-app", "bundle": "com.example"},
+        {"app_name": "invoices", "bundle": "de.nadooit"},
+    ]
+
+    assert scanner.find_collisions(projects, "my_app", "de.nadooit") == projects[:1]
+    assert scanner.find_collisions(projects, "invoices", "org.other") == projects[1:]
+    assert scanner.find_collisions(projects, "timetracker", "de.nadooit") == []
@@ -0,0 +1,88 @@
+import os
+from types import SimpleNamespace
+
+from nadoo_launchpad import services, settings_store
+from nadoo_launchpad.settings_store import SettingsStore, open_settings
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_reads_are_cached(tmp_path, monkeypatch):
+    store = SettingsStore(tmp_path)
+    store.set("installed", True)
+    store.flush()
+
+    fresh = SettingsStore(tmp_path)
+    reads = []
+    read = fresh._read
+    monkeypatch.setattr(fresh, "_read", lambda: reads.append(1) or read())
+    for _ in range(10):
+        assert fresh.get("installed") is True
+    assert len(reads) == 1
+
+    # Another process changes the file.
+    other = SettingsStore(tmp_path)
+    other.set("installed", False)
+    other.flush()
+    bump_mtime(other.path)
+
+    assert fresh.get("installed") is False
+    assert len(reads) == 2
+
+
+def test_writes_are_coalesced(tmp_path, monkeypatch):
+    replaced = []
+    replace = os.replace
+    monkeypatch.setattr(
+        settings_store.os, "replace", lambda *args: replaced.append(args) or replace(*args)
+    )
+    store = SettingsStore(tmp_path, write_delay=60)
+    for index in range(100):
+        store.update_section("timings", {f"step {index}": index})
+
+    assert not store.path.exists()
+    store.flush()
+    store.flush()
+
+    assert len(replaced) == 1
+    assert len(SettingsStore(tmp_path).get("timings")) == 100
+    # Nothing but the settings file is left behind.
+    assert os.listdir(tmp_path) == [settings_store.SETTINGS_FILE]
+
+
+def test_flush_keeps_changes_of_other_processes(tmp_path):
+    first = SettingsStore(tmp_path, write_delay=60)
+    second = SettingsStore(tmp_path, write_delay=60)
+    first.get("installed")
+    second.set("tools", {"pyenv": "/usr/bin/pyenv"})
+    second.flush()
+    bump_mtime(second.path)
+
+    first.set("installed", True)
+    first.flush()
+
+    assert SettingsStore(tmp_path).as_dict() == {
+        "installed": True,
+        "tools": {"pyenv": "/usr/bin/pyenv"},
+    }
+
+
+def test_reads_legacy_install_state(tmp_path):
+    (tmp_path / "install_state.toml").write_text("installed = true\n")
+
+    assert SettingsStore(tmp_path).get("installed") is True
+
+
+def test_installation_state(tmp_path):
+    app = SimpleNamespace(paths=SimpleNamespace(config=tmp_path))
+    assert not services.check_installation_state(app)
+
+    services.set_installation_state(tmp_path)
+
+    assert services.check_installation_state(app)
+    # Written right away, without waiting for the write delay.
+    assert SettingsStore(tmp_path).get("installed") is True
+    assert open_settings(tmp_path) is open_settings(str(tmp_path))
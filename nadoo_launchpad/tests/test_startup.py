@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_PATH = Path(__file__).parent.parent / "src"
+
+# Packages that must only be loaded once a project is actually created.
+HEAVY_PACKAGES = ["briefcase", "cookiecutter", "git", "django", "toml", "jinja2"]
+
+
+def cold_import(module):
+    "Import a module in a fresh interpreter, returning the loaded modules"
+    env = dict(os.environ, PYTHONPATH=str(SRC_PATH))
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))",
+        ],
+        env=env,
+    )
+    return json.loads(output)
+
+
+def heavy_modules(modules):
+    return [
+        name
+        for name in modules
+        if name.split(".")[0] in HEAVY_PACKAGES
+    ]
+
+
+def test_app_startup_is_lazy():
+    "Importing the GUI app doesn't import the project creation packages"
+    pytest.importorskip("toga")
+    assert heavy_modules(cold_import("nadoo_launchpad.app")) == []
+
+
+def test_services_import_is_lazy():
+    "Importing the services doesn't import the project creation packages"
+    pytest.importorskip("toga")
+    assert heavy_modules(cold_import("nadoo_launchpad.services")) == []
+
+
+def test_cli_doesnt_import_toga():
+    "The headless CLI loads neither Toga nor the project creation packages"
+    modules = cold_import("nadoo_launchpad.cli")
+    assert heavy_modules(modules) == []
+    assert [name for name in modules if name.split(".")[0] == "toga"] == []
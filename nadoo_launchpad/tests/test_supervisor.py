@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from nadoo_launchpad import utils
+from nadoo_launchpad.jobs import Job, JobCancelled
+from nadoo_launchpad.supervisor import Supervisor
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_output_is_kept_in_a_ring_buffer():
+    "Only the last lines are kept; a failure carries them"
+    lines = []
+    supervisor = Supervisor(on_output=lines.append, max_lines=3)
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        supervisor.run(python("import sys\nfor i in range(100): print(i)\nsys.exit(3)"))
+
+    assert len(lines) == 100
+    assert list(supervisor.output) == ["97", "98", "99"]
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.output == "97\n98\n99"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX process groups")
+def test_timeout_kills_the_process_group(tmp_path):
+    "A hung command is killed with every process it started"
+    supervisor = Supervisor()
+    script = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        "print(child.pid, flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        supervisor.run(python(script), timeout=1)
+
+    assert time.monotonic() - start < 10
+    child = int(supervisor.output[0])
+    for _ in range(100):
+        try:
+            os.kill(child, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the command's child survived")
+
+
+def test_failures_are_retried_with_backoff(tmp_path):
+    "Network steps are retried; the retries back off exponentially"
+    attempts = tmp_path / "attempts"
+    script = (
+        f"import pathlib, sys\n"
+        f"path = pathlib.Path({str(attempts)!r})\n"
+        f"path.write_text(path.read_text() + 'x' if path.exists() else 'x')\n"
+        f"sys.exit(0 if len(path.read_text()) == 3 else 1)\n"
+    )
+    supervisor = Supervisor()
+
+    assert supervisor.run(python(script), retries=2, backoff=0.01) == 0
+    assert attempts.read_text() == "xxx"
+    assert [line for line in supervisor.output if "retrying" in line] == [
+        f"{os.path.basename(sys.executable)} failed (CalledProcessError); retrying in 0s"
+    ] * 2
+
+
+def test_cancel_stops_retries():
+    supervisor = Supervisor()
+    threading.Timer(0.2, supervisor.cancel).start()
+    start = time.monotonic()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        supervisor.run(python("raise SystemExit(1)"), retries=5, backoff=30)
+    assert time.monotonic() - start < 10
+
+
+def test_step_timeout_limits_its_commands():
+    "A step's commands share the step's timeout"
+
+    def slow(job):
+        job.run_command(python("import time; time.sleep(60)"))
+
+    job = Job("test", [("Slow", slow)], timeouts={"Slow": 0.5})
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        job.run()
+    assert time.monotonic() - start < 10
+
+
+def test_cancelled_job_raises_job_cancelled():
+    def slow(job):
+        threading.Timer(0.2, job.cancel).start()
+        job.run_command(python("import time; time.sleep(60)"), retries=3)
+
+    with pytest.raises(JobCancelled):
+        Job("test", [("Slow", slow)]).run()
+
+
+def test_pyenv_installer_retries_start_from_scratch(tmp_path, monkeypatch):
+    "The installer gives up if $PYENV_ROOT exists; a failed clone is removed"
+    root = tmp_path / "pyenv"
+    monkeypatch.setenv("PYENV_ROOT", str(root))
+    commands = []
+
+    def run(args, retries=0):
+        commands.append(args[0])
+        if args[0] == "bash":
+            if root.exists():
+                raise subprocess.CalledProcessError(1, args)
+            root.mkdir()
+            if commands.count("bash") == 1:
+                # The clone broke off.
+                raise subprocess.CalledProcessError(128, args)
+
+    utils.install_pyenv(run=run)
+
+    assert commands == ["curl", "bash", "bash"]
+    assert root.exists()
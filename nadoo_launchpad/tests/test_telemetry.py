@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from nadoo_launchpad import telemetry
+from nadoo_launchpad.jobs import Job, JobCancelled
+
+
+@pytest.fixture
+def log(tmp_path):
+    telemetry.configure(tmp_path)
+    return telemetry.TelemetryLog(tmp_path)
+
+
+def test_job_records_steps_and_commands(log):
+    "A job, its steps and their commands are nested spans of one run"
+
+    def command(job):
+        job.run_command([sys.executable, "-c", "print('hello')"])
+
+    def write(job):
+        telemetry.add("bytes_written", 10)
+        telemetry.add("bytes_written", 5)
+
+    Job("Build", [("Running", command), ("Writing", write)]).run()
+
+    records = {record["name"]: record for record in log.read()}
+    job = records["Build"]
+    running = records["Running"]
+    command = records["$ " + Path(sys.executable).name]
+    assert job["kind"] == "job" and job["parent"] is None
+    assert running["parent"] == job["id"]
+    assert command["parent"] == running["id"]
+    assert {record["run"] for record in records.values()} == {job["id"]}
+    assert command["returncode"] == 0
+    assert command["output_bytes"] == len("hello\n")
+    assert records["Writing"]["bytes_written"] == 15
+    assert job["duration"] >= running["duration"] + records["Writing"]["duration"]
+
+
+def test_jobs_are_recorded_under_a_stable_name(log):
+    "Runs of the same job aggregate; housekeeping jobs aren't recorded"
+    for app_name in ["invoices", "timesheets"]:
+        Job(
+            f"Add project {app_name}",
+            [("Rendering", lambda job: None)],
+            span_name="Add project",
+            attributes={"app_name": app_name},
+        ).run()
+    Job("Summarize timings", [("Summarizing", lambda job: None)], record=False).run()
+
+    records = list(log.read())
+    jobs = [record for record in records if record["kind"] == "job"]
+    assert [(job["name"], job["app_name"]) for job in jobs] == [
+        ("Add project", "invoices"),
+        ("Add project", "timesheets"),
+    ]
+    assert {record["job"] for record in records if record["kind"] == "step"} == {
+        "Add project"
+    }
+    assert telemetry.summarize(records, kinds=["job"])["Add project"]["count"] == 2
+
+
+def test_failures_and_cancellations_are_recorded(log):
+    def fail(job):
+        raise RuntimeError("broken")
+
+    def cancel(job):
+        job.cancel()
+        job.check_cancelled()
+
+    with pytest.raises(RuntimeError):
+        Job("Failing", [("Breaking", fail)]).run()
+    with pytest.raises(JobCancelled):
+        Job("Cancelled", [("Cancelling", cancel)]).run()
+
+    records = {record["name"]: record for record in log.read()}
+    assert records["Breaking"]["status"] == "error"
+    assert records["Breaking"]["error"] == "RuntimeError"
+    assert records["Failing"]["status"] == "error"
+    assert records["Cancelling"]["status"] == "cancelled"
+    assert records["Cancelled"]["status"] == "cancelled"
+
+
+def test_log_rotates(tmp_path):
+    "The log is rotated past its size limit, keeping a few old logs"
+    log = telemetry.TelemetryLog(tmp_path, max_bytes=200, backups=2)
+    for index in range(50):
+        log.write({"name": "step", "index": index})
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "telemetry.jsonl",
+        "telemetry.jsonl.1",
+        "telemetry.jsonl.2",
+    ]
+    indexes = [record["index"] for record in log.read()]
+    assert indexes == list(range(indexes[0], 50))
+    assert indexes[0] > 0
+
+
+def test_summarize_percentiles():
+    records = [
+        {"name": "Render", "kind": "step", "duration": duration, "status": "ok"}
+        for duration in [4, 1, 3, 2, 5]
+    ]
+    records.append({"name": "Render", "kind": "step", "duration": 10, "status": "error"})
+    records.append({"name": "$ git", "kind": "command", "duration": 1, "status": "ok"})
+
+    summary = telemetry.summarize(records, kinds=["step"])
+
+    assert list(summary) == ["Render"]
+    render = summary["Render"]
+    assert render["count"] == 6
+    assert render["failed"] == 1
+    assert render["p50"] == 3.5
+    assert render["max"] == 10
+    assert render["p90"] == pytest.approx(7.5)
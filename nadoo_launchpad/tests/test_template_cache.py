@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+
+import pytest
+
+from nadoo_launchpad import template_cache
+from nadoo_launchpad.locks import FileLock, LockTimeout
+from nadoo_launchpad.utils import cookiecutter_cache_path, update_cookiecutter_cache
+
+
+@pytest.fixture
+def template(home, template_remote):
+    "The stand-in template, with a v0.3.16 branch"
+    template_remote.commit({"VERSION": "0.3.16\n"}, branch="v0.3.16")
+    return template_remote
+
+
+def branch_sha(template, branch):
+    freshness = template_cache.read_freshness(cookiecutter_cache_path(template.url))
+    return freshness["branches"][branch]
+
+
+def test_first_update_clones_mirror(template):
+    "The first update clones the mirror and records the branch SHA"
+    path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    freshness = template_cache.read_freshness(cookiecutter_cache_path(template.url))
+
+    assert (template_cache.mirror_path(template.url) / "HEAD").exists()
+    assert path == template_cache.worktree_path(template.url, freshness["branches"]["v0.3.16"])
+    assert (path / "VERSION").read_text() == "0.3.16\n"
+    assert freshness["last_fetch"] == pytest.approx(time.time(), abs=10)
+
+
+def test_fetch_skipped_within_ttl(template):
+    "Within the TTL the remote isn't fetched, unless a refresh is forced"
+    old_path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    old_sha = branch_sha(template, "v0.3.16")
+    new_sha = template.commit({"VERSION": "0.3.16.1\n"}, branch="v0.3.16")
+
+    assert update_cookiecutter_cache(template.url, branch="v0.3.16") == old_path
+    assert branch_sha(template, "v0.3.16") == old_sha
+
+    new_path = update_cookiecutter_cache(template.url, branch="v0.3.16", force_refresh=True)
+    assert branch_sha(template, "v0.3.16") == new_sha
+    assert (new_path / "VERSION").read_text() == "0.3.16.1\n"
+    # The old worktree is untouched, in case a render is still using it.
+    assert (old_path / "VERSION").read_text() == "0.3.16\n"
+
+
+def test_stale_cache_is_fetched(template):
+    "Once the TTL has passed, the remote is fetched again"
+    update_cookiecutter_cache(template.url, branch="v0.3.16")
+    new_sha = template.commit({"VERSION": "0.3.16.1\n"}, branch="v0.3.16")
+
+    update_cookiecutter_cache(template.url, branch="v0.3.16", ttl=0)
+    assert branch_sha(template, "v0.3.16") == new_sha
+
+
+def test_new_branch_fetched_within_ttl(template):
+    "A branch created since the last fetch is fetched on demand"
+    update_cookiecutter_cache(template.url, branch="v0.3.16")
+    sha = template.commit({"VERSION": "0.3.17\n"}, branch="v0.3.17")
+
+    update_cookiecutter_cache(template.url, branch="v0.3.17")
+    assert branch_sha(template, "v0.3.17") == sha
+
+
+def test_missing_branch(template):
+    "A branch that doesn't exist upstream is an unsupported version"
+    from briefcase.exceptions import TemplateUnsupportedVersion
+
+    with pytest.raises(TemplateUnsupportedVersion):
+        update_cookiecutter_cache(template.url, branch="v9.9.9")
+
+
+def test_branches_have_separate_worktrees(template):
+    "Switching branches doesn't touch the other branch's checkout"
+    main = update_cookiecutter_cache(template.url, branch="main")
+    release = update_cookiecutter_cache(template.url, branch="v0.3.16")
+
+    assert main != release
+    assert not (main / "VERSION").exists()
+    assert (release / "VERSION").read_text() == "0.3.16\n"
+    assert update_cookiecutter_cache(template.url, branch="main") == main
+
+
+def test_concurrent_checkouts(template):
+    "Parallel checkouts of different branches are safe"
+    template.commit({"VERSION": "0.3.17\n"}, branch="v0.3.17")
+    results = {}
+
+    def checkout(branch):
+        results.setdefault(branch, []).append(
+            update_cookiecutter_cache(template.url, branch=branch)
+        )
+
+    threads = [
+        threading.Thread(target=checkout, args=(branch,))
+        for branch in ["v0.3.16", "v0.3.17"] * 3
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    for branch in ["v0.3.16", "v0.3.17"]:
+        paths = set(results[branch])
+        assert len(paths) == 1
+        assert (paths.pop() / "VERSION").read_text() == f"{branch[1:]}\n"
+
+
+def test_background_refresh(template):
+    "The refresher updates the SHAs of the branches in use"
+    old_path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    new_sha = template.commit({"VERSION": "0.3.16.1\n"}, branch="v0.3.16")
+
+    assert not template_cache.refresh_template_cache(template.url)
+    assert template_cache.refresh_template_cache(template.url, ttl=0)
+    assert branch_sha(template, "v0.3.16") == new_sha
+    # Recently used worktrees survive pruning.
+    assert old_path.exists()
+    assert template_cache.prune_worktrees(template.url, keep={new_sha}, grace_period=0) == [
+        old_path.name
+    ]
+    assert not old_path.exists()
+
+    refresher = template_cache.TemplateCacheRefresher(template.url, interval=60)
+    refresher.start()
+    refresher.stop()
+    refresher.join(5)
+    assert not refresher.is_alive()
+
+
+def test_worktrees_in_use_are_kept(template):
+    "The grace period counts from the last use of a worktree, not its creation"
+    path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    template.commit({"VERSION": "0.3.16.1\n"}, branch="v0.3.16")
+    ready = path.with_name(path.name + ".ready")
+    created = time.time() - 2 * template_cache.WORKTREE_GRACE_PERIOD
+    os.utime(ready, (created, created))
+
+    # Still fresh, so this is the fast path.
+    assert update_cookiecutter_cache(template.url, branch="v0.3.16") == path
+    assert template_cache.checkout_commit(template.url, path.name) == path
+    assert template_cache.prune_worktrees(template.url, keep=set()) == []
+
+    os.utime(ready, (created, created))
+    assert template_cache.prune_worktrees(template.url, keep=set()) == [path.name]
+
+
+def test_project_creation_prunes_stale_worktrees(template):
+    "A fetch on the way to a checkout prunes worktrees no branch uses"
+    old_path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    ready = old_path.with_name(old_path.name + ".ready")
+    unused = time.time() - 2 * template_cache.WORKTREE_GRACE_PERIOD
+    os.utime(ready, (unused, unused))
+    template.commit({"VERSION": "0.3.16.1\n"}, branch="v0.3.16")
+
+    new_path = update_cookiecutter_cache(template.url, branch="v0.3.16", ttl=0)
+
+    assert new_path != old_path
+    assert not old_path.exists() and not ready.exists()
+    assert new_path.exists()
+
+
+def test_file_lock_timeout(tmp_path):
+    "A held lock can't be acquired by anyone else"
+    with FileLock(tmp_path / "lock"):
+        with pytest.raises(LockTimeout):
+            FileLock(tmp_path / "lock", timeout=0.1).acquire()
+    with FileLock(tmp_path / "lock", timeout=0.1):
+        pass
@@ -0,0 +1,123 @@
+import json
+import os
+import stat
+
+import pytest
+
+from nadoo_launchpad import template_snapshot
+from nadoo_launchpad.utils import generate_template, update_cookiecutter_cache
+
+PNG = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01" + bytes(range(256))
+
+ROOT = "{{ cookiecutter.app_name }}"
+MODULE = f"{ROOT}/src/{{{{ cookiecutter.module_name }}}}"
+
+TEMPLATE_FILES = {
+    "cookiecutter.json": json.dumps(
+        {
+            "formal_name": "App",
+            "app_name": "{{ cookiecutter.formal_name|lower|replace(' ', '') }}",
+            "module_name": "{{ cookiecutter.app_name|replace('-', '_') }}",
+            "include_extra": "no",
+            "_copy_without_render": [".github"],
+        }
+    ),
+    f"{ROOT}/README.md": "# {{ cookiecutter.formal_name }}\n\nStatic text.\n",
+    f"{ROOT}/LICENSE": "Copyright NADOO IT\n\nAll rights reserved.\n",
+    f"{ROOT}/windows.bat": "@echo off\r\necho static\r\n",
+    f"{ROOT}/mixed.txt": "first\r\nsecond\nthird\rfourth\n",
+    f"{ROOT}/no-trailing-newline.txt": "line one\nline two",
+    f"{ROOT}/single-line.txt": "no newline at all",
+    f"{ROOT}/icon.png": PNG,
+    f"{ROOT}/.github/workflows/ci.yml": "run: echo ${{ matrix.python }}\n",
+    f"{ROOT}/{{% if cookiecutter.include_extra == 'yes' %}}extra.txt{{% endif %}}": "extra\n",
+    f"{MODULE}/__init__.py": "",
+    f"{MODULE}/app.py": "class {{ cookiecutter.formal_name|replace(' ', '') }}:\n    pass\n",
+    f"{MODULE}/resources/{{{{ cookiecutter.app_name }}}}.png": PNG,
+    f"{ROOT}/run.sh": "#!/bin/sh\necho static\n",
+}
+
+
+def tree(path):
+    "The contents and permissions of every file below a path"
+    result = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            full = os.path.join(dirpath, name)
+            relative = os.path.relpath(full, path)
+            mode = stat.S_IMODE(os.stat(full).st_mode)
+            if name in filenames:
+                with open(full, "rb") as f:
+                    result[relative] = (f.read(), mode)
+            else:
+                result[relative] = (None, mode)
+    return result
+
+
+@pytest.fixture
+def template(home, template_remote):
+    template_remote.commit(TEMPLATE_FILES, branch="v0.3.16")
+    (template_remote.work / ROOT / "run.sh").chmod(0o755)
+    template_remote.commit({}, branch="v0.3.16")
+    return template_remote
+
+
+def render(template, output_path, cache_dir=None, formal_name="My App"):
+    output_path.mkdir(parents=True, exist_ok=True)
+    generate_template(
+        template=template.url,
+        branch="v0.3.16",
+        output_path=output_path,
+        extra_context={"formal_name": formal_name},
+        cache_dir=cache_dir,
+    )
+    return output_path / formal_name.lower().replace(" ", "")
+
+
+def test_render_matches_cookiecutter(tmp_path, template):
+    "Cached renders are byte-identical to a plain cookiecutter render"
+    expected = tree(render(template, tmp_path / "plain"))
+    assert expected["icon.png"][0] == PNG
+    assert expected["run.sh"][1] & stat.S_IXUSR
+    assert "src/myapp/resources/myapp.png" in expected
+    assert "extra.txt" not in expected
+
+    cache_dir = tmp_path / "cache"
+    # Builds the snapshot
+    assert tree(render(template, tmp_path / "first", cache_dir)) == expected
+    # Reuses the snapshot for a different context
+    assert tree(render(template, tmp_path / "other", cache_dir, "Other App")) == tree(
+        render(template, tmp_path / "other-plain", formal_name="Other App")
+    )
+
+
+def test_snapshot_layers(tmp_path, template):
+    "Only files that reference the context are rendered per project"
+    path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    snapshot, manifest = template_snapshot.ensure_snapshot(path, path.name, tmp_path)
+
+    static = sorted(manifest["static"].values())
+    assert "README.md" not in static
+    assert os.path.join("src", "{{ cookiecutter.module_name }}", "app.py") not in static
+    assert "LICENSE" in static
+    assert "icon.png" in static
+    assert os.path.join(".github", "workflows", "ci.yml") in static
+
+    reduced = snapshot / "template" / ROOT
+    assert (reduced / "README.md").exists()
+    assert not (reduced / "LICENSE").exists()
+    assert (reduced / f"LICENSE{template_snapshot.PLACEHOLDER_SUFFIX}").exists()
+
+
+def test_templates_with_hooks_render_plainly(tmp_path, template):
+    "Templates with hooks can't be split, and are rendered by cookiecutter"
+    template.commit(
+        {"hooks/post_gen_project.py": "open('hooked.txt', 'w').write('hooked')\n"},
+        branch="v0.3.16",
+    )
+    project = render(template, tmp_path / "output", tmp_path / "cache")
+
+    assert (project / "hooked.txt").read_text() == "hooked"
+    path = update_cookiecutter_cache(template.url, branch="v0.3.16")
+    with pytest.raises(template_snapshot.SnapshotUnsupported):
+        template_snapshot.ensure_snapshot(path, path.name, tmp_path / "cache")
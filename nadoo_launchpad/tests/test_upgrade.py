@@ -0,0 +1,151 @@
+import json
+
+import briefcase
+import pytest
+
+from nadoo_launchpad import registry, services, upgrade
+from nadoo_launchpad.jobs import Job
+
+TEMPLATE_FILES = {
+    "cookiecutter.json": json.dumps(
+        {"formal_name": "App", "app_name": "app", "template_branch": ""}
+    ),
+    "{{ cookiecutter.app_name }}/README.md": "# {{ cookiecutter.formal_name }}\n",
+    "{{ cookiecutter.app_name }}/setup.cfg": "[flake8]\nmax-line-length = 88\n",
+    "{{ cookiecutter.app_name }}/src/app.py": "one\ntwo\nthree\nfour\nfive\n",
+}
+
+
+def test_plan_upgrade(tmp_path):
+    old = {
+        "untouched.txt": (b"v1\n", False),
+        "edited.txt": (b"one\ntwo\nthree\n", False),
+        "clash.txt": (b"one\n", False),
+        "removed.txt": (b"removed\n", False),
+        "removed-but-edited.txt": (b"removed\n", False),
+        "unchanged.txt": (b"same\n", False),
+    }
+    new = {
+        "untouched.txt": (b"v2\n", False),
+        "edited.txt": (b"one\ntwo\nTHREE\n", False),
+        "clash.txt": (b"template\n", False),
+        "added.txt": (b"new\n", True),
+        "unchanged.txt": (b"same\n", False),
+    }
+    project = {
+        "untouched.txt": "v1\n",
+        "edited.txt": "ONE\ntwo\nthree\n",
+        "clash.txt": "project\n",
+        "removed.txt": "removed\n",
+        "removed-but-edited.txt": "mine now\n",
+        "unchanged.txt": "edited by the project\n",
+    }
+    for name, content in project.items():
+        (tmp_path / name).write_text(content)
+
+    changes = upgrade.plan_upgrade(old, new, tmp_path)
+    assert [(path, kind) for path, kind, file in changes] == [
+        ("added.txt", upgrade.ADDED),
+        ("clash.txt", upgrade.CONFLICT),
+        ("edited.txt", upgrade.MERGED),
+        ("removed-but-edited.txt", upgrade.KEPT),
+        ("removed.txt", upgrade.DELETED),
+        ("untouched.txt", upgrade.UPDATED),
+    ]
+
+    upgrade.apply_upgrade(tmp_path, changes)
+    assert (tmp_path / "edited.txt").read_text() == "ONE\ntwo\nTHREE\n"
+    assert "<<<<<<< project" in (tmp_path / "clash.txt").read_text()
+    assert (tmp_path / "added.txt").stat().st_mode & 0o100
+    assert not (tmp_path / "removed.txt").exists()
+    assert (tmp_path / "removed-but-edited.txt").read_text() == "mine now\n"
+    assert (tmp_path / "unchanged.txt").read_text() == "edited by the project\n"
+    # A second upgrade has nothing left to do, besides the conflict.
+    assert [kind for _, kind, _ in upgrade.plan_upgrade(old, new, tmp_path)] == [
+        upgrade.CONFLICT,
+        upgrade.KEPT,
+    ]
+
+
+@pytest.fixture
+def template(home, registry_db, template_remote, monkeypatch):
+    template_remote.commit(TEMPLATE_FILES, branch="main")
+    monkeypatch.setattr(services, "TEMPLATE", template_remote.url)
+    monkeypatch.setattr(services, "_template_branches", {})
+    monkeypatch.setattr(briefcase, "__version__", "0.3.17.dev1")
+    return template_remote
+
+
+def create_project(tmp_path, formal_name):
+    context = {
+        "formal_name": formal_name,
+        "app_name": formal_name.lower(),
+        "bundle": "de.nadooit",
+    }
+    app_path = tmp_path / "projects" / context["app_name"]
+    app_path.parent.mkdir(exist_ok=True)
+    Job(
+        "create",
+        [
+            ("Rendering", services.render_project_template),
+            ("Registering", services.register_new_project),
+        ],
+        state={
+            "context": context,
+            "app_path": app_path,
+            "venv_path": "",
+            "cache_dir": tmp_path / "cache",
+        },
+    ).run()
+    return app_path
+
+
+def test_upgrade_project_in_place(template, tmp_path):
+    app_path = create_project(tmp_path, "Invoices")
+    old_sha = registry.find_project("invoices").template_sha
+    (app_path / "src" / "app.py").write_text("ONE\ntwo\nthree\nfour\nfive\n")
+    new_sha = template.commit(
+        {
+            "{{ cookiecutter.app_name }}/src/app.py": "one\ntwo\nthree\nfour\nFIVE\n",
+            "{{ cookiecutter.app_name }}/CHANGELOG.md": "{{ cookiecutter.formal_name }}\n",
+        },
+        branch="main",
+    )
+    untouched = {
+        name: (app_path / name).stat().st_mtime_ns for name in ["README.md", "setup.cfg"]
+    }
+
+    job = Job(
+        "upgrade",
+        services.project_upgrade_steps(["invoices", "missing"]),
+        state={"cache_dir": tmp_path / "cache", "force_refresh": True},
+    )
+    job.run()
+
+    assert job.state["template_sha"] == new_sha != old_sha
+    assert job.state["upgrades"]["invoices"] == {
+        "status": "ok",
+        "changes": [
+            {"path": "CHANGELOG.md", "kind": upgrade.ADDED},
+            {"path": "src/app.py", "kind": upgrade.MERGED},
+        ],
+    }
+    assert job.state["upgrades"]["missing"]["status"] == "failed"
+    assert (app_path / "src" / "app.py").read_text() == "ONE\ntwo\nthree\nfour\nFIVE\n"
+    assert (app_path / "CHANGELOG.md").read_text() == "Invoices\n"
+    for name, mtime in untouched.items():
+        assert (app_path / name).stat().st_mtime_ns == mtime
+    project = registry.find_project("invoices")
+    assert project.template_sha == new_sha
+    assert project.context["formal_name"] == "Invoices"
+
+
+def test_projects_without_a_recorded_template_are_refused(template, tmp_path):
+    registry.register_project(
+        {"app_name": "legacy", "formal_name": "Legacy", "bundle": "de.nadooit"},
+        path=tmp_path,
+    )
+    project = registry.find_project("legacy")
+    project.context = {}
+    with pytest.raises(upgrade.UpgradeError):
+        upgrade.upgrade_project(project, template.url, "a" * 40, tmp_path, {})
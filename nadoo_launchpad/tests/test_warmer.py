@@ -0,0 +1,80 @@
+import threading
+from types import SimpleNamespace
+
+import briefcase
+import pytest
+from briefcase.exceptions import TemplateUnsupportedVersion
+
+from nadoo_launchpad import services, warmer
+from nadoo_launchpad.jobs import Job
+
+
+@pytest.fixture
+def branches(monkeypatch):
+    "Forget the branches resolved by other tests"
+    monkeypatch.setattr(services, "_template_branches", {})
+
+
+def test_branch_resolution_is_memoized(home, template_remote, branches, monkeypatch):
+    "The branch choice is resolved once; later projects don't ask again"
+    template_remote.commit({"VERSION": "0.3.16\n"}, branch="v0.3.16")
+    monkeypatch.setattr(briefcase, "__version__", "0.3.16")
+
+    assert services.resolve_template_branch(template_remote.url) == "v0.3.16"
+
+    monkeypatch.setattr(services, "update_cookiecutter_cache", pytest.fail)
+    assert services.resolve_template_branch(template_remote.url) == "v0.3.16"
+
+
+def test_development_versions_fall_back_to_main(home, template_remote, branches, monkeypatch):
+    monkeypatch.setattr(briefcase, "__version__", "0.3.17.dev4")
+    assert services.resolve_template_branch(template_remote.url) == "main"
+
+    # Released versions need their own branch.
+    monkeypatch.setattr(briefcase, "__version__", "0.3.17")
+    with pytest.raises(TemplateUnsupportedVersion):
+        services.resolve_template_branch(template_remote.url)
+
+
+def test_warmer_steps_are_best_effort(monkeypatch):
+    "A failing warmer step is reported, and the others still run"
+    done = []
+
+    def offline(job):
+        raise OSError("offline")
+
+    monkeypatch.setattr(warmer, "lower_priority", lambda job: None)
+    monkeypatch.setattr(warmer, "resolve_template", offline)
+    monkeypatch.setattr(
+        warmer, "import_packages", lambda job: done.append(("imports", threading.get_ident()))
+    )
+    monkeypatch.setattr(
+        warmer, "warm_golden_venv", lambda job: done.append(("venv", threading.get_ident()))
+    )
+    lines = []
+
+    Job("Warm caches", warmer.warming_steps(), on_output=lines.append).run()
+
+    assert [step for step, thread in done] == ["imports", "venv"]
+    # Only the imports ran on a thread of lowered priority.
+    assert done[0][1] != threading.get_ident() == done[1][1]
+    assert lines == ["Resolving template branch skipped: offline"]
+
+
+def test_warmer_output_goes_to_the_log(tmp_path, monkeypatch):
+    def offline(job):
+        raise OSError("offline")
+
+    monkeypatch.setattr(
+        warmer, "warming_steps", lambda: [warmer.best_effort("Fetching", offline)]
+    )
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / warmer.LOG_FILE).write_text("the last warm-up\n")
+    app = SimpleNamespace(paths=SimpleNamespace(cache=tmp_path / "cache", logs=logs))
+
+    runner = warmer.start_warmer(app)
+    runner.current[1].result(timeout=10)
+
+    [line] = (logs / warmer.LOG_FILE).read_text().splitlines()
+    assert line.endswith(" Fetching skipped: offline")
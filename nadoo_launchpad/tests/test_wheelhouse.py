@@ -0,0 +1,115 @@
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from nadoo_launchpad import wheelhouse
+
+
+class FakePip:
+    "Records pip commands; ``download`` writes a wheel into the destination"
+
+    def __init__(self, fail_installs=0):
+        self.commands = []
+        self.fail_installs = fail_installs
+
+    def __call__(self, args):
+        self.commands.append(args)
+        if args[1] == "download":
+            dest = Path(args[args.index("--dest") + 1])
+            (dest / f"wheel-{len(self.commands)}.whl").write_text("wheel")
+        elif self.fail_installs:
+            self.fail_installs -= 1
+            raise subprocess.CalledProcessError(1, args)
+
+
+def test_install_populates_once(tmp_path):
+    "The wheelhouse is downloaded once, then installs are offline"
+    pip = FakePip()
+    wheelhouse.install_briefcase("pip", tmp_path, "0.3.16", run=pip)
+    wheelhouse.install_briefcase("pip", tmp_path, "0.3.16", run=pip)
+
+    assert [command[1] for command in pip.commands] == [
+        "download",
+        "install",
+        "install",
+    ]
+    assert "--no-index" in pip.commands[-1]
+    assert wheelhouse.is_warm(tmp_path, "0.3.16")
+    assert wheelhouse.cached_versions(tmp_path) == ["0.3.16"]
+
+
+def test_install_tops_up_missing_wheels(tmp_path):
+    "A failing offline install adds the missing wheels and retries"
+    pip = FakePip(fail_installs=1)
+    wheelhouse.install_briefcase("pip", tmp_path, "0.3.16", run=pip)
+
+    assert [command[1] for command in pip.commands] == [
+        "download",
+        "install",
+        "download",
+        "install",
+    ]
+    # The wheels of both downloads are kept.
+    wheels = sorted(
+        path.name for path in wheelhouse.wheelhouse_path(tmp_path, "0.3.16").glob("*.whl")
+    )
+    assert wheels == ["wheel-1.whl", "wheel-3.whl"]
+
+
+def test_wheelhouse_is_not_replaced_during_an_install(tmp_path):
+    "Populating waits for installs from the same wheelhouse"
+    other = FakePip()
+    populating = threading.Thread(
+        target=wheelhouse.populate_wheelhouse, args=("pip", tmp_path, "0.3.16", other)
+    )
+
+    def pip(args):
+        if args[1] == "install":
+            populating.start()
+            time.sleep(0.2)
+            # pip is still reading the wheelhouse.
+            assert other.commands == []
+        return FakePip()(args)
+
+    wheelhouse.install_briefcase("pip", tmp_path, "0.3.16", run=pip)
+    populating.join(10)
+
+    assert [command[1] for command in other.commands] == ["download"]
+    assert wheelhouse.is_warm(tmp_path, "0.3.16")
+
+
+def test_interrupted_download_is_not_warm(tmp_path):
+    "A failed download doesn't leave a warm wheelhouse behind"
+
+    def fail(args):
+        raise subprocess.CalledProcessError(1, args)
+
+    try:
+        wheelhouse.populate_wheelhouse("pip", tmp_path, "0.3.16", run=fail)
+    except subprocess.CalledProcessError:
+        pass
+
+    assert not wheelhouse.is_warm(tmp_path, "0.3.16")
+    # Nothing but the lock file
+    assert [path.name for path in wheelhouse.wheelhouse_root(tmp_path).iterdir()] == [
+        ".briefcase-0.3.16.lock"
+    ]
+
+
+def test_prune_keeps_versions_in_use(tmp_path):
+    "Pruning removes the versions no project venv uses"
+    cache_dir = tmp_path / "cache"
+    for version in ["0.3.15", "0.3.16", "0.3.17"]:
+        wheelhouse.populate_wheelhouse("pip", cache_dir, version, run=FakePip())
+
+    projects = tmp_path / "projects"
+    site_packages = projects / "myapp" / ".venv" / "lib" / "python3.11" / "site-packages"
+    (site_packages / "briefcase-0.3.16.dist-info").mkdir(parents=True)
+
+    keep = wheelhouse.versions_in_use(projects)
+    assert keep == {"0.3.16"}
+
+    keep.add("0.3.17")
+    assert wheelhouse.prune_wheelhouse(cache_dir, keep) == ["0.3.15"]
+    assert wheelhouse.cached_versions(cache_dir) == ["0.3.16", "0.3.17"]